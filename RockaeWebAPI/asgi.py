@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'RockaeWebAPI.settings')
+# Serve the async-native views (e.g. off-loop password hashing for login) under ASGI
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
@@ -12,14 +14,75 @@ SMTP_SEND_MAIL_URL = config('SMTP_SEND_MAIL_URL')
 SMTP_API_KEY = config('SMTP_API_KEY')
 PORTAL_WEB_APP_URL = config('PORTAL_WEB_APP_URL')
 
+# Shared, keep-alive SMTP API client (see apps.shared.http)
+SMTP_CONNECT_TIMEOUT = config('SMTP_CONNECT_TIMEOUT', default=3.05, cast=float)
+SMTP_READ_TIMEOUT = config('SMTP_READ_TIMEOUT', default=10, cast=float)
+SMTP_CIRCUIT_FAILURE_THRESHOLD = config('SMTP_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+SMTP_CIRCUIT_RESET_TIMEOUT = config('SMTP_CIRCUIT_RESET_TIMEOUT', default=30, cast=float)
+
+# Email outbox (see apps.notifications); messages are sent by `manage.py run_outbox_worker`
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_CONCURRENCY = config('EMAIL_OUTBOX_CONCURRENCY', default=8, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_BACKOFF = config('EMAIL_OUTBOX_RETRY_BACKOFF', default=30, cast=int)  # seconds, doubled per attempt
+EMAIL_OUTBOX_MAX_BACKOFF = config('EMAIL_OUTBOX_MAX_BACKOFF', default=3600, cast=int)
+EMAIL_OUTBOX_LEASE = config('EMAIL_OUTBOX_LEASE', default=300, cast=int)  # seconds before an unfinished send is retried
+SMTP_POOL_SIZE = config('SMTP_POOL_SIZE', default=EMAIL_OUTBOX_CONCURRENCY, cast=int)
+
 DEBUG = config('DEBUG', default=False, cast=bool)
 
+# Route async-native views where they exist; RockaeWebAPI.asgi turns this on by default
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
 # Get the database URL from environment variable
 DATABASE_URL = config('DATABASE_URL')  # Ensure DATABASE_URL is set in .env or environment
 
+# How connections are reused:
+# - 'persistent': each thread keeps its connection for DB_CONN_MAX_AGE seconds (WSGI default)
+# - 'pool': threads share a per-process pool (apps.shared.postgresql_pool). Under ASGI every request
+#   runs in a new thread, so this is the only mode that reuses connections there (ASGI default).
+#   PostgreSQL only: with another database the setting is ignored
+# - 'pgbouncer': DATABASE_URL points at pgbouncer in transaction pooling mode
+DB_POOL_MODE = config('DB_POOL_MODE', default='pool' if ASYNC_VIEWS else 'persistent')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+DB_SSL_REQUIRE = config('DB_SSL_REQUIRE', default=True, cast=bool)
+# Pools are sized from the gunicorn process model; gunicorn.conf.py sets both from its profile
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=3, cast=int)
+GUNICORN_THREADS = config('GUNICORN_THREADS', default=1, cast=int)
+# Server connections this deployment may use in total; split evenly between the workers
+DB_MAX_CONNECTIONS = config('DB_MAX_CONNECTIONS', default=90, cast=int)
+
 DATABASES = {
-    'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=600, ssl_require=True)
+    'default': dj_database_url.config(
+        default=DATABASE_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+        # Ping a reused connection once per request instead of failing on a stale one
+        conn_health_checks=True,
+        ssl_require=DB_SSL_REQUIRE,
+    )
 }
+# The pool backend is PostgreSQL-only; other databases (e.g. SQLite in development) keep their engine
+if DB_POOL_MODE == 'pool' and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    worker_share = max(1, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)
+    DATABASES['default'].update({
+        'ENGINE': 'apps.shared.postgresql_pool',
+        'CONN_MAX_AGE': 0,  # Hand the connection back to the pool after every request
+        'POOL': {
+            'MIN_SIZE': min(GUNICORN_THREADS, worker_share),
+            # Under WSGI a thread holds at most one connection; under ASGI concurrency is not
+            # bounded by threads, so a worker may use its whole share
+            'MAX_SIZE': worker_share if ASYNC_VIEWS else min(GUNICORN_THREADS, worker_share),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            'MAX_IDLE': config('DB_POOL_MAX_IDLE', default=600, cast=float),
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=3600, cast=float),
+            'CHECK_INTERVAL': config('DB_POOL_CHECK_INTERVAL', default=30, cast=float),
+        },
+    })
+elif DB_POOL_MODE == 'pgbouncer':
+    # Consecutive transactions may run on different server connections, which
+    # breaks cursors held open across them (QuerySet.iterator() then fetches
+    # its whole result at once). The health check pings pgbouncer, not Postgres.
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
 
 ALLOWED_HOSTS = ['*']
 
@@ -36,11 +99,14 @@ INSTALLED_APPS = [
     'apps.accounts',  # Custom app for user management
     'apps.backend',   # Custom app for all eye tracking data
     'apps.utility',
+    'apps.notifications',  # Email outbox
     'drf_spectacular',
     'corsheaders',
 ]
 
 MIDDLEWARE = [
+    'apps.shared.middleware.MetricsMiddleware',  # First, so it times everything below it
+    'apps.shared.middleware.QueryBudgetMiddleware',  # Reads MetricsMiddleware's query count
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -53,6 +119,16 @@ MIDDLEWARE = [
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Request metrics: each worker writes its totals to METRICS_DIR, /metrics merges them.
+# The preloading gunicorn master (gunicorn.conf.py) clears it on start.
+METRICS_DIR = config('METRICS_DIR', default=os.path.join(tempfile.gettempdir(), 'rockae-metrics'))
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=float)
+# Optional static bearer token for Prometheus scrapers; staff JWTs are always accepted
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# What to do when a request runs more queries than its view's @query_budget: 'raise', 'log' or 'off'
+QUERY_BUDGET_ACTION = config('QUERY_BUDGET_ACTION', default='raise' if DEBUG else 'log')
+
 ROOT_URLCONF = 'RockaeWebAPI.urls'
 
 TEMPLATES = [
@@ -73,7 +149,39 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'RockaeWebAPI.wsgi.application'
 
+# Password hashing pool used by the async login/token views
+AUTH_HASHING_CONCURRENCY = config('AUTH_HASHING_CONCURRENCY', default=2, cast=int)
+AUTH_HASHING_MAX_PENDING = config('AUTH_HASHING_MAX_PENDING', default=64, cast=int)
+
+
 
+# Shared cache, e.g. redis://redis:6379/0 (needs the redis package). Without it every
+# process has its own local-memory cache.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+
+# Seconds a quiz leaderboard stays cached (apps.backend.leaderboard). New results invalidate it
+# in a shared cache; the per-process default cache is only invalidated in the submitting worker
+LEADERBOARD_CACHE_TTL = config('LEADERBOARD_CACHE_TTL', default=300 if CACHE_URL else 5, cast=int)
+
+# Token-bucket throttles of the login, registration and password reset endpoints
+# (apps.shared.throttling): 'local' buckets per process, so each worker enforces the rates on
+# its own (N workers allow N times the rate), or 'cache' buckets in a shared cache
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+THROTTLE_BACKEND = config('THROTTLE_BACKEND', default='cache' if CACHE_URL else 'local')
+THROTTLE_CACHE_ALIAS = 'default'
+# Reverse proxies in front of the app whose X-Forwarded-For entries are trusted
+THROTTLE_NUM_PROXIES = config('THROTTLE_NUM_PROXIES', default=0, cast=int)
+THROTTLE_RATES = {
+    # Per client address, and per account named by the request's email
+    'login.ip': config('THROTTLE_LOGIN_IP', default='30/min'),
+    'login.account': config('THROTTLE_LOGIN_ACCOUNT', default='10/min'),
+    'register.ip': config('THROTTLE_REGISTER_IP', default='10/hour'),
+    'register.account': config('THROTTLE_REGISTER_ACCOUNT', default='3/hour'),
+    'password_reset.ip': config('THROTTLE_PASSWORD_RESET_IP', default='10/hour'),
+    'password_reset.account': config('THROTTLE_PASSWORD_RESET_ACCOUNT', default='3/hour'),
+}
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),  # Set to 15 minutes, for example
@@ -81,6 +189,18 @@ SIMPLE_JWT = {
     # Other settings...
 }
 
+# Resolve the JWT user from the token claims instead of the database (see apps.accounts.authentication)
+JWT_STATELESS_USERS = config('JWT_STATELESS_USERS', default=False, cast=bool)
+# Per-process cache of authenticated users; a TTL of 0 disables it. Like the profile cache
+# below it is invalidated through the default cache, so it is off by default without CACHE_URL
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=10000, cast=int)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60 if CACHE_URL else 0, cast=int)
+# Per-process cache of serialized user profiles (apps.backend.profiles); a TTL of 0 disables it.
+# Entries are invalidated through stamps in the default cache, which only reach every worker
+# when that cache is shared, so the cache is off by default without CACHE_URL
+PROFILE_CACHE_SIZE = config('PROFILE_CACHE_SIZE', default=10000, cast=int)
+PROFILE_CACHE_TTL = config('PROFILE_CACHE_TTL', default=60 if CACHE_URL else 0, cast=int)
+
 # Use a custom user model for the accounts app
 AUTH_USER_MODEL = 'accounts.User'  # Ensure your custom user model is in the 'accounts' app
 
@@ -100,14 +220,29 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# JSON bodies are rendered and parsed with orjson (apps.shared.fastjson) when FAST_JSON is on;
+# without orjson installed, or with FAST_JSON=False, DRF's stdlib json classes are used.
+FAST_JSON = config('FAST_JSON', default=True, cast=bool)
+JSON_RENDERER = 'apps.shared.fastjson.FastJSONRenderer' if FAST_JSON else 'rest_framework.renderers.JSONRenderer'
+JSON_PARSER = 'apps.shared.fastjson.FastJSONParser' if FAST_JSON else 'rest_framework.parsers.JSONParser'
+
 # REST framework configuration for JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        JSON_RENDERER,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        JSON_PARSER,
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
@@ -118,6 +253,38 @@ SPECTACULAR_SETTINGS = {
     # You can add more settings here (e.g., SCHEMA_PATH_PREFIX, SERVERS, etc.)
 }
 
+# 'dynamic': drf_spectacular's views generate the schema on every request (development).
+# 'static': the schema is generated once (manage.py build_openapi_schema, else on the first
+# request), stored gzipped in OPENAPI_SCHEMA_DIR and served with ETag/Last-Modified; the
+# drf_spectacular views are never imported.
+OPENAPI_SCHEMA_MODE = config('OPENAPI_SCHEMA_MODE', default='dynamic' if DEBUG else 'static')
+OPENAPI_SCHEMA_DIR = config('OPENAPI_SCHEMA_DIR', default=str(BASE_DIR / 'openapi'))
+
+# 'full' loads every app. 'slim' is for API-only workers: it drops the admin, sessions and
+# messages (and drf_spectacular unless the schema is dynamic) and renders JSON only, which
+# shortens worker boot and lowers RSS (manage.py profile_startup measures both).
+RUNTIME_PROFILE = config('RUNTIME_PROFILE', default='full')
+if RUNTIME_PROFILE == 'slim':
+    SLIM_EXCLUDED_APPS = ['django.contrib.admin', 'django.contrib.sessions', 'django.contrib.messages']
+    if OPENAPI_SCHEMA_MODE != 'dynamic':
+        SLIM_EXCLUDED_APPS.append('drf_spectacular')
+        # Every @api_view reads its schema class; drf_spectacular's imports all of drf_spectacular
+        REST_FRAMEWORK['DEFAULT_SCHEMA_CLASS'] = 'rest_framework.schemas.openapi.AutoSchema'
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in SLIM_EXCLUDED_APPS]
+    # The API authenticates with JWTs; Django's auth middleware needs sessions
+    MIDDLEWARE = [m for m in MIDDLEWARE if m not in (
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+    )]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove('django.contrib.messages.context_processors.messages')
+    # No browsable API: it pulls in forms and templates on the first request
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [JSON_RENDERER]
+# Boot budget of a slim worker, checked by profile_startup (0 disables a check). Measured on
+# a single-CPU dev container (medians of 9 boots): full 595-605 ms / 61.5 MB, slim 510-585 ms / 60.5 MB.
+STARTUP_TARGET_MS = config('STARTUP_TARGET_MS', default=600, cast=float)
+STARTUP_TARGET_RSS_MB = config('STARTUP_TARGET_RSS_MB', default=64, cast=float)
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
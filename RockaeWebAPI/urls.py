@@ -1,20 +1,34 @@
 from django.urls import path, include
-from django.contrib import admin
-from django.urls import path
+from django.apps import apps
 from django.shortcuts import redirect
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from django.conf import settings
+from apps.shared.views import metrics_view
+
+if settings.OPENAPI_SCHEMA_MODE == 'dynamic':
+    from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+    schema_view = SpectacularAPIView.as_view()
+    swagger_ui_view = SpectacularSwaggerView.as_view(url_name='schema')
+    redoc_view = SpectacularRedocView.as_view(url_name='schema')
+else:
+    from apps.shared.views import schema_view, swagger_ui_view, redoc_view
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/accounts/', include('apps.accounts.urls')),  # Include the accounts app URLs
     path('api/', include('apps.backend.urls')),
     path('', include('apps.utility.urls')),
     # OpenAPI schema:
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/schema/', schema_view, name='schema'),
     # Swagger UI:
-    path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    path('api/schema/swagger-ui/', swagger_ui_view, name='swagger-ui'),
     # Redoc:
-    path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('api/schema/redoc/', redoc_view, name='redoc'),
+    # Prometheus metrics (staff or METRICS_TOKEN only)
+    path('metrics', metrics_view, name='metrics'),
         # Catch-all for undefined routes, redirect to home page
     path('<path:slug>/', lambda request, slug: redirect('home')),  
 ]
+
+if apps.is_installed('django.contrib.admin'):
+    # Not installed in the slim RUNTIME_PROFILE
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -0,0 +1,10 @@
+from django.apps import AppConfig, apps
+
+
+class AccountsConfig(AppConfig):
+    name = 'apps.accounts'
+
+    def ready(self):
+        # Wherever a schema can be generated, by drf_spectacular's views or by build_openapi_schema
+        if apps.is_installed('drf_spectacular'):
+            from . import schema  # noqa: F401
@@ -0,0 +1,66 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+# Password hashing (PBKDF2) is CPU-bound. Under ASGI it runs in this bounded
+# thread pool instead of the event loop or Django's single sync thread;
+# hashlib releases the GIL while hashing, so the pool uses real cores.
+
+_executor = None
+_executor_pid = None
+_pending = 0
+_lock = threading.Lock()
+
+
+class HashingPoolSaturated(Exception):
+    """Raised when too many password checks are already waiting for the pool."""
+
+
+def get_hashing_executor():
+    global _executor, _executor_pid
+    pid = os.getpid()
+    with _lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.AUTH_HASHING_CONCURRENCY,
+                thread_name_prefix='auth-hashing',
+            )
+            _executor_pid = pid
+    return _executor
+
+
+def _call(func, *args, **kwargs):
+    # Pool threads are long-lived, so expire their DB connections the way request threads
+    # do at the start and end of a request. Closing afterwards matters with DB_POOL_MODE=pool
+    # (CONN_MAX_AGE=0): it hands the connection back instead of holding it until the next call.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_hashing_pool(func, *args, **kwargs):
+    """
+    Run a password-checking callable (authenticate(), a token serializer's
+    is_valid(), ...) in the hashing pool. At most AUTH_HASHING_MAX_PENDING
+    calls may be queued or running; beyond that HashingPoolSaturated is raised
+    so the caller can shed load instead of building an unbounded backlog.
+    """
+    global _pending
+    with _lock:
+        if _pending >= settings.AUTH_HASHING_MAX_PENDING:
+            raise HashingPoolSaturated()
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_hashing_executor(), functools.partial(_call, func, *args, **kwargs)
+        )
+    finally:
+        with _lock:
+            _pending -= 1
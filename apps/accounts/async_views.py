@@ -0,0 +1,93 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate, login
+from rest_framework.exceptions import AuthenticationFailed, Throttled
+from rest_framework_simplejwt.exceptions import TokenError
+from apps.shared.async_api import BadRequest, async_api_view, exception_response, parse_json_body, json_response
+from apps.shared.query_budget import query_budget
+from apps.shared.throttling import acheck_throttle
+from .async_auth import HashingPoolSaturated, run_in_hashing_pool
+from .serializers import LoginSerializer
+from .views import MyTokenObtainPairSerializer
+
+# Async counterparts of login_view and MyTokenObtainPairView, routed instead of
+# them when ASYNC_VIEWS is enabled (the default under RockaeWebAPI.asgi).
+
+
+def busy_response():
+    return json_response(
+        {"error": "Too many login attempts in progress. Please retry shortly."},
+        status=503,
+        headers={"Retry-After": "1"}
+    )
+
+
+def throttled_response(wait):
+    # As DRF answers a throttled request
+    exc = Throttled(wait)
+    response = exception_response(exc)
+    response.headers["Retry-After"] = str(exc.wait)
+    return response
+
+
+# Login View
+@query_budget(10)
+@async_api_view(['POST'])
+async def login_view(request):
+    try:
+        data = parse_json_body(request)
+    except BadRequest as e:
+        return json_response({"detail": str(e)}, status=400)
+
+    wait = await acheck_throttle(request, 'login', data)
+    if wait:
+        return throttled_response(wait)
+
+    serializer = LoginSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+
+    try:
+        user = await run_in_hashing_pool(
+            authenticate,
+            request,
+            username=serializer.validated_data.get('email'),
+            password=serializer.validated_data.get('password')
+        )
+    except HashingPoolSaturated:
+        return busy_response()
+
+    if user is None:
+        return json_response({"error": "Invalid credentials"}, status=401)
+
+    if hasattr(request, 'session'):
+        await sync_to_async(login)(request, user)
+    return json_response({"message": "Logged in successfully"})
+
+
+# Obtain JWT Token View
+@query_budget(2)
+@async_api_view(['POST'])
+async def token_obtain_pair_view(request):
+    try:
+        data = parse_json_body(request)
+    except BadRequest as e:
+        return json_response({"detail": str(e)}, status=400)
+
+    wait = await acheck_throttle(request, 'login', data)
+    if wait:
+        return throttled_response(wait)
+
+    serializer = MyTokenObtainPairSerializer(data=data, context={"request": request})
+    try:
+        # validate() calls authenticate() and may update last_login, so it all runs in the pool
+        valid = await run_in_hashing_pool(serializer.is_valid)
+    except HashingPoolSaturated:
+        return busy_response()
+    except AuthenticationFailed as e:
+        return exception_response(e)
+    except TokenError as e:
+        return json_response({"detail": str(e)}, status=401)
+
+    if not valid:
+        return json_response(serializer.errors, status=400)
+    return json_response(serializer.validated_data)
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.db import router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from apps.shared.cache import StampedLRUCache
+from apps.shared.metrics import register_cache
+
+# Token claim -> User field. "user_id" is taken by the primary key claim,
+# so the public user id travels as "uid".
+USER_CLAIMS = {
+    'email': 'email',
+    'username': 'username',
+    'uid': 'user_id',
+    'is_staff': 'is_staff',
+    'is_superuser': 'is_superuser',
+    'is_verified': 'is_verified',
+}
+
+# primary key -> tuple of the user's concrete field values, checked against a
+# per-user stamp in the shared cache (see StampedLRUCache)
+_users = StampedLRUCache('auth-user', maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+register_cache('users', _users.stats)
+
+
+def add_user_claims(token, user):
+    """Copy the user fields the API needs onto a token."""
+    for claim, field in USER_CLAIMS.items():
+        token[claim] = getattr(user, field)
+    return token
+
+
+def invalidate_cached_user(user_id):
+    """Invalidate a user's cache entries in every process, e.g. after a queryset update()."""
+    _users.invalidate(user_id)
+
+
+def user_cache_stats():
+    return _users.stats()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def _invalidate_on_change(sender, instance, **kwargs):
+    # Covers is_active and password changes, which must not be served stale
+    invalidate_cached_user(instance.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the request user without a database
+    query on most requests.
+
+    By default user rows are kept in a per-process LRU cache for
+    AUTH_USER_CACHE_TTL seconds. Every save or delete of the user replaces
+    its stamp in the shared cache, which each lookup checks, so a
+    deactivation or password change takes effect in every process at once.
+
+    With JWT_STATELESS_USERS the user is built from the token claims alone,
+    so changes such as deactivation only take effect when the access token
+    expires. Tokens issued without the claims fall back to a lookup.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if settings.JWT_STATELESS_USERS and all(claim in validated_token for claim in USER_CLAIMS):
+            return self.user_from_claims(user_id, validated_token)
+
+        if not settings.AUTH_USER_CACHE_TTL:
+            return super().get_user(validated_token)
+
+        values, stamp = _users.lookup(user_id)
+        if values is None:
+            user = super().get_user(validated_token)
+            _users.store(user_id, tuple(getattr(user, name) for name in self.cached_fields()), stamp)
+            return user
+
+        # A fresh instance per request, so views can never share state through the cache
+        user = self.user_model.from_db(router.db_for_read(self.user_model), self.cached_fields(), values)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+    def user_from_claims(self, user_id, validated_token):
+        """Build a saved-looking user from the token; fields that are not claims load lazily."""
+        fields = [self.user_model._meta.pk.attname] + list(USER_CLAIMS.values())
+        values = [user_id] + [validated_token[claim] for claim in USER_CLAIMS]
+        return self.user_model.from_db(router.db_for_read(self.user_model), fields, values)
+
+    def cached_fields(self):
+        return [field.attname for field in self.user_model._meta.concrete_fields]
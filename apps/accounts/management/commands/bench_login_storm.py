@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from apps.shared.bench import summarize_latencies
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure GET /api/quiz/ latency on a running server, first on its own and then "
+        "during a storm of password logins. Compare a WSGI deployment with the ASGI one. "
+        "Every login comes from this host with the same account, so run the server with "
+        "THROTTLE_ENABLED=False: the login throttles would otherwise answer most of the storm "
+        "with 429 before any password is checked, and the command fails if that happens."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--email', required=True, help="Existing account used for both probes and logins.")
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per phase.")
+        parser.add_argument('--storm-concurrency', type=int, default=32)
+        parser.add_argument('--probe-concurrency', type=int, default=4)
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        credentials = {"email": options['email'], "password": options['password']}
+        response = requests.post(f"{base_url}/api/accounts/auth/token/", json=credentials, timeout=30)
+        if response.status_code != 200:
+            raise CommandError(f"Could not obtain a token: {response.status_code} {response.text}")
+        access = response.json()["access"]
+
+        report = {
+            "baseline": self.run_phase(base_url, access, credentials, options, storm=False),
+            "login_storm": self.run_phase(base_url, access, credentials, options, storm=True),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+        throttled = report["login_storm"]["logins"]["statuses"].get(429, 0)
+        if throttled:
+            raise CommandError(
+                f"{throttled} logins were throttled (429), so the storm did not measure password "
+                "checks; restart the server with THROTTLE_ENABLED=False."
+            )
+
+    def run_phase(self, base_url, access, credentials, options, storm):
+        stop = threading.Event()
+        lock = threading.Lock()
+        probe_latencies, login_latencies = [], []
+        login_statuses = {}
+
+        def probe():
+            session = requests.Session()
+            session.headers["Authorization"] = f"Bearer {access}"
+            while not stop.is_set():
+                started = time.perf_counter()
+                session.get(f"{base_url}/api/quiz/", timeout=60)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    probe_latencies.append(elapsed)
+
+        def login():
+            session = requests.Session()
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = session.post(f"{base_url}/api/accounts/auth/login/", json=credentials, timeout=60)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    login_latencies.append(elapsed)
+                    login_statuses[response.status_code] = login_statuses.get(response.status_code, 0) + 1
+
+        threads = [threading.Thread(target=probe) for _ in range(options['probe_concurrency'])]
+        if storm:
+            threads += [threading.Thread(target=login) for _ in range(options['storm_concurrency'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        phase = {"quizzes": summarize_latencies(probe_latencies)}
+        if storm:
+            phase["logins"] = summarize_latencies(login_latencies)
+            phase["logins"]["statuses"] = login_statuses
+            phase["logins"]["per_second"] = round(len(login_latencies) / options['duration'], 1)
+        return phase
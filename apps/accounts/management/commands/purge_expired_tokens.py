@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.accounts.models import OneTimeToken
+
+
+class Command(BaseCommand):
+    help = "Delete expired verification and password reset tokens. Run periodically (e.g. hourly)."
+
+    def handle(self, *args, **options):
+        deleted = OneTimeToken.purge_expired()
+        self.stdout.write(f"Deleted {deleted} expired token(s).")
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.19 on 2026-10-18 07:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_is_verified_user_reset_password_token_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='reset_password_token',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='token_expires_at',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='verification_token',
+        ),
+        migrations.CreateModel(
+            name='OneTimeToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purpose', models.CharField(choices=[('verify', 'Account verification'), ('reset', 'Password reset')], max_length=10)),
+                ('token_hash', models.CharField(max_length=64, unique=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='one_time_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'OneTimeToken',
+                'verbose_name_plural': 'OneTimeTokens',
+                'db_table': 'OneTimeToken',
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
-from django.db import models
+import hashlib
+from django.db import models, connection, connections, router
 from django.utils import timezone
 from django.utils.crypto import get_random_string
 
@@ -33,6 +34,36 @@ class CustomUserManager(BaseUserManager):
             
         return self.create_user(email, username, password, **extra_fields)
 
+    def reserve_ids(self, count):
+        """
+        Reserve `count` primary keys from the table's sequence in one query.
+        Only PostgreSQL has sequences; returns None on other databases.
+        """
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return None
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+                [table, self.model._meta.pk.column, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def assign_user_ids(self, users):
+        """
+        Give unsaved users their primary key and user_id up front, so each one
+        is stored with a single INSERT (which also makes bulk_create possible).
+        Returns False when the database cannot reserve ids.
+        """
+        ids = self.reserve_ids(len(users))
+        if ids is None:
+            return False
+        for user, pk in zip(users, ids):
+            user.pk = pk
+            user.user_id = user.build_user_id()
+        return True
+
 class User(AbstractBaseUser, PermissionsMixin):
     username = models.CharField(max_length=255, unique=True)
     email = models.EmailField(unique=True)
@@ -41,9 +72,6 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     user_id = models.CharField(max_length=20, unique=True, blank=True, null=True)
     is_verified = models.BooleanField(default=False)
-    verification_token = models.CharField(max_length=64, blank=True, null=True)
-    reset_password_token = models.CharField(max_length=64, blank=True, null=True)
-    token_expires_at = models.DateTimeField(blank=True, null=True)
 
     objects = CustomUserManager()
 
@@ -51,33 +79,109 @@ class User(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ['username']
 
     def generate_verification_token(self):
-        self.verification_token = get_random_string(length=64)
-        self.token_expires_at = timezone.now() + timezone.timedelta(hours=24)
-        self.save(update_fields=['verification_token', 'token_expires_at'])
+        """Issue a new account verification token (valid for 24 hours) and return it."""
+        return OneTimeToken.issue(self, OneTimeToken.PURPOSE_VERIFY, timezone.timedelta(hours=24))
 
     def generate_reset_token(self):
-        self.reset_password_token = get_random_string(length=64)
-        self.token_expires_at = timezone.now() + timezone.timedelta(hours=1)
-        self.save(update_fields=['reset_password_token', 'token_expires_at'])
+        """Issue a new password reset token (valid for 1 hour) and return it."""
+        return OneTimeToken.issue(self, OneTimeToken.PURPOSE_RESET, timezone.timedelta(hours=1))
 
     def __str__(self):
         return self.username
     
+    def build_user_id(self):
+        prefix = "ADM" if self.is_superuser else "USR"
+        return f"{prefix}{self.pk}"
+
     def save(self, *args, **kwargs):
         """
-        Override the save method so that if the user_id is not set,
-        we assign it after the user is saved and a primary key is available.
+        Override the save method so that if the user_id is not set, it is
+        written together with the new row: the primary key is reserved from
+        the sequence first, so user_id can be built before the INSERT.
         """
         is_new = self.pk is None
+        if is_new and not self.user_id:
+            using = kwargs.get('using') or router.db_for_write(User, instance=self)
+            if User.objects.db_manager(using).assign_user_ids([self]):
+                kwargs['force_insert'] = True
         super().save(*args, **kwargs)
-        # Only update the user_id if the instance is new and user_id is not already set.
+        # Databases without sequences: assign the user_id once the primary key is known.
         if is_new and not self.user_id:
-            prefix = "ADM" if self.is_superuser else "USR"
-            self.user_id = f"{prefix}{self.pk}"
+            self.user_id = self.build_user_id()
             # Update the database directly to avoid recursive saving
             User.objects.filter(pk=self.pk).update(user_id=self.user_id)
     
     class Meta:
         db_table = 'User'
         verbose_name = 'User'
-        verbose_name_plural = 'Users'
\ No newline at end of file
+        verbose_name_plural = 'Users'
+
+
+class OneTimeToken(models.Model):
+    """
+    Verification and password reset tokens. Only a SHA-256 hash of each
+    token is stored; the raw token exists solely in the email link.
+    """
+    PURPOSE_VERIFY = 'verify'
+    PURPOSE_RESET = 'reset'
+    PURPOSE_CHOICES = [
+        (PURPOSE_VERIFY, 'Account verification'),
+        (PURPOSE_RESET, 'Password reset'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='one_time_tokens')
+    purpose = models.CharField(max_length=10, choices=PURPOSE_CHOICES)
+    token_hash = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.purpose} token for user {self.user_id}"
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user, purpose, lifetime):
+        """
+        Create a token for the user, replacing any outstanding token with the
+        same purpose, and return the raw token.
+        """
+        token = get_random_string(length=64)
+        cls.objects.filter(user=user, purpose=purpose).delete()
+        cls.objects.create(
+            user=user,
+            purpose=purpose,
+            token_hash=cls.hash_token(token),
+            expires_at=timezone.now() + lifetime,
+        )
+        return token
+
+    @classmethod
+    def redeem(cls, token, purpose):
+        """
+        Consume a token with a single conditional DELETE ... RETURNING.
+        Returns the owning user's id, or None if the token is unknown,
+        expired or was already used.
+        """
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE token_hash = %s AND purpose = %s AND expires_at > %s RETURNING user_id",
+                [cls.hash_token(token), purpose, now],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def purge_expired(cls):
+        """Delete expired tokens; returns the number of rows removed."""
+        deleted, _ = cls.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+    class Meta:
+        db_table = 'OneTimeToken'
+        verbose_name = 'OneTimeToken'
+        verbose_name_plural = 'OneTimeTokens'
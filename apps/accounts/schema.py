@@ -0,0 +1,10 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+# OpenAPI extensions of this app. Imported by AccountsConfig.ready() only
+# where drf_spectacular is installed, which is wherever a schema can be
+# generated, so slim API workers never load drf_spectacular's extensions.
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Documents CachedJWTAuthentication as the same bearer scheme in the OpenAPI schema."""
+    target_class = 'apps.accounts.authentication.CachedJWTAuthentication'
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import User
 from django.contrib.auth import get_user_model
-from django.utils import timezone
+from django.db import transaction
 import re
 
 User = get_user_model()
@@ -15,11 +15,15 @@ class RegisterationSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        return User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password']
-        )
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=validated_data['username'],
+                email=validated_data['email'],
+                password=validated_data['password']
+            )
+            # Nothing else to do: the user's profile is created by a post_save
+            # handler (apps.backend.profiles) in the same transaction
+        return user
     
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -70,17 +74,6 @@ class ResetPasswordSerializer(serializers.Serializer):
 
 class VerificationSerializer(serializers.Serializer):
     """Serializer to handle account verification"""
-    token = serializers.CharField()
-
-    def validate_token(self, value):
-        """Check if token exists and is still valid"""
-        user = User.objects.filter(verification_token=value).first()
-
-        if not user:
-            raise serializers.ValidationError("Invalid verification token.")
-
-        if user.token_expires_at and timezone.now() > user.token_expires_at:
-            raise serializers.ValidationError("Verification token has expired.")
-
-        return value
+    # The token itself is checked when it is redeemed, in a single query.
+    token = serializers.CharField(max_length=64)
 
@@ -0,0 +1,232 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import path
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.backend.models import UserProfile
+from apps.shared import throttling
+from apps.shared.query_budget import assert_within_query_budget
+from . import async_auth, async_views, authentication
+from .models import User
+
+PASSWORD = "Budget-pass-123"
+
+
+# The middleware only logs, so a request over budget fails in the helper, which lists its queries
+@override_settings(
+    QUERY_BUDGET_ACTION='log',
+    THROTTLE_ENABLED=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class QueryBudgetTests(TestCase):
+    """Every account endpoint stays within its @query_budget, with cold caches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="budget@example.com", username="budget", password=PASSWORD)
+
+    def setUp(self):
+        cache.clear()
+        authentication._users.clear()
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        return assert_within_query_budget(self.client, method, path, secure=True, **kwargs)
+
+    def test_register(self):
+        data = {'username': 'newcomer', 'email': 'newcomer@example.com', 'password': PASSWORD}
+        self.assertEqual(self.request('post', '/api/accounts/auth/register/', data=data).status_code, 201)
+
+    def test_login(self):
+        data = {'email': self.user.email, 'password': PASSWORD}
+        self.assertEqual(self.request('post', '/api/accounts/auth/login/', data=data).status_code, 200)
+
+    def test_token_obtain_and_refresh(self):
+        data = {'email': self.user.email, 'password': PASSWORD}
+        response = self.request('post', '/api/accounts/auth/token/', data=data)
+        self.assertEqual(response.status_code, 200)
+        refresh = self.request('post', '/api/accounts/auth/token/refresh/', data={'refresh': response.json()['refresh']})
+        self.assertEqual(refresh.status_code, 200)
+
+    def test_verification(self):
+        token = RefreshToken.for_user(self.user).access_token
+        response = self.request('post', '/api/accounts/send-verification-email/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 200)
+        verification_token = self.user.generate_verification_token()
+        self.assertEqual(self.request('post', f'/api/accounts/verify/{verification_token}/').status_code, 200)
+
+    def test_password_reset(self):
+        response = self.request('post', '/api/accounts/send-password-reset-email/', data={'email': self.user.email})
+        self.assertEqual(response.status_code, 200)
+        reset_token = self.user.generate_reset_token()
+        data = {'password': 'Another456pass', 'confirm_password': 'Another456pass'}
+        self.assertEqual(self.request('post', f'/api/accounts/reset-password/{reset_token}/', data=data).status_code, 200)
+
+
+@override_settings(AUTH_USER_CACHE_TTL=60, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CachedUserTests(TestCase):
+    """A change saved by another worker takes effect here although this worker has the user cached."""
+
+    def setUp(self):
+        # simplejwt binds api_settings at import, so SIMPLE_JWT cannot be overridden per test
+        revoke = mock.patch.object(authentication.api_settings, 'CHECK_REVOKE_TOKEN', True)
+        revoke.start()
+        self.addCleanup(revoke.stop)
+        cache.clear()
+        authentication._users.clear()
+        self.user = User.objects.create_user(email="cached@example.com", username="cached", password=PASSWORD)
+        self.token = RefreshToken.for_user(self.user).access_token
+
+    def get_profile(self):
+        return self.client.get('/api/user/profile/', secure=True, HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def change_in_another_worker(self, change):
+        self.assertEqual(self.get_profile().status_code, 200)
+        cached_entry = authentication._users.get(self.user.pk)
+        self.assertIsNotNone(cached_entry)
+        with self.captureOnCommitCallbacks(execute=True):
+            change(self.user)
+            self.user.save()
+        # The save only dropped this worker's entry because it ran here
+        authentication._users.set(self.user.pk, cached_entry)
+
+    def test_deactivated_user_is_rejected(self):
+        self.change_in_another_worker(lambda user: setattr(user, 'is_active', False))
+        response = self.get_profile()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'user_inactive')
+
+    def test_token_is_rejected_after_password_change(self):
+        self.change_in_another_worker(lambda user: user.set_password('Changed456pass'))
+        response = self.get_profile()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'password_changed')
+
+    def test_unchanged_user_is_served_from_cache(self):
+        self.assertEqual(self.get_profile().status_code, 200)
+        with self.assertNumQueries(1):  # The profile, but not the user
+            self.assertEqual(self.get_profile().status_code, 200)
+
+
+class HashingPoolTests(SimpleTestCase):
+    def run_in_pool(self, func):
+        calls = []
+        with mock.patch.object(async_auth, 'close_old_connections', lambda: calls.append('close')):
+            try:
+                async_to_sync(async_auth.run_in_hashing_pool)(func, calls)
+            except ValueError:
+                pass
+        return calls
+
+    def test_connection_is_released_after_each_call(self):
+        self.assertEqual(self.run_in_pool(lambda calls: calls.append('check')), ['close', 'check', 'close'])
+
+    def test_connection_is_released_after_a_failed_call(self):
+        def fail(calls):
+            calls.append('check')
+            raise ValueError()
+        self.assertEqual(self.run_in_pool(fail), ['close', 'check', 'close'])
+
+
+class ProvisionUsersTests(TestCase):
+    rows = (
+        "email,username,password\n"
+        "ada@example.com,ada,correct-horse\n"
+        "grace@example.com,grace,\n"
+        "ada@example.com,ada2,duplicate-email\n"
+        ",nobody,missing-email\n"
+        "taken@example.com,taken,existing-account\n"
+    )
+
+    def setUp(self):
+        User.objects.create_user(email="taken@example.com", username="taken")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def provision(self, content, name='users.csv', *args):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        stdout, stderr = StringIO(), StringIO()
+        call_command('provision_users', path, '--jobs', '1', *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_dry_run_validates_without_writing(self):
+        stdout, stderr = self.provision(self.rows, 'users.csv', '--dry-run')
+
+        self.assertIn("Done: 2 created, 3 skipped", stdout)
+        self.assertIn("Skipping existing user: taken@example.com", stderr)
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ["taken"])
+
+    def test_creates_users_with_profiles(self):
+        stdout, _ = self.provision(self.rows)
+
+        self.assertIn("Done: 2 created, 3 skipped", stdout)
+        ada, grace = User.objects.get(username="ada"), User.objects.get(username="grace")
+        self.assertTrue(ada.check_password("correct-horse"))
+        self.assertFalse(grace.has_usable_password())  # Has to reset it
+        for user in (ada, grace):
+            self.assertEqual(user.user_id, user.build_user_id())
+            self.assertTrue(UserProfile.objects.filter(user=user).exists())
+
+    def test_invalid_jsonl_line(self):
+        with self.assertRaisesMessage(CommandError, "Line 2: invalid JSON"):
+            self.provision('{"email": "ada@example.com", "username": "ada"}\n{oops\n', 'users.jsonl')
+
+
+# The async views, routed as accounts/urls.py does when ASYNC_VIEWS is on (under RockaeWebAPI.asgi)
+urlpatterns = [
+    path('api/accounts/auth/login/', async_views.login_view),
+    path('api/accounts/auth/token/', async_views.token_obtain_pair_view),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncLoginTests(TransactionTestCase):
+    """
+    The async login views answer like the DRF views they replace, through
+    the ASGI handler. Password checks run on the hashing pool's own threads
+    and connections, which would not see a TestCase's uncommitted user.
+    """
+
+    def setUp(self):
+        User.objects.create_user(email="async@example.com", username="async", password=PASSWORD)
+        authentication._users.clear()
+        store = mock.patch.object(throttling, '_local_store', throttling.LocalBucketStore())
+        store.start()
+        self.addCleanup(store.stop)
+
+    def post(self, url, data):
+        async def send():
+            return await self.async_client.post(url, data, content_type='application/json', secure=True)
+        return async_to_sync(send)()
+
+    def test_login(self):
+        response = self.post('/api/accounts/auth/login/', {'email': 'async@example.com', 'password': PASSWORD})
+        self.assertEqual((response.status_code, response.json()), (200, {"message": "Logged in successfully"}))
+        response = self.post('/api/accounts/auth/login/', {'email': 'async@example.com', 'password': 'wrong'})
+        self.assertEqual((response.status_code, response.json()), (401, {"error": "Invalid credentials"}))
+
+    def test_token_pair(self):
+        response = self.post('/api/accounts/auth/token/', {'email': 'async@example.com', 'password': PASSWORD})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'access', 'refresh'})
+        self.assertEqual(self.post('/api/accounts/auth/token/', {'email': 'async@example.com', 'password': 'wrong'}).status_code, 401)
+
+    def test_attempts_are_throttled_per_account(self):
+        for _ in range(10):
+            self.post('/api/accounts/auth/login/', {'email': 'async@example.com', 'password': 'wrong'})
+        response = self.post('/api/accounts/auth/login/', {'email': 'async@example.com', 'password': PASSWORD})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_saturated_hashing_pool(self):
+        with mock.patch.object(async_views, 'run_in_hashing_pool', side_effect=async_auth.HashingPoolSaturated):
+            response = self.post('/api/accounts/auth/login/', {'email': 'async@example.com', 'password': PASSWORD})
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '1'))
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path
 from .views import login_view,register_view,MyTokenObtainPairView,MyTokenRefreshView,send_verification_email_view,reset_password_view,send_password_reset_email_view,verify_account_view
 
+token_obtain_pair_view = MyTokenObtainPairView.as_view()
+if settings.ASYNC_VIEWS:
+    # Under ASGI, password checks run in a bounded pool off the event loop
+    from apps.shared.async_api import documented_as
+    from . import async_views
+    login_view = documented_as(async_views.login_view, login_view)
+    token_obtain_pair_view = documented_as(async_views.token_obtain_pair_view, token_obtain_pair_view)
+
 urlpatterns = [
-    path('auth/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('auth/token/', token_obtain_pair_view, name='token_obtain_pair'),
     path('auth/token/refresh/', MyTokenRefreshView.as_view(), name='token_refresh'),
     path('auth/register/', register_view, name='register'),
     path('auth/login/', login_view, name='login'),
@@ -1,4 +1,4 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny,IsAuthenticated
@@ -6,18 +6,22 @@ from django.contrib.auth import authenticate, login
 from .serializers import RegisterationSerializer, LoginSerializer,ResetPasswordSerializer,ResetPasswordRequestSerializer,VerificationSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from drf_spectacular.utils import extend_schema, extend_schema_view
 from rest_framework_simplejwt.views import TokenRefreshView
-from django.utils import timezone
+from django.db import transaction
 from django.contrib.auth import get_user_model
-import requests  # For SMTP API
 from django.conf import settings
 from apps.shared.models import InternalServerError
 from apps.shared.util import send_email
+from apps.shared.query_budget import query_budget
+from apps.shared.openapi import extend_schema, extend_schema_view
+from apps.shared.throttling import LoginThrottle, PasswordResetThrottle, RegisterThrottle
+from .models import OneTimeToken
+from .authentication import add_user_claims, invalidate_cached_user
 
 User = get_user_model()
 
 #Register View
+@query_budget(6)
 @extend_schema(
     request=RegisterationSerializer,
     responses={201: {"message": "User created successfully"}},
@@ -27,6 +31,7 @@ User = get_user_model()
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([RegisterThrottle])
 def register_view(request):
     try:
         serializer = RegisterationSerializer(data=request.data)
@@ -39,6 +44,7 @@ def register_view(request):
         raise InternalServerError()
 
 # Login View
+@query_budget(10)
 @extend_schema(
     request=LoginSerializer,
     responses={
@@ -51,6 +57,7 @@ def register_view(request):
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginThrottle])
 def login_view(request):
     try:
         # Validate request data using the serializer
@@ -61,7 +68,9 @@ def login_view(request):
             
             user = authenticate(request, username=email, password=password)
             if user is not None:
-                login(request, user)
+                # Sessions are not installed in the slim RUNTIME_PROFILE
+                if hasattr(request, 'session'):
+                    login(request, user)
                 return Response({"message": "Logged in successfully"}, status=status.HTTP_200_OK)
             else:
                 return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
@@ -78,9 +87,8 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         token = super().get_token(user)
 
-        # Add custom claims if needed
-        token['email'] = user.email
-        return token
+        # Custom claims, so requests can be authenticated without loading the user
+        return add_user_claims(token, user)
 
     def validate(self, attrs):
         # 'username' here expects the USERNAME_FIELD, so pass 'email' from request
@@ -88,6 +96,7 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         return super().validate(attrs)
 
 
+@query_budget(2)
 @extend_schema_view(
     post=extend_schema(
         tags=["Authentication"],
@@ -97,7 +106,9 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 )
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
+    throttle_classes = [LoginThrottle]
 
+@query_budget(2)
 @extend_schema_view(
     post=extend_schema(
         tags=["Authentication"],
@@ -112,6 +123,7 @@ class MyTokenRefreshView(TokenRefreshView):
 
 
 # Send Verification Email
+@query_budget(6)
 @extend_schema(
     request=None,
     responses={200: {"message": "Verification email sent"}},
@@ -128,10 +140,10 @@ def send_verification_email_view(request):
         if user.is_verified:
             return Response({"message": "User already verified"}, status=status.HTTP_400_BAD_REQUEST)
         
-        user.generate_verification_token()
-        verification_link = f"{settings.PORTAL_WEB_APP_URL}/verify/{user.verification_token}"
+        token = user.generate_verification_token()
+        verification_link = f"{settings.PORTAL_WEB_APP_URL}/verify/{token}"
 
-        # Send email via SMTP API
+        # Queue email for the SMTP API
         # Prepare email details
         subject = "Welcome to Rockea"
         body = f"Hi {user.username}, Welcome to Rockea. The team really loves you! Click the link below to verify your account:\n\n{verification_link}"
@@ -148,6 +160,7 @@ def send_verification_email_view(request):
     
 
 # Verify Account View
+@query_budget(4)
 @extend_schema(
     request=VerificationSerializer,
     responses={200: {"message": "Account verified successfully"}},
@@ -157,18 +170,19 @@ def send_verification_email_view(request):
 )
 @api_view(['POST'])  # Change to POST to accept a JSON body
 @permission_classes([AllowAny])
-def verify_account_view(request):
+def verify_account_view(request, verification_token=None):
     try:
-        serializer = VerificationSerializer(data=request.data)
+        # The token may come in the JSON body or, as in the email link, in the URL
+        serializer = VerificationSerializer(data={"token": request.data.get("token") or verification_token})
         
         if serializer.is_valid():
             token = serializer.validated_data.get("token")
-            user = User.objects.filter(verification_token=token).first()
-
-            user.is_verified = True
-            user.verification_token = None
-            user.token_expires_at = None
-            user.save(update_fields=['is_verified', 'verification_token', 'token_expires_at'])
+            with transaction.atomic():
+                user_id = OneTimeToken.redeem(token, OneTimeToken.PURPOSE_VERIFY)
+                if user_id is None:
+                    return Response({"error": "Invalid or expired verification token."}, status=status.HTTP_400_BAD_REQUEST)
+                User.objects.filter(pk=user_id).update(is_verified=True)
+            invalidate_cached_user(user_id)
 
             return Response({"message": "Account verified successfully"}, status=status.HTTP_200_OK)
         
@@ -179,6 +193,7 @@ def verify_account_view(request):
 
 
 # Password Reset Request View
+@query_budget(8)
 @extend_schema(
     request=ResetPasswordRequestSerializer,
     responses={200: {"message": "Password reset email sent"}},
@@ -188,6 +203,7 @@ def verify_account_view(request):
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([PasswordResetThrottle])
 def send_password_reset_email_view(request):
     try:
         serializer = ResetPasswordRequestSerializer(data=request.data)
@@ -196,16 +212,17 @@ def send_password_reset_email_view(request):
             user = User.objects.filter(email=email).first()
             
             if user:
-                user.generate_reset_token()  # Generates a reset token
-                reset_link = f"{settings.PORTAL_WEB_APP_URL}/reset-password/{user.reset_password_token}"
-
-                # Send email via SMTP API
-                email_data = {
-                    "to": user.email,
-                    "subject": "Reset Your Password",
-                    "body": f"Click the link to reset your password: {reset_link}"
-                }
-                requests.post(settings.SMTP_SEND_MAIL_URL, json=email_data, headers={"Authorization": f"Bearer {settings.SMTP_API_KEY}"})
+                token = user.generate_reset_token()  # Generates a reset token
+                reset_link = f"{settings.PORTAL_WEB_APP_URL}/reset-password/{token}"
+
+                # Queue email for the SMTP API
+                subject = "Reset Your Password"
+                body = f"Click the link to reset your password: {reset_link}"
+                recipients = [{
+                    "name": user.username,
+                    "email": user.email
+                }]
+                send_email(subject, body, recipients)
 
             return Response({"message": "Password reset email sent"}, status=status.HTTP_200_OK)
         
@@ -216,6 +233,7 @@ def send_password_reset_email_view(request):
 
 
 # Reset Password View
+@query_budget(6)
 @extend_schema(
     request=ResetPasswordSerializer,
     responses={200: {"message": "Password reset successful"}},
@@ -225,23 +243,20 @@ def send_password_reset_email_view(request):
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
-def reset_password_view(request, token):
+@throttle_classes([PasswordResetThrottle])
+def reset_password_view(request, reset_token):
     try:
         serializer = ResetPasswordSerializer(data=request.data)
         if serializer.is_valid():
-            user = User.objects.filter(reset_password_token=token).first()
-
-            if user is None:
-                return Response({"error": "Invalid token"}, status=status.HTTP_400_BAD_REQUEST)
-            
-            if user.token_expires_at and timezone.now() > user.token_expires_at:
-                return Response({"error": "Reset token expired"}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Update password
-            user.set_password(serializer.validated_data.get('password'))
-            user.reset_password_token = None
-            user.token_expires_at = None
-            user.save(update_fields=['password', 'reset_password_token', 'token_expires_at'])
+            with transaction.atomic():
+                user_id = OneTimeToken.redeem(reset_token, OneTimeToken.PURPOSE_RESET)
+                if user_id is None:
+                    return Response({"error": "Invalid or expired reset token"}, status=status.HTTP_400_BAD_REQUEST)
+
+                # Update password
+                user = User.objects.get(pk=user_id)
+                user.set_password(serializer.validated_data.get('password'))
+                user.save(update_fields=['password'])
 
             return Response({"message": "Password reset successful"}, status=status.HTTP_200_OK)
         
@@ -0,0 +1,53 @@
+from django.contrib import admin
+from .models import UserProfile, QuizPool, QuizQuestion, QuizResult, QuizScoreStats
+
+# Every list joins the relations that its columns and __str__ read, so a
+# changelist page costs the same few queries however many rows it shows.
+# Foreign keys use raw id inputs instead of <select>s listing every row.
+
+
+@admin.register(UserProfile)
+class UserProfileAdmin(admin.ModelAdmin):
+    list_display = ('id', 'firstname', 'lastname', 'user')
+    list_select_related = ('user',)
+    search_fields = ('firstname', 'lastname', 'user__email')
+    raw_id_fields = ('user',)
+
+
+@admin.register(QuizPool)
+class QuizPoolAdmin(admin.ModelAdmin):
+    list_display = ('id', 'quiz_title', 'user', 'create_date', 'version')
+    list_select_related = ('user',)
+    search_fields = ('quiz_title', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('version',)
+
+
+@admin.register(QuizQuestion)
+class QuizQuestionAdmin(admin.ModelAdmin):
+    list_display = ('id', '__str__', 'correct_answer')
+    list_select_related = ('quiz',)
+    search_fields = ('question_text',)
+    raw_id_fields = ('quiz',)
+
+
+@admin.register(QuizResult)
+class QuizResultAdmin(admin.ModelAdmin):
+    list_display = ('id', 'quiz', 'candidate_name', 'candidate_app_id', 'score', 'completion_date')
+    list_select_related = ('quiz',)
+    search_fields = ('candidate_name', 'candidate_app_id')
+    raw_id_fields = ('quiz',)
+
+
+@admin.register(QuizScoreStats)
+class QuizScoreStatsAdmin(admin.ModelAdmin):
+    # Maintained by apps.backend.results; rebuild with `manage.py rebuild_quiz_stats`
+    list_display = ('quiz', 'bucket', 'count', 'score_sum')
+    list_select_related = ('quiz',)
+    raw_id_fields = ('quiz',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
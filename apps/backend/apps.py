@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class BackendConfig(AppConfig):
+    name = 'apps.backend'
+
+    def ready(self):
+        # Connects the profile signal handlers, which management commands such
+        # as createsuperuser need too (they never import the URLconf)
+        from . import profiles  # noqa: F401
@@ -0,0 +1,135 @@
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from rest_framework.exceptions import NotFound
+from apps.shared.async_api import BadRequest, async_api_view, exception_response, parse_json_body, json_response
+from apps.shared.query_budget import query_budget
+from .models import UserProfile, QuizPool, QuizQuestion
+from .serializers import UserProfileSerializer, QuizSerializer, QuizListSerializer, QuestionSerializer, QuizSubmissionSerializer
+from .grading import aget_answer_key, grade
+from .results import create_result
+from .idempotency import REPLAY_HEADERS, InvalidIdempotencyKey, get_idempotency_key, find_response, remember_response
+from .pagination import KeysetPagination
+from .profiles import aget_profile_data, remember_profile
+
+# Async counterparts of the views in views.py, using Django's async ORM API.
+# They are routed instead of the DRF views when ASYNC_VIEWS is enabled (the
+# default under RockaeWebAPI.asgi); request and response bodies are the same.
+
+
+def bad_request(e):
+    return json_response({"detail": str(e)}, status=400)
+
+
+# ----------------- USER PROFILE MANAGEMENT -----------------
+@query_budget(5)
+@async_api_view(['GET', 'PUT'], authenticated=True)
+async def user_profile(request):
+    if request.method == 'GET':
+        return json_response(await aget_profile_data(request.user))
+
+    profile = await UserProfile.objects.aget(user_id=request.user.id)
+    try:
+        data = parse_json_body(request)
+    except BadRequest as e:
+        return bad_request(e)
+    serializer = UserProfileSerializer(profile, data=data, partial=True)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+    for field, value in serializer.validated_data.items():
+        setattr(profile, field, value)
+    await profile.asave()
+    return json_response(await sync_to_async(remember_profile)(profile))
+
+# ----------------- QUIZ MANAGEMENT -----------------
+
+@query_budget(3)
+@async_api_view(['GET', 'POST'], authenticated=True)
+async def quizzes(request):
+    if request.method == 'GET':
+        paginator = KeysetPagination()
+        quizzes = QuizPool.objects.filter(user=request.user).with_counts()
+        try:
+            page = await paginator.apaginate_queryset(quizzes, request)
+        except NotFound as e:
+            return exception_response(e)
+        serializer = QuizListSerializer(page, many=True)
+        return json_response(paginator.get_paginated_data(serializer.data))
+
+    try:
+        data = parse_json_body(request)
+    except BadRequest as e:
+        return bad_request(e)
+    serializer = QuizSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+    quiz = await QuizPool.objects.acreate(user=request.user, **serializer.validated_data)
+    return json_response(QuizSerializer(quiz).data, status=201)
+
+# ----------------- QUIZ QUESTIONS MANAGEMENT -----------------
+
+@query_budget(5)
+@async_api_view(['POST'], authenticated=True)
+async def add_question(request, quiz_id):
+    quiz = await QuizPool.objects.filter(id=quiz_id).afirst()
+    if quiz is None:
+        return json_response({"error": "Quiz not found"}, status=404)
+
+    try:
+        data = parse_json_body(request)
+    except BadRequest as e:
+        return bad_request(e)
+    serializer = QuestionSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+    question = await QuizQuestion.objects.acreate(quiz=quiz, **serializer.validated_data)
+    return json_response(QuestionSerializer(question).data, status=201)
+
+# ----------------- QUIZ RESULTS MANAGEMENT -----------------
+
+@query_budget(8)
+@async_api_view(['POST'], authenticated=True)
+async def submit_quiz(request, quiz_id):
+    try:
+        idempotency_key = get_idempotency_key(request)
+    except InvalidIdempotencyKey as e:
+        return json_response({"error": str(e)}, status=400)
+    if idempotency_key:
+        replay = await sync_to_async(find_response)(quiz_id, request.user.id, idempotency_key)
+        if replay is not None:
+            return json_response(replay, status=201, headers=REPLAY_HEADERS)
+
+    quiz = await QuizPool.objects.filter(id=quiz_id).afirst()
+    if quiz is None:
+        return json_response({"error": "Quiz not found"}, status=404)
+
+    try:
+        data = parse_json_body(request)
+    except BadRequest as e:
+        return bad_request(e)
+    serializer = QuizSubmissionSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+
+    answers = serializer.validated_data['answers']
+    answer_key = await aget_answer_key(quiz)
+    unknown = [question_id for question_id in answers if question_id not in answer_key]
+    if unknown:
+        return json_response({"error": f"Unknown question ids: {unknown}"}, status=400)
+
+    result = grade(answer_key, answers)
+    try:
+        quiz_result = await sync_to_async(create_result)(
+            quiz,
+            candidate_name=serializer.validated_data['candidate_name'],
+            candidate_app_id=serializer.validated_data.get('candidate_app_id'),
+            score=result.score,
+            idempotency_key=idempotency_key,
+            submitted_by_id=request.user.id,
+        )
+    except IntegrityError:
+        # A concurrent request with the same key stored its result first
+        replay = await sync_to_async(find_response)(quiz_id, request.user.id, idempotency_key) if idempotency_key else None
+        if replay is None:
+            raise
+        return json_response(replay, status=201, headers=REPLAY_HEADERS)
+    return json_response(await sync_to_async(remember_response)(quiz_result), status=201)
@@ -0,0 +1,64 @@
+import random
+from collections import namedtuple
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from apps.accounts.models import User
+from .models import ANSWER_CHOICES, QuizPool, QuizQuestion, QuizResult
+from .profiles import create_profiles
+from .results import rebuild_quiz_stats
+
+BENCH_PASSWORD = "Benchpass123"
+
+# users: [User]; quizzes: {user pk: [quiz id]}; questions: {quiz id: [question id]}
+Dataset = namedtuple("Dataset", ["users", "quizzes", "questions", "password"])
+
+
+def seed_dataset(users=50, quizzes_per_user=4, questions_per_quiz=20, results_per_quiz=200, seed=42):
+    """
+    Insert a deterministic synthetic dataset with bulk inserts and return
+    the ids needed to address it. All users share one password, hashed once.
+    """
+    rng = random.Random(seed)
+    letters = [choice for choice, _ in ANSWER_CHOICES]
+    password = make_password(BENCH_PASSWORD)
+
+    with transaction.atomic():
+        user_objs = [
+            User(email=f"bench-{seed}-{i}@example.com", username=f"bench-{seed}-{i}", password=password)
+            for i in range(users)
+        ]
+        if User.objects.assign_user_ids(user_objs):
+            User.objects.bulk_create(user_objs)
+        else:
+            user_objs = User.objects.bulk_create(user_objs)
+            for user in user_objs:
+                user.user_id = user.build_user_id()
+            User.objects.bulk_update(user_objs, ['user_id'])
+        create_profiles(user_objs)
+
+        quiz_objs = QuizPool.objects.bulk_create([
+            QuizPool(quiz_title=f"Bench quiz {i}", user=user)
+            for user in user_objs for i in range(quizzes_per_user)
+        ])
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(
+                quiz=quiz,
+                question_text=f"Question {i}",
+                answer_a="A", answer_b="B", answer_c="C", answer_d="D",
+                correct_answer=rng.choice(letters),
+            )
+            for quiz in quiz_objs for i in range(questions_per_quiz)
+        ], batch_size=1000)
+        QuizResult.objects.bulk_create([
+            QuizResult(quiz=quiz, candidate_name=f"Candidate {i}", score=rng.randint(0, 100))
+            for quiz in quiz_objs for i in range(results_per_quiz)
+        ], batch_size=1000)
+        rebuild_quiz_stats([quiz.pk for quiz in quiz_objs])
+
+    quizzes = {}
+    for quiz in quiz_objs:
+        quizzes.setdefault(quiz.user_id, []).append(quiz.pk)
+    questions = {}
+    for quiz_id, question_id in QuizQuestion.objects.filter(quiz__in=quiz_objs).values_list('quiz_id', 'id'):
+        questions.setdefault(quiz_id, []).append(question_id)
+    return Dataset(user_objs, quizzes, questions, BENCH_PASSWORD)
@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+from apps.shared.fastjson import dumps
+from .models import QuizResult
+
+EXPORT_FIELDS = ('id', 'candidate_name', 'candidate_app_id', 'completion_date', 'score')
+EXPORT_CHUNK_SIZE = 2000
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Lets ?format= select an export format. Export bodies are streamed by
+    the view itself; the renderer only has to render error payloads.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class ResultExport:
+    """
+    Streams the results of a quiz as CSV or NDJSON. Rows are read through
+    a server-side cursor and encoded (and optionally gzipped) one chunk at
+    a time, so memory use does not grow with the number of results.
+
+    Iterate it with iter() under WSGI and aiter() under ASGI.
+    """
+
+    def __init__(self, quiz_id, fmt, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+        self.queryset = QuizResult.objects.filter(quiz_id=quiz_id).order_by('id').values_list(*EXPORT_FIELDS)
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+        self.json_encoder = DjangoJSONEncoder()
+
+    def __iter__(self):
+        yield self.start()
+        rows = self.queryset.iterator(chunk_size=self.chunk_size)
+        for batch in iter(lambda: self.next_batch(rows), []):
+            yield self.encode(batch)
+        yield self.finish()
+
+    async def __aiter__(self):
+        # QuerySet.aiterator() runs values_list() queries on the event loop in
+        # Django 4.2, so batches are pulled from the sync iterator in a thread.
+        yield self.start()
+        rows = self.queryset.iterator(chunk_size=self.chunk_size)
+        next_batch = sync_to_async(self.next_batch)
+        while batch := await next_batch(rows):
+            yield self.encode(batch)
+        yield self.finish()
+
+    def next_batch(self, rows):
+        return list(islice(rows, self.chunk_size))
+
+    def start(self):
+        if self.fmt == 'csv':
+            return self.compress(self.to_csv([EXPORT_FIELDS]).encode())
+        return b''
+
+    def encode(self, rows):
+        rows = [self.format_row(row) for row in rows]
+        if self.fmt == 'csv':
+            return self.compress(self.to_csv(rows).encode())
+        return self.compress(b''.join(dumps(dict(zip(EXPORT_FIELDS, row))) + b'\n' for row in rows))
+
+    def format_row(self, row):
+        # Same datetime format as the JSON API
+        return [self.json_encoder.default(value) if hasattr(value, 'isoformat') else value for value in row]
+
+    def to_csv(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def compress(self, data):
+        return self.compressor.compress(data) if self.compressor else data
+
+    def finish(self):
+        return self.compressor.flush() if self.compressor else b''
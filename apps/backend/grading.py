@@ -0,0 +1,60 @@
+from collections import namedtuple
+from apps.shared.cache import LRUCache
+from apps.shared.metrics import register_cache
+from .models import QuizQuestion
+
+GradeResult = namedtuple("GradeResult", ["correct", "total", "score"])
+
+# quiz id -> (quiz version, {question id: correct answer})
+_answer_keys = LRUCache(maxsize=512)
+register_cache('answer_keys', _answer_keys.stats)
+
+
+def get_answer_key(quiz):
+    """
+    Return the answer key of a quiz as a {question_id: correct_answer} dict.
+    The key is loaded with a single query and cached per process until the
+    quiz version changes.
+    """
+    cached = _answer_keys.get(quiz.pk)
+    if cached is not None and cached[0] == quiz.version:
+        return cached[1]
+
+    answer_key = dict(
+        QuizQuestion.objects.filter(quiz_id=quiz.pk).values_list('id', 'correct_answer')
+    )
+    _answer_keys.set(quiz.pk, (quiz.version, answer_key))
+    return answer_key
+
+
+async def aget_answer_key(quiz):
+    """Async variant of get_answer_key() for the async views."""
+    cached = _answer_keys.get(quiz.pk)
+    if cached is not None and cached[0] == quiz.version:
+        return cached[1]
+
+    rows = QuizQuestion.objects.filter(quiz_id=quiz.pk).values_list('id', 'correct_answer')
+    answer_key = {question_id: correct_answer async for question_id, correct_answer in rows}
+    _answer_keys.set(quiz.pk, (quiz.version, answer_key))
+    return answer_key
+
+
+def grade(answer_key, answers):
+    """
+    Score submitted answers ({question_id: answer}) against an answer key.
+    Unanswered questions count as wrong. The score is a percentage (0-100).
+    """
+    total = len(answer_key)
+    if not total:
+        return GradeResult(0, 0, 0)
+
+    correct = 0
+    for question_id, answer in answers.items():
+        if answer_key.get(question_id) == answer:
+            correct += 1
+
+    return GradeResult(correct, total, round(correct * 100 / total))
+
+
+def answer_key_cache_stats():
+    return _answer_keys.stats()
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from .models import QuizResult
+from .serializers import QuizResultSerializer
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_TIMEOUT = 60 * 60
+MAX_KEY_LENGTH = 255
+# Sent with every replayed response, so clients can tell it apart from a new write
+REPLAY_HEADERS = {'Idempotent-Replayed': 'true'}
+
+
+class InvalidIdempotencyKey(ValueError):
+    pass
+
+
+def get_idempotency_key(request):
+    """Return the request's Idempotency-Key, or None when the client did not send one."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise InvalidIdempotencyKey(f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters.")
+    return key
+
+
+def _cache_key(quiz_id, user_id, key):
+    return f"idempotency:submit:{quiz_id}:{user_id}:{key}"
+
+
+def find_response(quiz_id, user_id, key):
+    """
+    Return the response body of an earlier submission to the quiz made by
+    this user with this key, or None. Recent responses come from the cache;
+    older ones are rebuilt from the stored result, which the (quiz,
+    submitted_by, idempotency_key) unique constraint makes authoritative.
+    """
+    data = cache.get(_cache_key(quiz_id, user_id, key))
+    if data is None:
+        quiz_result = QuizResult.objects.filter(quiz_id=quiz_id, submitted_by_id=user_id, idempotency_key=key).first()
+        if quiz_result is None:
+            return None
+        data = remember_response(quiz_result)
+    return data
+
+
+def remember_response(quiz_result):
+    """Serialize a new result and, if it was submitted with a key, cache the response for replays."""
+    data = dict(QuizResultSerializer(quiz_result).data)
+    if quiz_result.idempotency_key:
+        key = _cache_key(quiz_result.quiz_id, quiz_result.submitted_by_id, quiz_result.idempotency_key)
+        cache.set(key, data, IDEMPOTENCY_TIMEOUT)
+    return data
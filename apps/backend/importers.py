@@ -0,0 +1,144 @@
+import codecs
+import csv
+import json
+from collections import namedtuple
+from itertools import islice
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from .models import QuizQuestion
+from .serializers import QuestionSerializer
+
+CHUNK_SIZE = 64 * 1024
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+MAX_ITEM_SIZE = 1024 * 1024  # Characters; far more than any question needs
+LOOKAHEAD = 16  # Enough characters to tell any JSON token but a string complete or invalid
+
+ImportResult = namedtuple("ImportResult", ["created", "failed", "errors"])
+
+
+class ImportFormatError(ValueError):
+    """Raised when an upload cannot be parsed at all (as opposed to an invalid row)."""
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """
+    Incrementally yield the items of a top-level JSON array read from a
+    binary stream, so the whole document never has to be held in memory.
+    Stops at the first item that is not valid JSON rather than reading on.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    pos = 0
+    eof = False
+    state = 'start'
+    item = end = None
+
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+
+        needs_more = pos >= len(buffer)
+        if not needs_more and state == 'item':
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Past LOOKAHEAD the error is in the data, not at a chunk boundary, so
+                # the rest of the upload is not read. A string reports its start, so
+                # an unterminated one can only be told apart by MAX_ITEM_SIZE.
+                in_data = len(buffer) - e.pos >= LOOKAHEAD and not e.msg.startswith("Unterminated string")
+                if eof or in_data or len(buffer) - pos > MAX_ITEM_SIZE:
+                    raise ImportFormatError("Invalid JSON in upload.")
+                end = None
+            # An item that does not decode yet, or that ends near the end of the
+            # buffer (e.g. a number cut at a chunk boundary), may need more data.
+            needs_more = not eof and (end is None or len(buffer) - end < LOOKAHEAD)
+
+        if needs_more:
+            if eof:
+                raise ImportFormatError("Unexpected end of JSON array.")
+            buffer, pos = buffer[pos:], 0
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += text_decoder.decode(chunk, final=eof)
+            continue
+
+        char = buffer[pos]
+        if state == 'start':
+            if char != '[':
+                raise ImportFormatError("Expected a JSON array.")
+            pos += 1
+            state = 'first'
+        elif state == 'first':
+            if char == ']':
+                return
+            state = 'item'
+        elif state == 'item':
+            yield item
+            pos = end
+            state = 'separator'
+        elif char == ',':
+            pos += 1
+            state = 'item'
+        elif char == ']':
+            return
+        else:
+            raise ImportFormatError("Expected ',' or ']' in JSON array.")
+
+
+def iter_csv_rows(stream):
+    """Incrementally yield CSV rows (as dicts keyed by the header row) from a binary stream."""
+    reader = codecs.getreader('utf-8-sig')(stream)
+    try:
+        yield from csv.DictReader(reader)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ImportFormatError(f"Invalid CSV in upload: {e}")
+
+
+def validate_batch(rows):
+    """
+    Validate a batch of rows with one QuestionSerializer(many=True) and
+    return the valid rows' data and the invalid ones' errors by index. The
+    list serializer's child is run row by row, since its own is_valid()
+    would drop the whole batch for one bad row.
+    """
+    child = QuestionSerializer(many=True).child
+    valid = []
+    invalid = {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            invalid[index] = {"non_field_errors": ["Expected an object."]}
+            continue
+        try:
+            valid.append(child.run_validation(row))
+        except ValidationError as e:
+            invalid[index] = e.detail
+    return valid, invalid
+
+
+def import_questions(quiz, rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate rows and insert the valid ones with batched bulk_create inside
+    a single transaction. Invalid rows are reported and skipped; an upload
+    that cannot be parsed rolls the whole import back.
+    """
+    created = 0
+    failed = 0
+    errors = []
+    rows = iter(rows)
+    first_row = 1
+
+    with transaction.atomic():
+        while batch := list(islice(rows, batch_size)):
+            valid, invalid = validate_batch(batch)
+            if valid:
+                QuizQuestion.objects.bulk_create([QuizQuestion(quiz=quiz, **data) for data in valid])
+                created += len(valid)
+            failed += len(invalid)
+            for index, row_errors in invalid.items():
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"row": first_row + index, "errors": row_errors})
+            first_row += len(batch)
+
+    return ImportResult(created, failed, errors)
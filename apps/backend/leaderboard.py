@@ -0,0 +1,103 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from .models import QuizPool, QuizResult
+
+LEADERBOARD_SIZE = 100
+LEADERBOARD_FIELDS = ('id', 'candidate_name', 'candidate_app_id', 'score', 'completion_date')
+
+# The top LEADERBOARD_SIZE results of a quiz are cached under a per-quiz
+# generation number. A committed result is merged into the cached list in
+# place, so the next read costs no query. Merges hold a short per-quiz lock
+# (cache.add); a submission that cannot take it, or finds nothing cached,
+# bumps the generation instead, and so does any edit or deletion of results.
+# The next read then rebuilds the list from the database. A reader stores a
+# rebuilt list only if none is cached (cache.add), under the generation it
+# saw before querying, so neither a merge nor a bump can be overwritten by
+# older data and no update is lost.
+#
+# With a shared cache (CACHE_URL) every worker sees the merges and bumps.
+# With the default per-process cache only the worker that handled the
+# submit does, so LEADERBOARD_CACHE_TTL defaults to a few seconds there.
+MERGE_LOCK_TIMEOUT = 5
+
+
+def _generation_key(quiz_id):
+    return f"leaderboard:{quiz_id}:generation"
+
+
+def _generation(quiz_id):
+    key = _generation_key(quiz_id)
+    generation = cache.get(key)
+    if generation is None:
+        # A lost counter must not restart at a number an old list may still be cached under
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def leaderboard_cache_key(quiz_id):
+    return f"leaderboard:{quiz_id}:{_generation(quiz_id)}"
+
+
+def _rank_key(entry):
+    # Highest score first, earliest completion first; matches quizresult_leaderboard_idx
+    return (-entry['score'], entry['completion_date'])
+
+
+def get_leaderboard(quiz_id, limit):
+    """
+    Return (owner user id, best `limit` results) of a quiz, at most
+    LEADERBOARD_SIZE results, or None if the quiz does not exist. Both are
+    cached per quiz, so a warm leaderboard costs no queries.
+    """
+    key = leaderboard_cache_key(quiz_id)
+    board = cache.get(key)
+    if board is None:
+        owner = QuizPool.objects.filter(id=quiz_id).values_list('user_id', flat=True).first()
+        if owner is None:
+            return None
+        entries = list(
+            QuizResult.objects.filter(quiz_id=quiz_id)
+            .order_by('-score', 'completion_date')
+            .values(*LEADERBOARD_FIELDS)[:LEADERBOARD_SIZE]
+        )
+        board = {'owner': owner, 'entries': entries}
+        cache.add(key, board, settings.LEADERBOARD_CACHE_TTL)
+    return board['owner'], board['entries'][:limit]
+
+
+def record_leaderboard_entry(quiz_result):
+    """
+    Call after a result is committed: merge it into the cached leaderboard
+    of its quiz, or invalidate the leaderboard if that cannot be done safely.
+    """
+    quiz_id = quiz_result.quiz_id
+    lock_key = f"leaderboard:{quiz_id}:lock"
+    if not cache.add(lock_key, 1, MERGE_LOCK_TIMEOUT):
+        invalidate_leaderboard(quiz_id)
+        return
+    try:
+        key = leaderboard_cache_key(quiz_id)
+        board = cache.get(key)
+        if board is None:
+            # A reader may be rebuilding from data without this result
+            invalidate_leaderboard(quiz_id)
+            return
+        entries = board['entries']
+        entry = {field: getattr(quiz_result, field) for field in LEADERBOARD_FIELDS}
+        if len(entries) >= LEADERBOARD_SIZE and _rank_key(entry) >= _rank_key(entries[-1]):
+            return
+        # The reader that built the list may already have seen this result
+        entries = [e for e in entries if e['id'] != entry['id']] + [entry]
+        entries.sort(key=_rank_key)
+        cache.set(key, {'owner': board['owner'], 'entries': entries[:LEADERBOARD_SIZE]}, settings.LEADERBOARD_CACHE_TTL)
+    finally:
+        cache.delete(lock_key)
+
+
+def invalidate_leaderboard(quiz_id):
+    try:
+        cache.incr(_generation_key(quiz_id))
+    except ValueError:
+        pass  # No counter: nothing is cached under it either
@@ -0,0 +1,63 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from apps.accounts.models import User
+from apps.backend.models import QuizPool, QuizQuestion, ANSWER_CHOICES
+from apps.backend.grading import get_answer_key, grade
+
+
+class Command(BaseCommand):
+    help = "Benchmark server-side quiz grading against a synthetic quiz."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=200)
+        parser.add_argument('--submissions', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        letters = [choice for choice, _ in ANSWER_CHOICES]
+
+        # Seed a throwaway quiz; everything is rolled back at the end.
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email=f"bench-grading-{options['seed']}@example.com",
+                username=f"bench-grading-{options['seed']}",
+            )
+            quiz = QuizPool.objects.create(quiz_title="Grading benchmark", user=user)
+            QuizQuestion.objects.bulk_create([
+                QuizQuestion(
+                    quiz=quiz,
+                    question_text=f"Question {i}",
+                    answer_a="A", answer_b="B", answer_c="C", answer_d="D",
+                    correct_answer=rng.choice(letters),
+                )
+                for i in range(options['questions'])
+            ])
+            quiz.refresh_from_db()
+            question_ids = list(quiz.questions.values_list('id', flat=True))
+
+            submissions = [
+                {question_id: rng.choice(letters) for question_id in question_ids}
+                for _ in range(options['submissions'])
+            ]
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                total_score = 0
+                for answers in submissions:
+                    total_score += grade(get_answer_key(quiz), answers).score
+                elapsed = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+
+        count = len(submissions)
+        self.stdout.write(f"questions:        {options['questions']}")
+        self.stdout.write(f"submissions:      {count}")
+        self.stdout.write(f"queries:          {len(queries)}")
+        self.stdout.write(f"total time:       {elapsed * 1000:.1f} ms")
+        self.stdout.write(f"per submission:   {elapsed * 1e6 / count:.1f} us")
+        self.stdout.write(f"throughput:       {count / elapsed:,.0f} submissions/s")
+        self.stdout.write(f"mean score:       {total_score / count:.1f}")
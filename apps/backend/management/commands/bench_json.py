@@ -0,0 +1,107 @@
+import io
+import json
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from apps.backend.models import QuizPool, QuizQuestion, ANSWER_CHOICES
+from apps.backend.serializers import QuestionSerializer, QuizSerializer
+from apps.shared.bench import summarize_latencies
+from apps.shared import fastjson
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark rendering and parsing JSON with DRF's stdlib JSONRenderer/JSONParser against "
+        "FastJSONRenderer/FastJSONParser (orjson), over QuizSerializer and QuestionSerializer "
+        "payloads built in memory. No database access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quizzes', type=int, default=100, help="Quizzes in the quiz list payload.")
+        parser.add_argument('--questions', type=int, default=200, help="Questions in the quiz detail payload.")
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def build_payloads(self, options):
+        rng = random.Random(options['seed'])
+        letters = [choice for choice, _ in ANSWER_CHOICES]
+        now = timezone.now()
+        quizzes = [
+            QuizPool(
+                id=i, quiz_title=f"Quiz {i} – «eye tracking»", user_id=rng.randint(1, 1000),
+                create_date=now - timedelta(seconds=rng.randint(0, 10 ** 7)), version=rng.randint(1, 20),
+            )
+            for i in range(1, options['quizzes'] + 1)
+        ]
+        questions = [
+            QuizQuestion(
+                id=i, quiz_id=1, question_text=f"Question {i}: which target did the candidate fixate first?",
+                answer_a="Left", answer_b="Right", answer_c="Top", answer_d="Bottom",
+                correct_answer=rng.choice(letters),
+            )
+            for i in range(1, options['questions'] + 1)
+        ]
+        detail = dict(QuizSerializer(quizzes[0]).data)
+        detail['questions'] = QuestionSerializer(questions, many=True).data
+        return {
+            'quiz list': QuizSerializer(quizzes, many=True).data,
+            'quiz detail': detail,
+            # Values the encoder itself must handle, rather than serializer output
+            'native types': [
+                {'id': i, 'at': quiz.create_date, 'day': quiz.create_date.date(), 'score': Decimal(f"{i}.25")}
+                for i, quiz in enumerate(quizzes)
+            ],
+        }
+
+    def time(self, func, arg, iterations):
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func(arg)
+            latencies.append(time.perf_counter() - started)
+        return summarize_latencies(latencies)
+
+    def handle(self, *args, **options):
+        if fastjson.orjson is None:
+            raise CommandError("orjson is not installed; FastJSONRenderer would use the stdlib path.")
+
+        implementations = {
+            'stdlib': (JSONRenderer(), JSONParser()),
+            'orjson': (fastjson.FastJSONRenderer(), fastjson.FastJSONParser()),
+        }
+        context = {'encoding': 'utf-8'}
+        mismatches = []
+        for name, data in self.build_payloads(options).items():
+            results = {}
+            for impl, (renderer, parser) in implementations.items():
+                body = renderer.render(data)
+                results[impl] = {
+                    'body': body,
+                    'render': self.time(renderer.render, data, options['iterations']),
+                    'parse': self.time(lambda b: parser.parse(io.BytesIO(b), parser_context=context),
+                                       body, options['iterations']),
+                }
+            # Same document, byte for byte or not
+            same = json.loads(results['stdlib']['body']) == json.loads(results['orjson']['body'])
+            if not same:
+                mismatches.append(name)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name} ({len(results['stdlib']['body']):,} bytes stdlib, "
+                f"{len(results['orjson']['body']):,} bytes orjson, {'same' if same else 'DIFFERENT'} output)"
+            ))
+            for step in ('render', 'parse'):
+                stdlib, fast = results['stdlib'][step], results['orjson'][step]
+                self.stdout.write(
+                    f"  {step:<7} stdlib p50 {stdlib['p50_ms']:>8.3f} ms  p95 {stdlib['p95_ms']:>8.3f} ms   "
+                    f"orjson p50 {fast['p50_ms']:>8.3f} ms  p95 {fast['p95_ms']:>8.3f} ms   "
+                    f"x{stdlib['mean_ms'] / max(fast['mean_ms'], 1e-6):.1f}"
+                )
+
+        if mismatches:
+            raise CommandError(f"orjson output differs from the stdlib output for: {', '.join(mismatches)}")
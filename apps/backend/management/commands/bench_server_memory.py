@@ -0,0 +1,142 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ('sync', 'gthread', 'uvicorn')
+# Requests that go through the URL resolver, middleware and DRF without touching the database
+WARM_PATHS = ('/', '/api/quiz/', '/api/accounts/auth/token/refresh/')
+
+
+def _memory(pid):
+    """Rss, Pss and Uss (private pages) of a process in KiB, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if rest.strip().endswith('kB'):
+                values[name] = int(rest.split()[0])
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "uss": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, so split after its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            response.read()
+    except urllib.error.HTTPError:
+        pass  # Any HTTP response means the app answered
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn (gunicorn.conf.py) with each launch profile, with and without preloading, "
+        "and report startup time and per-process memory: RSS, PSS (shared pages split between the "
+        "processes using them) and USS (pages private to the process). The USS difference is the "
+        "memory preloading saves per worker. Linux only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--port', type=int, default=18100)
+        parser.add_argument('--requests', type=int, default=100, help="Warm-up requests before measuring.")
+        parser.add_argument('--startup-timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError("This benchmark reads /proc/<pid>/smaps_rollup and only runs on Linux.")
+
+        results = []
+        for profile in options['profiles']:
+            for preload in (False, True):
+                results.append(self.measure(profile, preload, options))
+
+        self.stdout.write(f"{'profile':<9}{'preload':<9}{'startup':>10}{'master RSS':>12}"
+                          f"{'worker RSS':>12}{'worker PSS':>12}{'worker USS':>12}{'total PSS':>12}")
+        for r in results:
+            self.stdout.write(
+                f"{r['profile']:<9}{'yes' if r['preload'] else 'no':<9}{r['startup_ms']:>8} ms"
+                f"{r['master']['rss'] / 1024:>9.1f} MB{r['worker']['rss'] / 1024:>9.1f} MB"
+                f"{r['worker']['pss'] / 1024:>9.1f} MB{r['worker']['uss'] / 1024:>9.1f} MB{r['total_pss'] / 1024:>9.1f} MB"
+            )
+        for profile in options['profiles']:
+            cold, warm = [r for r in results if r['profile'] == profile]
+            saved = (cold['worker']['uss'] - warm['worker']['uss']) / 1024
+            self.stdout.write(self.style.SUCCESS(
+                f"{profile}: preloading saves {saved:.1f} MB of private memory per worker "
+                f"({saved * options['workers']:.1f} MB for {options['workers']} workers)"
+            ))
+
+    def measure(self, profile, preload, options):
+        env = dict(
+            os.environ,
+            GUNICORN_PROFILE=profile,
+            GUNICORN_PRELOAD='1' if preload else '0',
+            WEB_CONCURRENCY=str(options['workers']),
+            PORT=str(options['port']),
+        )
+        base_url = f"http://127.0.0.1:{options['port']}"
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn'], cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            # Ready once every worker is up and the app answers
+            deadline = started + options['startup_timeout']
+            while True:
+                if server.poll() is not None:
+                    raise CommandError(f"gunicorn ({profile}) exited with status {server.returncode}")
+                if time.perf_counter() > deadline:
+                    raise CommandError(f"gunicorn ({profile}) did not start within {options['startup_timeout']}s")
+                if len(_children(server.pid)) >= options['workers']:
+                    try:
+                        _get(base_url + WARM_PATHS[0])
+                        break
+                    except OSError:
+                        pass
+                time.sleep(0.05)
+            startup = time.perf_counter() - started
+
+            for i in range(options['requests']):
+                _get(base_url + WARM_PATHS[i % len(WARM_PATHS)])
+
+            workers = [_memory(pid) for pid in _children(server.pid)]
+            master = _memory(server.pid)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+
+        return {
+            "profile": profile,
+            "preload": preload,
+            "startup_ms": round(startup * 1000),
+            "master": master,
+            "worker": {field: sum(w[field] for w in workers) // len(workers) for field in ("rss", "pss", "uss")},
+            "total_pss": master["pss"] + sum(w["pss"] for w in workers),
+        }
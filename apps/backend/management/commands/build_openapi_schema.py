@@ -0,0 +1,21 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.shared.openapi import write_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema once and write schema.yaml, schema.json and their gzipped "
+        "copies to OPENAPI_SCHEMA_DIR, where OPENAPI_SCHEMA_MODE=static serves them from, stamped "
+        "with the code version. Run at build time; without current files the first schema "
+        "request generates them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default=settings.OPENAPI_SCHEMA_DIR)
+
+    def handle(self, *args, **options):
+        for path in write_schema(options['output_dir']):
+            self.stdout.write(f"{path} ({os.path.getsize(path)} bytes)")
+        self.stdout.write(self.style.SUCCESS("OpenAPI schema written"))
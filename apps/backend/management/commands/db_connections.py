@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Show how many database connections the configured DB_POOL_MODE and gunicorn process "
+        "model (WEB_CONCURRENCY, GUNICORN_THREADS) can open, compare it with DB_MAX_CONNECTIONS "
+        "and the server's max_connections, and list the connections currently open. Live pool "
+        "statistics of the web workers are served at /metrics."
+    )
+
+    def handle(self, *args, **options):
+        workers, threads = settings.WEB_CONCURRENCY, settings.GUNICORN_THREADS
+        database = settings.DATABASES['default']
+        mode = settings.DB_POOL_MODE
+        self.stdout.write(f"Mode: {mode} ({workers} workers x {threads} threads, ASYNC_VIEWS={settings.ASYNC_VIEWS})")
+
+        if mode == 'pool':
+            pool = database['POOL']
+            per_worker = pool['MAX_SIZE']
+            self.stdout.write(f"Pool per worker: {pool['MIN_SIZE']}..{per_worker} connections, "
+                              f"{pool['TIMEOUT']}s checkout timeout")
+        elif settings.ASYNC_VIEWS:
+            per_worker = None
+            self.stdout.write(self.style.WARNING(
+                "Under ASGI every request runs in a new thread, so per-thread connections are "
+                "neither reused nor bounded; use DB_POOL_MODE=pool"
+            ))
+        else:
+            per_worker = threads
+            self.stdout.write(f"Per worker: up to {threads} persistent connection(s), kept {database['CONN_MAX_AGE']}s")
+
+        # Under pgbouncer these are client connections; the server side is sized below
+        if per_worker is not None and mode != 'pgbouncer':
+            total = workers * per_worker
+            self.stdout.write(f"Web tier total: up to {total} connections (DB_MAX_CONNECTIONS={settings.DB_MAX_CONNECTIONS})")
+            if total > settings.DB_MAX_CONNECTIONS:
+                self.stdout.write(self.style.WARNING("More than DB_MAX_CONNECTIONS; lower GUNICORN_THREADS or WEB_CONCURRENCY"))
+
+        if mode == 'pgbouncer':
+            # Each worker thread keeps one client connection to pgbouncer
+            self.stdout.write("Suggested pgbouncer settings:")
+            self.stdout.write("  pool_mode = transaction")
+            self.stdout.write(f"  max_client_conn = {workers * threads} (plus other clients, e.g. the outbox worker)")
+            self.stdout.write(f"  default_pool_size = {min(settings.DB_MAX_CONNECTIONS, workers * threads)}")
+
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            # Under pgbouncer these report the server behind it only in session mode
+            cursor.execute("SELECT current_setting('max_connections')::int, current_setting('superuser_reserved_connections')::int")
+            max_connections, reserved = cursor.fetchone()
+            cursor.execute(
+                "SELECT coalesce(state, 'unknown'), count(*) FROM pg_stat_activity "
+                "WHERE datname = current_database() GROUP BY 1 ORDER BY 1"
+            )
+            states = cursor.fetchall()
+        self.stdout.write(f"Server: max_connections={max_connections} ({reserved} reserved for superusers)")
+        if settings.DB_MAX_CONNECTIONS > max_connections - reserved:
+            self.stdout.write(self.style.WARNING("DB_MAX_CONNECTIONS exceeds what the server accepts"))
+        self.stdout.write("Open connections to this database: " + ", ".join(f"{state}={count}" for state, count in states))
@@ -0,0 +1,348 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import get_resolver
+from apps.accounts.models import User
+from apps.accounts.views import MyTokenObtainPairSerializer
+from apps.backend.benchdata import seed_dataset
+from apps.backend.models import QuizPool
+from apps.backend.profiles import create_profiles
+from apps.shared.query_budget import counts_towards_budget, declares_query_budget, get_query_budget
+from apps.shared.bench import summarize_latencies
+
+# request(ctx, i) returns (method, path, client kwargs) for the i-th request of the scenario.
+# Slow scenarios hash a password per request and run a smaller number of requests.
+Scenario = namedtuple("Scenario", ["name", "url_name", "expected", "slow", "request"])
+
+ROUTE_URLCONFS = ('apps.backend.urls', 'apps.accounts.urls')
+
+QUESTION = {
+    "question_text": "What is 2 + 2?", "answer_a": "3", "answer_b": "4",
+    "answer_c": "5", "answer_d": "22", "correct_answer": "B",
+}
+CSV_UPLOAD = "question_text,answer_a,answer_b,answer_c,answer_d,correct_answer\n" + "".join(
+    f"Imported question {i},A,B,C,D,A\n" for i in range(10)
+)
+
+
+class LoadContext:
+    """The seeded dataset plus per-scenario pools of single-use objects (tokens, quizzes to delete)."""
+
+    def __init__(self, dataset, pool_size, run_id):
+        self.dataset = dataset
+        self.run_id = run_id
+        self.tokens = {}
+        for user in dataset.users:
+            refresh = MyTokenObtainPairSerializer.get_token(user)
+            self.tokens[user.pk] = (str(refresh.access_token), str(refresh))
+
+        users = dataset.users
+        self.deletable = [
+            (quiz.user_id, quiz.pk)
+            for quiz in QuizPool.objects.bulk_create([
+                QuizPool(quiz_title=f"Delete me {i}", user=users[i % len(users)]) for i in range(pool_size)
+            ])
+        ]
+        # A user holds one outstanding token per purpose, and the send-* scenarios
+        # replace those of the seeded users, so every token gets its own user
+        password = dataset.users[0].password
+        token_users = [
+            User(email=f"token-{run_id}-{i}@example.com", username=f"token-{run_id}-{i}", password=password)
+            for i in range(pool_size)
+        ]
+        if User.objects.assign_user_ids(token_users):
+            User.objects.bulk_create(token_users)
+        else:
+            token_users = User.objects.bulk_create(token_users)
+        create_profiles(token_users)
+        self.verify_tokens = [user.generate_verification_token() for user in token_users]
+        self.reset_tokens = [user.generate_reset_token() for user in token_users]
+
+    def user(self, i):
+        return self.dataset.users[i % len(self.dataset.users)]
+
+    def auth(self, i, user=None):
+        user = user or self.user(i)
+        return {"HTTP_AUTHORIZATION": f"Bearer {self.tokens[user.pk][0]}"}
+
+    def quiz(self, i):
+        """A quiz owned by the i-th user, so owner-only routes succeed."""
+        user = self.user(i)
+        quizzes = self.dataset.quizzes[user.pk]
+        return user, quizzes[(i // len(self.dataset.users)) % len(quizzes)]
+
+    def json(self, i, data, user=None):
+        return {"data": json.dumps(data), "content_type": "application/json", **self.auth(i, user)}
+
+
+def _submit(ctx, i):
+    user, quiz_id = ctx.quiz(i)
+    answers = {str(question_id): "ABCD"[(i + n) % 4] for n, question_id in enumerate(ctx.dataset.questions[quiz_id])}
+    return "POST", f"/api/quiz/{quiz_id}/submit/", ctx.json(i, {"candidate_name": f"Load {i}", "answers": answers}, user)
+
+
+def _delete_quiz(ctx, i):
+    user_id, quiz_id = ctx.deletable[i]
+    user = next(user for user in ctx.dataset.users if user.pk == user_id)
+    return "DELETE", f"/api/quiz/{quiz_id}/", ctx.auth(i, user)
+
+
+SCENARIOS = [
+    Scenario("user-profile GET", "user-profile", {200}, False,
+             lambda ctx, i: ("GET", "/api/user/profile/", ctx.auth(i))),
+    Scenario("user-profile PUT", "user-profile", {200}, False,
+             lambda ctx, i: ("PUT", "/api/user/profile/", ctx.json(i, {"firstname": "Load", "lastname": f"Test {i}"}))),
+    Scenario("quizzes GET", "quizzes", {200}, False,
+             lambda ctx, i: ("GET", "/api/quiz/?limit=20", ctx.auth(i))),
+    Scenario("quizzes POST", "quizzes", {201}, False,
+             lambda ctx, i: ("POST", "/api/quiz/", ctx.json(i, {"quiz_title": f"Load quiz {i}"}))),
+    Scenario("quiz-detail GET", "quiz-detail", {200}, False,
+             lambda ctx, i: ("GET", f"/api/quiz/{ctx.quiz(i)[1]}/", ctx.auth(i, ctx.quiz(i)[0]))),
+    Scenario("quiz-detail DELETE", "quiz-detail", {200}, False, _delete_quiz),
+    Scenario("add-question POST", "add-question", {201}, False,
+             lambda ctx, i: ("POST", f"/api/quiz/{ctx.quiz(i)[1]}/question/", ctx.json(i, QUESTION, ctx.quiz(i)[0]))),
+    Scenario("bulk-add-questions POST", "bulk-add-questions", {201}, False,
+             lambda ctx, i: ("POST", f"/api/quiz/{ctx.quiz(i)[1]}/questions/bulk/",
+                             {"data": CSV_UPLOAD, "content_type": "text/csv", **ctx.auth(i, ctx.quiz(i)[0])})),
+    Scenario("submit-quiz POST", "submit-quiz", {201}, False, _submit),
+    Scenario("quiz-stats GET", "quiz-stats", {200}, False,
+             lambda ctx, i: ("GET", f"/api/quiz/{ctx.quiz(i)[1]}/stats/", ctx.auth(i, ctx.quiz(i)[0]))),
+    Scenario("quiz-leaderboard GET", "quiz-leaderboard", {200}, False,
+             lambda ctx, i: ("GET", f"/api/quiz/{ctx.quiz(i)[1]}/leaderboard/?limit=10", ctx.auth(i))),
+    Scenario("export-results GET", "export-results", {200}, False,
+             lambda ctx, i: ("GET", f"/api/quiz/{ctx.quiz(i)[1]}/results/export/?format=csv", ctx.auth(i, ctx.quiz(i)[0]))),
+    Scenario("token_obtain_pair POST", "token_obtain_pair", {200}, True,
+             lambda ctx, i: ("POST", "/api/accounts/auth/token/",
+                             ctx.json(i, {"email": ctx.user(i).email, "password": ctx.dataset.password}))),
+    Scenario("token_refresh POST", "token_refresh", {200}, False,
+             lambda ctx, i: ("POST", "/api/accounts/auth/token/refresh/",
+                             ctx.json(i, {"refresh": ctx.tokens[ctx.user(i).pk][1]}))),
+    Scenario("register POST", "register", {201}, True,
+             lambda ctx, i: ("POST", "/api/accounts/auth/register/", ctx.json(i, {
+                 "username": f"load-{ctx.run_id}-{i}", "email": f"load-{ctx.run_id}-{i}@example.com",
+                 "password": ctx.dataset.password,
+             }))),
+    Scenario("login POST", "login", {200}, True,
+             lambda ctx, i: ("POST", "/api/accounts/auth/login/",
+                             ctx.json(i, {"email": ctx.user(i).email, "password": ctx.dataset.password}))),
+    Scenario("send-verification-email POST", "send-verification-email", {200}, False,
+             lambda ctx, i: ("POST", "/api/accounts/send-verification-email/", ctx.auth(i))),
+    Scenario("verify-account POST", "verify-account", {200}, False,
+             lambda ctx, i: ("POST", f"/api/accounts/verify/{ctx.verify_tokens[i]}/", {})),
+    Scenario("send-password-reset-email POST", "send-password-reset-email", {200}, False,
+             lambda ctx, i: ("POST", "/api/accounts/send-password-reset-email/", ctx.json(i, {"email": ctx.user(i).email}))),
+    Scenario("reset-password POST", "reset-password", {200}, True,
+             lambda ctx, i: ("POST", f"/api/accounts/reset-password/{ctx.reset_tokens[i]}/", ctx.json(i, {
+                 "password": ctx.dataset.password, "confirm_password": ctx.dataset.password,
+             }))),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset into a throwaway test database (created from the configured "
+        "DATABASES['default'], so SQLite or a local Postgres) and drive every API route with "
+        "concurrent in-process clients. Prints throughput, latency percentiles and queries per "
+        "request as JSON, and fails if a route exceeds its @query_budget or a stored baseline "
+        "shows a regression."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--quizzes-per-user', type=int, default=4)
+        parser.add_argument('--questions-per-quiz', type=int, default=20)
+        parser.add_argument('--results-per-quiz', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--requests', type=int, default=200, help="Requests per route.")
+        parser.add_argument('--slow-requests', type=int, default=20, help="Requests per password-hashing route.")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--routes', nargs='*', help="Only run scenarios whose name starts with one of these.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument('--baseline', help="Compare against this report and fail on regressions.")
+        parser.add_argument('--latency-tolerance', type=float, default=0.25, help="Allowed p95 slowdown (fraction).")
+        parser.add_argument('--query-tolerance', type=float, default=0.1, help="Allowed increase in queries per request.")
+        parser.add_argument('--keepdb', action='store_true', help="Keep the test database afterwards.")
+
+    def handle(self, *args, **options):
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if not options['routes'] or any(scenario.name.startswith(prefix) for prefix in options['routes'])
+        ]
+        if not options['routes']:
+            self.check_coverage()
+
+        if connection.vendor == 'sqlite' and options['concurrency'] > 1:
+            # The in-memory SQLite test database fails concurrent writers instead of queueing them
+            self.stderr.write(self.style.WARNING("SQLite does not support concurrent writers; using --concurrency 1"))
+            options['concurrency'] = 1
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            # Every client comes from one address; the throttles would reject most requests
+            with override_settings(THROTTLE_ENABLED=False):
+                report = self.run(scenarios, options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        self.check_budgets(report)
+        if options['baseline']:
+            self.compare(report, options)
+
+    def route_views(self):
+        """The view of every named backend and accounts route, by URL name."""
+        views = {}
+        for urlconf in ROUTE_URLCONFS:
+            views.update((pattern.name, pattern.callback) for pattern in get_resolver(urlconf).url_patterns if pattern.name)
+        return views
+
+    def check_coverage(self):
+        """Warn about routes without a scenario or query budget, so new endpoints do not go unmeasured."""
+        covered = {scenario.url_name for scenario in SCENARIOS}
+        for name, view in sorted(self.route_views().items()):
+            if name not in covered:
+                self.stderr.write(self.style.WARNING(f"No load-test scenario for route '{name}'"))
+            if not declares_query_budget(view):
+                self.stderr.write(self.style.WARNING(f"Route '{name}' declares no @query_budget"))
+
+    def check_budgets(self, report):
+        """Fail if any request ran more queries than its view's @query_budget."""
+        over = [
+            f"{name}: {route['max_queries']} queries, over its budget of {route['query_budget']}"
+            for name, route in report["routes"].items()
+            if route["query_budget"] is not None and (route["max_queries"] or 0) > route["query_budget"]
+        ]
+        if over:
+            for line in over:
+                self.stderr.write(self.style.ERROR(line))
+            raise CommandError(f"{len(over)} route(s) over their query budget")
+
+    def run(self, scenarios, options):
+        started = time.perf_counter()
+        dataset = seed_dataset(
+            users=options['users'],
+            quizzes_per_user=options['quizzes_per_user'],
+            questions_per_quiz=options['questions_per_quiz'],
+            results_per_quiz=options['results_per_quiz'],
+            seed=options['seed'],
+        )
+        context = LoadContext(dataset, max(options['requests'], options['slow_requests']), run_id=os.getpid())
+        self.stderr.write(f"Seeded dataset in {time.perf_counter() - started:.1f}s")
+
+        views = self.route_views()
+        routes = {}
+        for scenario in scenarios:
+            count = options['slow_requests'] if scenario.slow else options['requests']
+            routes[scenario.name] = self.run_scenario(scenario, context, count, options['concurrency'])
+            routes[scenario.name]["query_budget"] = get_query_budget(views[scenario.url_name])
+            self.stderr.write(f"{scenario.name}: {routes[scenario.name]['throughput_rps']} req/s, "
+                              f"p95 {routes[scenario.name]['latency'].get('p95_ms')} ms")
+
+        return {
+            "meta": {
+                "database": connection.vendor,
+                "concurrency": options['concurrency'],
+                "requests": options['requests'],
+                "slow_requests": options['slow_requests'],
+                "dataset": {
+                    "users": options['users'], "quizzes_per_user": options['quizzes_per_user'],
+                    "questions_per_quiz": options['questions_per_quiz'],
+                    "results_per_quiz": options['results_per_quiz'], "seed": options['seed'],
+                },
+            },
+            "routes": routes,
+        }
+
+    def run_scenario(self, scenario, context, count, concurrency):
+        lock = threading.Lock()
+        next_index = iter(range(count))
+        latencies, query_counts, errors = [], [], {}
+
+        def worker():
+            client = Client(raise_request_exception=False)
+            try:
+                while True:
+                    with lock:
+                        i = next(next_index, None)
+                    if i is None:
+                        return
+                    method, path, kwargs = scenario.request(context, i)
+                    queries = [0]
+
+                    def count_query(execute, sql, params, many, query_context):
+                        queries[0] += counts_towards_budget(sql)
+                        return execute(sql, params, many, query_context)
+
+                    started = time.perf_counter()
+                    with connection.execute_wrapper(count_query):
+                        response = getattr(client, method.lower())(path, **kwargs)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                    elapsed = time.perf_counter() - started
+
+                    with lock:
+                        latencies.append(elapsed)
+                        query_counts.append(queries[0])
+                        if response.status_code not in scenario.expected:
+                            errors[response.status_code] = errors.get(response.status_code, 0) + 1
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+            "latency": summarize_latencies(latencies),
+            "queries_per_request": round(sum(query_counts) / len(query_counts), 2) if query_counts else None,
+            "max_queries": max(query_counts, default=None),
+        }
+
+    def compare(self, report, options):
+        with open(options['baseline']) as f:
+            baseline = json.load(f)
+
+        regressions = []
+        for name, current in report["routes"].items():
+            previous = baseline.get("routes", {}).get(name)
+            if previous is None:
+                self.stderr.write(f"{name}: not in baseline")
+                continue
+            if current["errors"]:
+                regressions.append(f"{name}: unexpected statuses {current['errors']}")
+            if (current["queries_per_request"] or 0) > (previous["queries_per_request"] or 0) + options['query_tolerance']:
+                regressions.append(
+                    f"{name}: queries per request {previous['queries_per_request']} -> {current['queries_per_request']}"
+                )
+            before, after = previous["latency"].get("p95_ms"), current["latency"].get("p95_ms")
+            # Ignore sub-millisecond noise on very fast routes
+            if before and after and after > before * (1 + options['latency_tolerance']) and after - before > 1:
+                regressions.append(f"{name}: p95 {before} ms -> {after} ms")
+
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(self.style.ERROR(regression))
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+        self.stderr.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
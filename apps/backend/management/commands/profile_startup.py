@@ -0,0 +1,120 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ('full', 'slim')
+
+# What a gunicorn worker does before serving its first request, timed per phase.
+# Runs in a fresh interpreter so nothing is already imported.
+BOOT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+marks = {}
+import django
+marks['import django'] = time.perf_counter()
+django.setup(set_prefix=False)
+marks['django.setup()'] = time.perf_counter()
+from django.core.handlers.wsgi import WSGIHandler
+WSGIHandler()  # loads the middleware
+marks['middleware'] = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().reverse_dict  # imports the URLconf and every view module
+marks['urlconf'] = time.perf_counter()
+from apps.shared.warmup import warm_up
+warm_up()
+marks['warm_up()'] = time.perf_counter()
+
+phases, previous = {}, started
+for name, at in marks.items():
+    phases[name] = (at - previous) * 1000
+    previous = at
+rss = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1])
+from django.conf import settings
+print(json.dumps({'phases': phases, 'rss_kb': rss, 'apps': len(settings.INSTALLED_APPS)}))
+"""
+
+
+def _parse_importtime(stderr):
+    """Self and cumulative microseconds per module from python -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile worker startup for each RUNTIME_PROFILE: time spent importing Django, in "
+        "django.setup(), loading the middleware and URLconf and in warm_up(), the RSS afterwards, "
+        "and (python -X importtime) the packages and modules that take longest to import. "
+        "Exits with an error when the slim profile's median boot time or RSS exceeds --max-boot-ms / "
+        "--max-rss-mb (STARTUP_TARGET_MS / STARTUP_TARGET_RSS_MB). "
+        "Linux only (RSS is read from /proc)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+        parser.add_argument('--runs', type=int, default=5, help="Boots per profile; the median is reported.")
+        parser.add_argument('--top', type=int, default=15, help="Modules and packages to list.")
+        parser.add_argument('--max-boot-ms', type=float, default=settings.STARTUP_TARGET_MS)
+        parser.add_argument('--max-rss-mb', type=float, default=settings.STARTUP_TARGET_RSS_MB)
+
+    def boot(self, profile, importtime=False):
+        env = dict(os.environ, RUNTIME_PROFILE=profile)
+        command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', BOOT_SCRIPT]
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f"Booting the {profile} profile failed:\n{result.stderr[-2000:]}")
+        return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/status'):
+            raise CommandError("This command reads /proc/self/status and only runs on Linux.")
+
+        failures = []
+        for profile in options['profiles']:
+            boots = [self.boot(profile)[0] for _ in range(options['runs'])]
+            phases = {name: statistics.median(b['phases'][name] for b in boots) for name in boots[0]['phases']}
+            total = statistics.median(sum(b['phases'].values()) for b in boots)
+            rss_mb = statistics.median(b['rss_kb'] for b in boots) / 1024
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{profile} profile ({boots[0]['apps']} apps, median of {options['runs']} boots)"
+            ))
+            for name, ms in phases.items():
+                self.stdout.write(f"  {name:<16}{ms:>8.1f} ms")
+            self.stdout.write(f"  {'total':<16}{total:>8.1f} ms   RSS {rss_mb:.1f} MB")
+
+            # Import timing inflates the totals, so it gets a run of its own
+            modules = _parse_importtime(self.boot(profile, importtime=True)[1])
+            packages = defaultdict(int)
+            for name, own, _ in modules:
+                packages[name.split('.')[0]] += own
+            self.stdout.write(f"  {len(modules)} modules imported; slowest packages (self time):")
+            for name, own in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+                self.stdout.write(f"    {own / 1000:>8.1f} ms  {name}")
+            self.stdout.write("  slowest modules (self time / including their imports):")
+            for name, own, cumulative in sorted(modules, key=lambda m: -m[1])[:options['top']]:
+                self.stdout.write(f"    {own / 1000:>8.1f} ms {cumulative / 1000:>8.1f} ms  {name}")
+
+            if profile != 'slim':
+                continue
+            if options['max_boot_ms'] and total > options['max_boot_ms']:
+                failures.append(f"{profile}: boot {total:.0f} ms > {options['max_boot_ms']:.0f} ms")
+            if options['max_rss_mb'] and rss_mb > options['max_rss_mb']:
+                failures.append(f"{profile}: RSS {rss_mb:.1f} MB > {options['max_rss_mb']:.0f} MB")
+
+        if failures:
+            raise CommandError("Startup target missed: " + "; ".join(failures))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.backend.results import rebuild_quiz_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the per-quiz score statistics from the stored results with a single "
+        "grouped query, e.g. after a backfill or to repair drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help="Only rebuild these quizzes (default: all).")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = rebuild_quiz_stats(options['quiz_ids'] or None)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} score buckets in {elapsed * 1000:.0f} ms"))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizpool',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-18 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0002_quizpool_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizpool',
+            index=models.Index(fields=['user', 'create_date', 'id'], name='quizpool_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.19 on 2026-10-18 07:35
+
+from django.db import migrations, models
+from django.db.models.functions import Least
+import django.db.models.deletion
+
+
+def backfill_score_stats(apps, schema_editor):
+    # Same grouped query as apps.backend.results.rebuild_quiz_stats, on the historical models
+    QuizResult = apps.get_model('backend', 'QuizResult')
+    QuizScoreStats = apps.get_model('backend', 'QuizScoreStats')
+    totals = (
+        QuizResult.objects.annotate(bucket=Least(models.F('score') / 10, models.Value(9)))
+        .order_by().values('quiz_id', 'bucket')
+        .annotate(
+            count=models.Count('*'),
+            score_sum=models.Sum('score'),
+            score_sum_squares=models.Sum(models.F('score') * models.F('score')),
+        )
+    )
+    QuizScoreStats.objects.bulk_create([QuizScoreStats(**row) for row in totals], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0003_quizpool_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizScoreStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.BigIntegerField(default=0)),
+                ('score_sum_squares', models.BigIntegerField(default=0)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_stats', to='backend.quizpool')),
+            ],
+            options={
+                'verbose_name': 'QuizScoreStats',
+                'verbose_name_plural': 'QuizScoreStats',
+                'db_table': 'QuizScoreStats',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='quizscorestats',
+            constraint=models.UniqueConstraint(fields=('quiz', 'bucket'), name='quizscorestats_quiz_bucket_uniq'),
+        ),
+        migrations.RunPython(backfill_score_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-18 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0004_quiz_score_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(fields=['quiz', '-score', 'completion_date'], name='quizresult_leaderboard_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.19 on 2026-10-18 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0005_quizresult_leaderboard_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizresult',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='quizresult',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key__isnull', False)), fields=('quiz', 'idempotency_key'), name='quizresult_idempotency_uniq'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_user_profiles(apps, schema_editor):
+    # Profiles are now created with the user; give older users theirs so reads never write
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserProfile = apps.get_model('backend', 'UserProfile')
+    missing = User.objects.filter(profile__isnull=True).values_list('pk', flat=True).iterator(chunk_size=1000)
+    batch = []
+    for user_id in missing:
+        batch.append(UserProfile(user_id=user_id))
+        if len(batch) == 1000:
+            UserProfile.objects.bulk_create(batch)
+            batch = []
+    UserProfile.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0006_quizresult_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_profiles, migrations.RunPython.noop),
+    ]
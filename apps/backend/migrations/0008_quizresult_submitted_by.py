@@ -0,0 +1,29 @@
+# Generated by Django 4.2.19 on 2026-10-18 08:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('backend', '0007_backfill_user_profiles'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='quizresult',
+            name='quizresult_idempotency_uniq',
+        ),
+        migrations.AddField(
+            model_name='quizresult',
+            name='submitted_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='quizresult',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key__isnull', False)), fields=('quiz', 'submitted_by', 'idempotency_key'), name='quizresult_idempotency_uniq'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from apps.accounts.models import User  # adjust path if needed
 
+ANSWER_CHOICES = [('A', 'A'), ('B', 'B'), ('C', 'C'), ('D', 'D')]
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     firstname = models.CharField(max_length=100)
@@ -18,19 +21,110 @@ class UserProfile(models.Model):
         verbose_name_plural = 'UserProfile'
         
 
+class QuizPoolQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # Changed quizzes get a new version, unless the update sets it itself
+        kwargs.setdefault('version', models.F('version') + 1)
+        return super().update(**kwargs)
+
+    def with_counts(self):
+        """
+        Annotate question_count and result_count using correlated subqueries,
+        so the counts come back in the same query without a join fan-out.
+        """
+        questions = (
+            QuizQuestion.objects.filter(quiz=models.OuterRef('pk'))
+            .order_by().values('quiz').annotate(count=models.Count('*')).values('count')
+        )
+        results = (
+            QuizResult.objects.filter(quiz=models.OuterRef('pk'))
+            .order_by().values('quiz').annotate(count=models.Count('*')).values('count')
+        )
+        return self.annotate(
+            question_count=Coalesce(models.Subquery(questions), 0),
+            result_count=Coalesce(models.Subquery(results), 0),
+        )
+
+
 class QuizPool(models.Model):
     quiz_title = models.CharField(max_length=255)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     create_date = models.DateTimeField(auto_now_add=True)
     candidate_auth_required = models.BooleanField(default=True)
+    # Incremented whenever the quiz or its questions change; used to invalidate cached
+    # answer keys and as the detail ETag.
+    version = models.PositiveIntegerField(default=1)
+
+    objects = QuizPoolQuerySet.as_manager()
 
     def __str__(self):
         return self.quiz_title
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        self.version = models.F('version') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+
+    @staticmethod
+    def bump_version(quiz_id):
+        """
+        Atomically increment the version of a quiz so cached data derived
+        from its questions is considered stale.
+        """
+        QuizPool.bump_versions([quiz_id])
+
+    @staticmethod
+    def bump_versions(quiz_ids):
+        """Increment the versions of several quizzes with one UPDATE."""
+        quiz_ids = [quiz_id for quiz_id in quiz_ids if quiz_id is not None]
+        if quiz_ids:
+            QuizPool.objects.filter(pk__in=quiz_ids).update(version=models.F('version') + 1)
     
     class Meta:
         db_table = 'QuizPool'
         verbose_name = 'QuizPool'
         verbose_name_plural = 'QuizPool'
+        indexes = [
+            # Serves the per-user listing and its (create_date, id) keyset pagination.
+            models.Index(fields=['user', 'create_date', 'id'], name='quizpool_user_created_idx'),
+        ]
+
+
+class QuizQuestionQuerySet(models.QuerySet):
+    """
+    Bulk writes bypass QuizQuestion.save()/delete(), so they bump the
+    versions of the quizzes they touch themselves, with one UPDATE. The
+    admin's "delete selected" action goes through delete(), and
+    bulk_update() through update().
+    """
+
+    def _quiz_ids(self):
+        return set(self.order_by().values_list('quiz_id', flat=True).distinct())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        QuizPool.bump_versions({obj.quiz_id for obj in objs})
+        return objs
+
+    def update(self, **kwargs):
+        quiz_ids = self._quiz_ids()
+        rows = super().update(**kwargs)
+        # Questions moved to another quiz change that quiz too
+        for field in ('quiz', 'quiz_id'):
+            if field in kwargs:
+                quiz_ids.add(getattr(kwargs[field], 'pk', kwargs[field]))
+        QuizPool.bump_versions(quiz_ids)
+        return rows
+
+    def delete(self):
+        quiz_ids = self._quiz_ids()
+        result = super().delete()
+        QuizPool.bump_versions(quiz_ids)
+        return result
 
 
 class QuizQuestion(models.Model):
@@ -40,27 +134,134 @@ class QuizQuestion(models.Model):
     answer_b = models.CharField(max_length=255)
     answer_c = models.CharField(max_length=255)
     answer_d = models.CharField(max_length=255)
-    correct_answer = models.CharField(max_length=1, choices=[('A', 'A'), ('B', 'B'), ('C', 'C'), ('D', 'D')])
+    correct_answer = models.CharField(max_length=1, choices=ANSWER_CHOICES)
+
+    objects = QuizQuestionQuerySet.as_manager()
 
     def __str__(self):
         return f"Quiz: {self.quiz.quiz_title} | Question: {self.question_text[:50]}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        QuizPool.bump_version(self.quiz_id)
+
+    def delete(self, *args, **kwargs):
+        quiz_id = self.quiz_id
+        result = super().delete(*args, **kwargs)
+        QuizPool.bump_version(quiz_id)
+        return result
     
     class Meta:
         db_table = 'QuizQuestion'
         verbose_name = 'QuizQuestion'
         verbose_name_plural = 'QuizQuestions'
 
+def _invalidate_leaderboards(quiz_ids):
+    from .leaderboard import invalidate_leaderboard  # It imports this module
+    for quiz_id in quiz_ids:
+        invalidate_leaderboard(quiz_id)
+
+
+class QuizResultQuerySet(models.QuerySet):
+    """
+    New results are merged into the cached leaderboards as they are
+    submitted (apps.backend.leaderboard); bulk writes, edits and deletions
+    invalidate the leaderboards of the quizzes they touch instead.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        _invalidate_leaderboards({obj.quiz_id for obj in objs})
+        return objs
+
+    def update(self, **kwargs):
+        quiz_ids = set(self.order_by().values_list('quiz_id', flat=True).distinct())
+        rows = super().update(**kwargs)
+        for field in ('quiz', 'quiz_id'):
+            if field in kwargs:
+                quiz_ids.add(getattr(kwargs[field], 'pk', kwargs[field]))
+        _invalidate_leaderboards(quiz_ids)
+        return rows
+
+    def delete(self):
+        quiz_ids = set(self.order_by().values_list('quiz_id', flat=True).distinct())
+        result = super().delete()
+        _invalidate_leaderboards(quiz_ids)
+        return result
+
+
 class QuizResult(models.Model):
     quiz = models.ForeignKey(QuizPool, on_delete=models.CASCADE)
     candidate_name = models.CharField(max_length=255)
     candidate_app_id = models.CharField(max_length=255, null=True, blank=True)
     completion_date = models.DateTimeField(auto_now_add=True)
     score = models.IntegerField()
+    # Client-supplied Idempotency-Key of the submission, so retries cannot create duplicates.
+    # Keys are only unique per submitting account, which clients choose them independently of.
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+    submitted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    objects = QuizResultQuerySet.as_manager()
 
     def __str__(self):
         return f"Result for {self.candidate_name} - {self.score}%"
+
+    def save(self, *args, **kwargs):
+        # New results are merged into the leaderboard by apps.backend.results
+        edited = not self._state.adding
+        super().save(*args, **kwargs)
+        if edited:
+            _invalidate_leaderboards([self.quiz_id])
+
+    def delete(self, *args, **kwargs):
+        quiz_id = self.quiz_id
+        result = super().delete(*args, **kwargs)
+        _invalidate_leaderboards([quiz_id])
+        return result
     
     class Meta:
         db_table = 'QuizResult'
         verbose_name = 'QuizResult'
-        verbose_name_plural = 'QuizResults'
\ No newline at end of file
+        verbose_name_plural = 'QuizResults'
+        indexes = [
+            # Serves the leaderboard (best score first, earliest completion first) as a range scan.
+            models.Index(fields=['quiz', '-score', 'completion_date'], name='quizresult_leaderboard_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['quiz', 'submitted_by', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='quizresult_idempotency_uniq',
+            ),
+        ]
+
+class QuizScoreStats(models.Model):
+    """
+    Running score totals of a quiz, one row per histogram bucket. Kept up
+    to date in the same transaction as every new QuizResult (see
+    apps.backend.results), so statistics never scan the results table.
+    """
+    BUCKET_WIDTH = 10
+    BUCKET_COUNT = 10
+
+    quiz = models.ForeignKey(QuizPool, on_delete=models.CASCADE, related_name="score_stats")
+    bucket = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_sum_squares = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Quiz {self.quiz_id} bucket {self.bucket}: {self.count} results"
+
+    @classmethod
+    def bucket_for(cls, score):
+        # Scores are percentages; 100 shares the top bucket with 90-99
+        return min(max(score, 0) // cls.BUCKET_WIDTH, cls.BUCKET_COUNT - 1)
+
+    class Meta:
+        db_table = 'QuizScoreStats'
+        verbose_name = 'QuizScoreStats'
+        verbose_name_plural = 'QuizScoreStats'
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'bucket'], name='quizscorestats_quiz_bucket_uniq'),
+        ]
@@ -0,0 +1,99 @@
+import base64
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (cursor) pagination, newest first, over
+    (ordering_field, id). Each page is a single indexed range query
+    no matter how deep the client pages.
+    """
+    ordering_field = 'create_date'
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self.set_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    def get_page_queryset(self, queryset, request):
+        """Order and filter the queryset to the requested page, plus one row to detect a next page."""
+        self.request = request
+        self.limit = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        field = self.ordering_field
+        queryset = queryset.order_by(f'-{field}', '-id')
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+        return queryset[:self.limit + 1]
+
+    def set_page(self, page):
+        self.next_position = None
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            last = page[-1]
+            self.next_position = (getattr(last, self.ordering_field), last.pk)
+        return page
+
+    def get_paginated_data(self, data):
+        return {"next": self.get_next_link(), "results": data}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        # Works for DRF requests (query_params) and plain Django requests (GET)
+        params = getattr(request, 'query_params', request.GET)
+        try:
+            size = int(params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        value, pk = position
+        raw = f"{value.isoformat()}|{pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        params = getattr(request, 'query_params', request.GET)
+        encoded = params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            value, pk = raw.rsplit('|', 1)
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
@@ -0,0 +1,79 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.accounts.models import User
+from apps.shared.cache import StampedLRUCache
+from apps.shared.metrics import register_cache
+from .models import UserProfile
+from .serializers import UserProfileSerializer
+
+# user id -> serialized profile. Every user's profile is created with it (by
+# the post_save handler below, by create_profiles() after bulk inserts and by
+# migration 0007 for older users), so reads never write.
+#
+# Entries are checked against a per-user stamp in the shared cache, which
+# every save or delete of the profile replaces, so no process serves a
+# profile older than the last committed change. An update through the API
+# also stores the new profile in the worker that made it.
+_profiles = StampedLRUCache('profile', maxsize=settings.PROFILE_CACHE_SIZE, ttl=settings.PROFILE_CACHE_TTL)
+register_cache('profiles', _profiles.stats)
+
+
+def create_profiles(users):
+    """Create the empty profiles of users inserted with bulk_create(), which sends no post_save."""
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+
+
+@receiver(post_save, sender=User)
+def _create_profile(sender, instance, created, raw=False, **kwargs):
+    # Covers registration, createsuperuser and every other create_user() call
+    if created and not raw:
+        UserProfile.objects.create(user=instance)
+
+
+def get_profile_data(user):
+    """
+    The serialized profile of a user, from the cache when possible. Raises
+    UserProfile.DoesNotExist if the user has none, which is a bug: every
+    user gets one when it is created.
+    """
+    if not settings.PROFILE_CACHE_TTL:
+        return serialize_profile(UserProfile.objects.get(user_id=user.pk))
+    data, stamp = _profiles.lookup(user.pk)
+    if data is None:
+        data = serialize_profile(UserProfile.objects.get(user_id=user.pk))
+        _profiles.store(user.pk, data, stamp)
+    return data
+
+
+async def aget_profile_data(user):
+    """Async variant of get_profile_data() for the async views."""
+    if not settings.PROFILE_CACHE_TTL:
+        return serialize_profile(await UserProfile.objects.aget(user_id=user.pk))
+    # The stamp is read from the shared cache, whose client blocks
+    data, stamp = await sync_to_async(_profiles.lookup)(user.pk)
+    if data is None:
+        data = serialize_profile(await UserProfile.objects.aget(user_id=user.pk))
+        _profiles.store(user.pk, data, stamp)
+    return data
+
+
+def serialize_profile(profile):
+    # A plain dict: the serializer's ReturnDict would keep the serializer and the instance alive
+    return dict(UserProfileSerializer(profile).data)
+
+
+def remember_profile(profile):
+    """Serialize a profile and cache the result (write-through after an update). Returns the data."""
+    data = serialize_profile(profile)
+    if settings.PROFILE_CACHE_TTL:
+        # The save's invalidation has already replaced the stamp, unless it waits for a commit
+        _profiles.store(profile.user_id, data, _profiles.stamp(profile.user_id))
+    return data
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def _invalidate_on_change(sender, instance, **kwargs):
+    _profiles.invalidate(instance.user_id)
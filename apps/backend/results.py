@@ -0,0 +1,135 @@
+import math
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Least
+from .models import QuizResult, QuizScoreStats
+from .leaderboard import record_leaderboard_entry
+
+PERCENTILES = (25, 50, 75, 90)
+
+
+def create_result(quiz, candidate_name, candidate_app_id, score, idempotency_key=None, submitted_by_id=None):
+    """
+    Store a graded submission and fold its score into the quiz statistics
+    atomically; the cached leaderboard is updated once it is committed.
+    """
+    with transaction.atomic():
+        quiz_result = QuizResult.objects.create(
+            quiz=quiz,
+            candidate_name=candidate_name,
+            candidate_app_id=candidate_app_id,
+            score=score,
+            idempotency_key=idempotency_key,
+            submitted_by_id=submitted_by_id,
+        )
+        record_score(quiz.pk, score)
+        transaction.on_commit(lambda: record_leaderboard_entry(quiz_result))
+    return quiz_result
+
+
+def record_score(quiz_id, score):
+    """Add one score to the running totals of its histogram bucket. Call inside a transaction."""
+    bucket = QuizScoreStats.bucket_for(score)
+    rows = QuizScoreStats.objects.filter(quiz_id=quiz_id, bucket=bucket)
+    increments = {
+        'count': F('count') + 1,
+        'score_sum': F('score_sum') + score,
+        'score_sum_squares': F('score_sum_squares') + score * score,
+    }
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            QuizScoreStats.objects.create(
+                quiz_id=quiz_id, bucket=bucket, count=1, score_sum=score, score_sum_squares=score * score
+            )
+    except IntegrityError:
+        # A concurrent submission created the bucket first
+        rows.update(**increments)
+
+
+def get_quiz_stats(quiz_id):
+    """
+    Summarize a quiz's scores from its bucket totals. Count, mean and
+    standard deviation are exact; percentiles are interpolated within
+    their histogram bucket.
+    """
+    counts = [0] * QuizScoreStats.BUCKET_COUNT
+    total = score_sum = score_sum_squares = 0
+    for bucket, count, bucket_sum, bucket_squares in QuizScoreStats.objects.filter(quiz_id=quiz_id).values_list(
+        'bucket', 'count', 'score_sum', 'score_sum_squares'
+    ):
+        counts[bucket] = count
+        total += count
+        score_sum += bucket_sum
+        score_sum_squares += bucket_squares
+
+    histogram = [
+        {"min": low, "max": high, "count": count}
+        for (low, high), count in zip(_bucket_bounds(), counts)
+    ]
+    if not total:
+        return {
+            "count": 0, "mean": None, "stddev": None, "median": None,
+            "percentiles": {f"p{p}": None for p in PERCENTILES}, "histogram": histogram,
+        }
+
+    mean = score_sum / total
+    variance = max(score_sum_squares / total - mean * mean, 0)
+    percentiles = {f"p{p}": round(_estimate_percentile(counts, total, p), 1) for p in PERCENTILES}
+    return {
+        "count": total,
+        "mean": round(mean, 2),
+        "stddev": round(math.sqrt(variance), 2),
+        "median": percentiles["p50"],
+        "percentiles": percentiles,
+        "histogram": histogram,
+    }
+
+
+def rebuild_quiz_stats(quiz_ids=None):
+    """
+    Recompute the bucket totals from QuizResult with one grouped query and
+    replace the stored ones. Returns the number of bucket rows written.
+    """
+    width, last_bucket = QuizScoreStats.BUCKET_WIDTH, QuizScoreStats.BUCKET_COUNT - 1
+    results = QuizResult.objects.all()
+    stats = QuizScoreStats.objects.all()
+    if quiz_ids is not None:
+        results = results.filter(quiz_id__in=quiz_ids)
+        stats = stats.filter(quiz_id__in=quiz_ids)
+
+    totals = (
+        results.annotate(bucket=Least(F('score') / width, Value(last_bucket)))
+        .order_by().values('quiz_id', 'bucket')
+        .annotate(count=Count('*'), score_sum=Sum('score'), score_sum_squares=Sum(F('score') * F('score')))
+    )
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Hold back concurrent submissions until the new totals are committed;
+            # they then add to the rebuilt rows instead of being lost.
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {connection.ops.quote_name(QuizScoreStats._meta.db_table)} IN SHARE ROW EXCLUSIVE MODE')
+        stats.delete()
+        rows = [QuizScoreStats(**row) for row in totals]
+        QuizScoreStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _bucket_bounds():
+    width = QuizScoreStats.BUCKET_WIDTH
+    for bucket in range(QuizScoreStats.BUCKET_COUNT):
+        low = bucket * width
+        high = 100 if bucket == QuizScoreStats.BUCKET_COUNT - 1 else low + width - 1
+        yield low, high
+
+
+def _estimate_percentile(counts, total, pct):
+    rank = pct / 100 * total
+    seen = 0
+    for (low, high), count in zip(_bucket_bounds(), counts):
+        if count and seen + count >= rank:
+            return min(low + (rank - seen) / count * (high + 1 - low), 100)
+        seen += count
+    return 100
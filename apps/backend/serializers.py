@@ -1,22 +1,54 @@
 from rest_framework import serializers
-from .models import UserProfile,QuizPool,QuizQuestion,QuizResult
+from .models import UserProfile,QuizPool,QuizQuestion,QuizResult,ANSWER_CHOICES
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = '__all__'
+        read_only_fields = ['user']
 
 class QuizSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizPool
         fields = '__all__'
+        read_only_fields = ['user', 'version']
+
+class QuizListSerializer(QuizSerializer):
+    question_count = serializers.IntegerField(read_only=True)
+    result_count = serializers.IntegerField(read_only=True)
 
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizQuestion
         fields = '__all__'
+        read_only_fields = ['quiz']
+
+class QuizDetailSerializer(QuizSerializer):
+    questions = QuestionSerializer(many=True, read_only=True)
 
 class QuizResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizResult
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ['quiz', 'score', 'idempotency_key', 'submitted_by']
+
+class LeaderboardEntrySerializer(serializers.Serializer):
+    rank = serializers.IntegerField()
+    id = serializers.IntegerField()
+    candidate_name = serializers.CharField()
+    candidate_app_id = serializers.CharField(allow_null=True)
+    score = serializers.IntegerField()
+    completion_date = serializers.DateTimeField()
+
+class QuizSubmissionSerializer(serializers.Serializer):
+    """Serializer for a candidate's answers, keyed by question id"""
+    candidate_name = serializers.CharField(max_length=255)
+    candidate_app_id = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True)
+    answers = serializers.DictField(child=serializers.ChoiceField(choices=ANSWER_CHOICES))
+
+    def validate_answers(self, value):
+        """Normalize question ids to integers"""
+        try:
+            return {int(question_id): answer for question_id, answer in value.items()}
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("Answers must be keyed by question id.")
@@ -0,0 +1,615 @@
+import csv
+import gzip
+import io
+import json
+import statistics
+import uuid
+import unittest
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import path
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.accounts import authentication
+from apps.accounts.models import User
+from apps.shared.query_budget import assert_within_query_budget
+from . import async_views, grading, leaderboard, profiles, views
+from .importers import ImportFormatError, import_questions, iter_csv_rows, iter_json_array
+from .benchdata import seed_dataset
+from .models import QuizPool, QuizQuestion, QuizResult, QuizScoreStats, UserProfile
+from .results import create_result, get_quiz_stats, rebuild_quiz_stats, record_score
+
+
+def clear_caches():
+    """Empty every cache, so requests take their slowest (cold) path."""
+    cache.clear()
+    grading._answer_keys.clear()
+    profiles._profiles.clear()
+    authentication._users.clear()
+
+
+# The middleware only logs, so a request over budget fails in the helper, which lists its queries
+@override_settings(QUERY_BUDGET_ACTION='log')
+class QueryBudgetTests(TestCase):
+    """
+    Every endpoint stays within its @query_budget, with cold caches and
+    against enough rows (quizzes with questions and results) that a
+    per-row query would exceed it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset(users=2, quizzes_per_user=3, questions_per_quiz=20, results_per_quiz=30)
+        cls.user = cls.dataset.users[0]
+        cls.quiz = QuizPool.objects.filter(user=cls.user).first()
+        cls.questions = list(cls.quiz.questions.values_list('id', flat=True))
+
+    def setUp(self):
+        clear_caches()
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('HTTP_AUTHORIZATION', f"Bearer {self.token}")
+        kwargs.setdefault('content_type', 'application/json')
+        return assert_within_query_budget(self.client, method, path, secure=True, **kwargs)
+
+    def test_user_profile(self):
+        self.assertEqual(self.request('get', '/api/user/profile/').status_code, 200)
+        clear_caches()
+        self.assertEqual(self.request('put', '/api/user/profile/', data={'firstname': 'Ada'}).status_code, 200)
+
+    def test_quizzes(self):
+        response = self.request('get', '/api/quiz/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 3)
+        clear_caches()
+        self.assertEqual(self.request('post', '/api/quiz/', data={'quiz_title': 'New quiz'}).status_code, 201)
+
+    def test_quiz_detail(self):
+        response = self.request('get', f'/api/quiz/{self.quiz.pk}/')
+        self.assertEqual(len(response.json()['questions']), 20)
+        clear_caches()
+        not_modified = self.request('get', f'/api/quiz/{self.quiz.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        clear_caches()
+        self.assertEqual(self.request('delete', f'/api/quiz/{self.quiz.pk}/').status_code, 200)
+
+    def test_add_question(self):
+        question = {
+            'question_text': 'Which way?', 'answer_a': 'Left', 'answer_b': 'Right',
+            'answer_c': 'Up', 'answer_d': 'Down', 'correct_answer': 'A',
+        }
+        self.assertEqual(self.request('post', f'/api/quiz/{self.quiz.pk}/question/', data=question).status_code, 201)
+
+    def test_bulk_add_questions(self):
+        rows = "question_text,answer_a,answer_b,answer_c,answer_d,correct_answer\n"
+        rows += "".join(f"Question {i},A,B,C,D,B\n" for i in range(10))
+        upload = SimpleUploadedFile('questions.csv', rows.encode(), content_type='text/csv')
+        # Deliberately unbounded (@query_budget(None)); only the declaration is checked
+        response = assert_within_query_budget(
+            self.client, 'post', f'/api/quiz/{self.quiz.pk}/questions/bulk/', secure=True,
+            HTTP_AUTHORIZATION=f"Bearer {self.token}", data={'file': upload},
+        )
+        self.assertEqual(response.json()['created'], 10)
+
+    def test_submit_quiz(self):
+        body = {'candidate_name': 'Grace', 'answers': {str(question_id): 'A' for question_id in self.questions}}
+        key = str(uuid.uuid4())
+        self.assertEqual(self.request('post', f'/api/quiz/{self.quiz.pk}/submit/', data=body, HTTP_IDEMPOTENCY_KEY=key).status_code, 201)
+        clear_caches()
+        replay = self.request('post', f'/api/quiz/{self.quiz.pk}/submit/', data=body, HTTP_IDEMPOTENCY_KEY=key)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+
+    def test_quiz_stats(self):
+        response = self.request('get', f'/api/quiz/{self.quiz.pk}/stats/')
+        self.assertEqual(response.json()['count'], 30)
+
+    def test_quiz_leaderboard(self):
+        response = self.request('get', f'/api/quiz/{self.quiz.pk}/leaderboard/?limit=100')
+        self.assertEqual(len(response.json()['results']), 30)
+
+    def test_export_results(self):
+        response = self.request('get', f'/api/quiz/{self.quiz.pk}/results/export/?format=ndjson')
+        self.assertEqual(response.status_code, 200)
+
+
+class QuizDetailETagTests(TestCase):
+    def setUp(self):
+        dataset = seed_dataset(users=1, quizzes_per_user=1, questions_per_quiz=3, results_per_quiz=0)
+        self.quiz = QuizPool.objects.get(user=dataset.users[0])
+        token = RefreshToken.for_user(dataset.users[0]).access_token
+        self.headers = {'HTTP_AUTHORIZATION': f"Bearer {token}", 'secure': True}
+
+    def get(self, etag=None):
+        if etag:
+            return self.client.get(f'/api/quiz/{self.quiz.pk}/', HTTP_IF_NONE_MATCH=etag, **self.headers)
+        return self.client.get(f'/api/quiz/{self.quiz.pk}/', **self.headers)
+
+    def test_unchanged_quiz_is_not_modified(self):
+        etag = self.get()['ETag']
+        self.assertEqual(etag, f'"quiz-{self.quiz.pk}-v{self.quiz.version}"')
+        with mock.patch.object(views, 'QuizSerializer') as quiz_serializer, \
+                mock.patch.object(views, 'QuizDetailSerializer') as detail_serializer:
+            self.assertEqual(self.get(etag).status_code, 304)
+        quiz_serializer.assert_not_called()
+        detail_serializer.assert_not_called()
+
+    def test_saved_quiz_gets_new_etag(self):
+        etag = self.get()['ETag']
+        version = self.quiz.version
+        self.quiz.quiz_title = "Saved"
+        self.quiz.save(update_fields=['quiz_title'])
+        self.assertEqual(self.quiz.version, version + 1)
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"quiz-{self.quiz.pk}-v{version + 1}"')
+
+    def test_quiz_field_changes_invalidate_etag(self):
+        etag = self.get()['ETag']
+        # A queryset update, as the admin's list_editable would do, bypasses save()
+        QuizPool.objects.filter(pk=self.quiz.pk).update(quiz_title="Renamed", candidate_auth_required=False)
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['quiz_title'], "Renamed")
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_question_bulk_changes_invalidate_etag(self):
+        questions = QuizQuestion.objects.filter(quiz=self.quiz)
+        for change in (
+            lambda: questions.filter(pk=questions.first().pk).update(correct_answer='D'),
+            lambda: QuizQuestion.objects.bulk_create([QuizQuestion(
+                quiz=self.quiz, question_text="Extra?", answer_a="A", answer_b="B",
+                answer_c="C", answer_d="D", correct_answer='A',
+            )]),
+            lambda: questions.filter(pk=questions.first().pk).delete(),
+        ):
+            etag = self.get()['ETag']
+            change()
+            self.assertEqual(self.get(etag).status_code, 200)
+
+    @unittest.skipUnless(apps.is_installed('django.contrib.admin'), "the admin is not installed")
+    def test_admin_delete_selected_invalidates_etag(self):
+        etag = self.get()['ETag']
+        admin = User.objects.create_superuser(email="admin@example.com", username="admin", password="Admin-pass-1")
+        self.client.force_login(admin)
+        question_ids = list(QuizQuestion.objects.filter(quiz=self.quiz).values_list('pk', flat=True))
+        response = self.client.post(
+            '/admin/backend/quizquestion/',
+            {'action': 'delete_selected', '_selected_action': question_ids[:2], 'post': 'yes'},
+            secure=True,
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(QuizQuestion.objects.filter(quiz=self.quiz).count(), 1)
+        self.assertEqual(self.get(etag).status_code, 200)
+
+
+@override_settings(PROFILE_CACHE_TTL=60, AUTH_USER_CACHE_TTL=60)
+class ProfileCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(email="profile@example.com", username="profile", password="Profile-pass-1")
+        token = RefreshToken.for_user(self.user).access_token
+        self.headers = {'HTTP_AUTHORIZATION': f"Bearer {token}", 'secure': True}
+
+    def get(self):
+        return self.client.get('/api/user/profile/', **self.headers).json()
+
+    def test_saved_profile_is_read_back_by_another_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                '/api/user/profile/', data={'firstname': 'Ada'}, content_type='application/json', **self.headers,
+            )
+        self.assertEqual(response.status_code, 200)
+        # Another worker has no local entry
+        profiles._profiles.clear()
+        self.assertEqual(self.get()['firstname'], 'Ada')
+
+    def test_change_in_another_worker_replaces_local_entry(self):
+        self.assertEqual(self.get()['firstname'], '')
+        stale_entry = profiles._profiles.get(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = UserProfile.objects.get(user=self.user)
+            profile.firstname = 'Grace'
+            profile.save()
+        # This worker did not make the change, so its local entry survives
+        profiles._profiles.set(self.user.pk, stale_entry)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get()['firstname'], 'Grace')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get()['firstname'], 'Grace')
+
+
+@override_settings(LEADERBOARD_CACHE_TTL=300, AUTH_USER_CACHE_TTL=60)
+class LeaderboardCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        dataset = seed_dataset(users=1, quizzes_per_user=1, questions_per_quiz=1, results_per_quiz=5)
+        self.quiz = QuizPool.objects.get(user=dataset.users[0])
+        token = RefreshToken.for_user(dataset.users[0]).access_token
+        self.headers = {'HTTP_AUTHORIZATION': f"Bearer {token}", 'secure': True}
+
+    def get(self):
+        response = self.client.get(f'/api/quiz/{self.quiz.pk}/leaderboard/?limit=100', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def submit(self, score):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_result(self.quiz, "Late", None, score)
+
+    def test_submission_is_merged_without_queries(self):
+        before = self.get()
+        result = self.submit(101)  # Above every seeded score
+        with self.assertNumQueries(0):
+            after = self.get()
+        self.assertEqual(len(after), len(before) + 1)
+        self.assertEqual((after[0]['id'], after[0]['rank']), (result.pk, 1))
+
+    def test_submission_without_cached_board_is_read_from_database(self):
+        result = self.submit(-1)
+        results = self.get()
+        self.assertEqual(results[-1]['id'], result.pk)
+        self.assertEqual(len({entry['id'] for entry in results}), len(results))
+
+    def test_merge_does_not_duplicate_a_result_the_reader_already_saw(self):
+        result = create_result(self.quiz, "Seen", None, 50)
+        self.get()  # Built while the result's on_commit merge is still pending
+        leaderboard.record_leaderboard_entry(result)
+        self.assertEqual([entry['id'] for entry in self.get()].count(result.pk), 1)
+
+    def test_concurrent_merge_invalidates_instead(self):
+        self.get()
+        cache.add(f"leaderboard:{self.quiz.pk}:lock", 1)  # Another submission is merging
+        result = self.submit(101)
+        with self.assertNumQueries(2):  # The quiz's owner and its results
+            self.assertEqual(self.get()[0]['id'], result.pk)
+
+    def test_deleted_results_invalidate(self):
+        best = self.get()[0]['id']
+        QuizResult.objects.filter(pk=best).delete()
+        self.assertNotIn(best, [entry['id'] for entry in self.get()])
+
+
+class ExportResultsTests(TestCase):
+    def setUp(self):
+        dataset = seed_dataset(users=1, quizzes_per_user=1, questions_per_quiz=1, results_per_quiz=3)
+        self.quiz = QuizPool.objects.get(user=dataset.users[0])
+        token = RefreshToken.for_user(dataset.users[0]).access_token
+        self.headers = {'HTTP_AUTHORIZATION': f"Bearer {token}", 'secure': True}
+        self.path = f'/api/quiz/{self.quiz.pk}/results/export/'
+        self.results = list(QuizResult.objects.filter(quiz=self.quiz).order_by('id'))
+
+    def test_csv(self):
+        response = self.client.get(f'{self.path}?format=csv', **self.headers)
+        self.assertFalse(response.is_async)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['id', 'candidate_name', 'candidate_app_id', 'completion_date', 'score'])
+        self.assertEqual([(int(row[0]), row[1], int(row[4])) for row in rows[1:]],
+                         [(result.pk, result.candidate_name, result.score) for result in self.results])
+
+    def test_ndjson_is_gzipped_when_accepted(self):
+        response = self.client.get(f'{self.path}?format=ndjson', HTTP_ACCEPT_ENCODING='gzip, br', **self.headers)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [result.pk for result in self.results])
+
+    async def test_asgi_request_streams_asynchronously(self):
+        response = await self.async_client.get(
+            f'{self.path}?format=csv', secure=True, headers={'Authorization': self.headers['HTTP_AUTHORIZATION']},
+        )
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), len(self.results) + 1)
+
+
+class CountingStream(io.BytesIO):
+    """Records how much of the upload was read."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def question(text, correct='A'):
+    return {
+        'question_text': text, 'answer_a': 'Left', 'answer_b': 'Right',
+        'answer_c': 'Up', 'answer_d': 'Down', 'correct_answer': correct,
+    }
+
+
+class JSONArrayTests(SimpleTestCase):
+    def items(self, data, chunk_size=64 * 1024):
+        return list(iter_json_array(CountingStream(data.encode()), chunk_size=chunk_size))
+
+    def test_items_cut_at_any_chunk_boundary(self):
+        items = [question("Which way?"), 12.5e3, True, None, "x" * 40, [1, {"nested": "é"}]]
+        document = " [ " + " , ".join(json.dumps(item, ensure_ascii=False) for item in items) + " ] "
+        for chunk_size in range(1, 12):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.items(document, chunk_size), items)
+
+    def test_string_longer_than_a_chunk(self):
+        self.assertEqual(self.items(json.dumps(["y" * 1000]), chunk_size=16), ["y" * 1000])
+
+    def test_invalid_item_fails_without_reading_the_rest(self):
+        rest = ", ".join(json.dumps(question(f"Question {i}")) for i in range(1000))
+        stream = CountingStream(f'[{json.dumps(question("First"))}, {{"question_text": oops}}, {rest}]'.encode())
+        rows = iter_json_array(stream, chunk_size=256)
+        self.assertEqual(next(rows)['question_text'], "First")
+        with self.assertRaisesMessage(ImportFormatError, "Invalid JSON"):
+            next(rows)
+        self.assertLess(stream.bytes_read, 1024)
+
+    def test_malformed_documents(self):
+        for data, message in (
+            ('{"question_text": "x"}', "Expected a JSON array."),
+            ('[{"question_text": "x"}', "Unexpected end of JSON array."),
+            ('[1 2]', "Expected ',' or ']' in JSON array."),
+            ('[1, tru]', "Invalid JSON in upload."),
+        ):
+            with self.subTest(data=data), self.assertRaisesMessage(ImportFormatError, message):
+                self.items(data, chunk_size=3)
+
+
+class ImportQuestionsTests(TestCase):
+    def setUp(self):
+        dataset = seed_dataset(users=1, quizzes_per_user=1, questions_per_quiz=0, results_per_quiz=0)
+        self.quiz = QuizPool.objects.get(user=dataset.users[0])
+        token = RefreshToken.for_user(dataset.users[0]).access_token
+        self.headers = {'HTTP_AUTHORIZATION': f"Bearer {token}", 'secure': True}
+
+    def upload(self, name, content):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post(f'/api/quiz/{self.quiz.pk}/questions/bulk/', {'file': upload}, **self.headers)
+
+    def test_invalid_rows_are_reported_by_row_number_across_batches(self):
+        rows = [question("One"), question("Two", correct='Z'), "not an object", question("Four"), {}]
+        result = import_questions(self.quiz, rows, batch_size=2)
+
+        self.assertEqual((result.created, result.failed), (2, 3))
+        self.assertEqual([error['row'] for error in result.errors], [2, 3, 5])
+        self.assertIn('correct_answer', result.errors[0]['errors'])
+        self.assertEqual(result.errors[1]['errors'], {"non_field_errors": ["Expected an object."]})
+        self.assertEqual(
+            list(self.quiz.questions.order_by('id').values_list('question_text', flat=True)), ["One", "Four"],
+        )
+
+    def test_json_upload(self):
+        response = self.upload('questions.json', json.dumps([question("One"), question("Two", correct='Z')]))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['created'], response.json()['failed']), (1, 1))
+
+    def test_invalid_json_imports_nothing(self):
+        response = self.upload('questions.json', f'[{json.dumps(question("One"))}, nope]')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Invalid JSON in upload."})
+        self.assertFalse(self.quiz.questions.exists())
+
+    def test_csv_upload(self):
+        rows = "question_text,answer_a,answer_b,answer_c,answer_d,correct_answer\n"
+        rows += "One,A,B,C,D,B\n,A,B,C,D,B\n"
+        response = self.upload('questions.csv', rows)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [2])
+
+    def test_csv_that_is_not_utf8(self):
+        with self.assertRaises(ImportFormatError):
+            list(iter_csv_rows(io.BytesIO("question_text\nQuestion à\n".encode('latin-1'))))
+
+
+class QuizStatsTests(TestCase):
+    def setUp(self):
+        dataset = seed_dataset(users=1, quizzes_per_user=1, questions_per_quiz=0, results_per_quiz=0)
+        self.quiz = QuizPool.objects.get(user=dataset.users[0])
+
+    def submit(self, *scores):
+        for score in scores:
+            create_result(self.quiz, "Candidate", None, score)
+
+    def test_no_results(self):
+        stats = get_quiz_stats(self.quiz.pk)
+        self.assertEqual((stats['count'], stats['mean'], stats['stddev'], stats['median']), (0, None, None, None))
+        self.assertEqual(sum(bucket['count'] for bucket in stats['histogram']), 0)
+
+    def test_summary(self):
+        scores = [10, 20, 30, 40, 100]
+        self.submit(*scores)
+        stats = get_quiz_stats(self.quiz.pk)
+
+        self.assertEqual(stats['count'], 5)
+        self.assertEqual(stats['mean'], statistics.mean(scores))
+        self.assertEqual(stats['stddev'], round(statistics.pstdev(scores), 2))
+        # Interpolated within the bucket holding the rank: p50 is halfway into 30-39
+        self.assertEqual(stats['median'], 35.0)
+        self.assertEqual(stats['percentiles']['p90'], 95.5)  # 100 shares the 90-100 bucket
+        self.assertEqual([bucket['count'] for bucket in stats['histogram']], [0, 1, 1, 1, 1, 0, 0, 0, 0, 1])
+        self.assertEqual((stats['histogram'][9]['min'], stats['histogram'][9]['max']), (90, 100))
+
+    def test_rebuild_matches_running_totals(self):
+        self.submit(0, 5, 55, 99, 100, 100)
+        running = get_quiz_stats(self.quiz.pk)
+        QuizScoreStats.objects.update(count=0, score_sum=0, score_sum_squares=0)
+
+        rebuild_quiz_stats([self.quiz.pk])
+
+        self.assertEqual(get_quiz_stats(self.quiz.pk), running)
+
+    def test_bucket_created_concurrently_is_added_to(self):
+        # Another submission creates the bucket after our UPDATE found nothing to update
+        QuizScoreStats.objects.create(quiz=self.quiz, bucket=7, count=1, score_sum=70, score_sum_squares=4900)
+        update = QuerySet.update
+        calls = []
+
+        def update_after_another_submission(queryset, **fields):
+            calls.append(fields)
+            return 0 if len(calls) == 1 else update(queryset, **fields)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_after_another_submission):
+            record_score(self.quiz.pk, 75)
+
+        self.assertEqual(len(calls), 2)  # Missed, then retried after the IntegrityError
+        row = QuizScoreStats.objects.get(quiz=self.quiz)
+        self.assertEqual((row.count, row.score_sum, row.score_sum_squares), (2, 145, 4900 + 75 * 75))
+
+
+class IdempotentSubmissionTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        dataset = seed_dataset(users=2, quizzes_per_user=1, questions_per_quiz=3, results_per_quiz=0)
+        self.users = dataset.users
+        self.quiz = QuizPool.objects.get(user=self.users[0])
+        self.body = {'candidate_name': 'Grace', 'answers': {str(pk): 'A' for pk in self.quiz.questions.values_list('id', flat=True)}}
+
+    def submit(self, key=None, user=0):
+        token = RefreshToken.for_user(self.users[user]).access_token
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {token}", 'secure': True}
+        if key is not None:
+            headers['HTTP_IDEMPOTENCY_KEY'] = key
+        return self.client.post(f'/api/quiz/{self.quiz.pk}/submit/', self.body, content_type='application/json', **headers)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.submit('attempt-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first)
+
+        cached = self.submit('attempt-1')
+        clear_caches()
+        rebuilt = self.submit('attempt-1')  # From the stored result once the cached response is gone
+
+        for replay in (cached, rebuilt):
+            self.assertEqual(replay.status_code, 201)
+            self.assertEqual(replay['Idempotent-Replayed'], 'true')
+            self.assertEqual(replay.json(), first.json())
+        self.assertEqual(QuizResult.objects.filter(quiz=self.quiz).count(), 1)
+
+    def test_keys_are_scoped_to_the_submitting_account(self):
+        first, other = self.submit('shared-key', user=0), self.submit('shared-key', user=1)
+        self.assertNotIn('Idempotent-Replayed', other)
+        self.assertNotEqual(first.json()['id'], other.json()['id'])
+
+    def test_submissions_without_a_key_are_not_deduplicated(self):
+        self.submit()
+        self.submit()
+        self.assertEqual(QuizResult.objects.filter(quiz=self.quiz).count(), 2)
+
+    def test_invalid_key(self):
+        for key in ('  ', 'k' * 256):
+            with self.subTest(length=len(key)):
+                self.assertEqual(self.submit(key).status_code, 400)
+        self.assertFalse(QuizResult.objects.exists())
+
+    def test_concurrent_submission_with_the_same_key_is_replayed(self):
+        stored = create_result(self.quiz, "Grace", None, 100, idempotency_key='race', submitted_by_id=self.users[0].pk)
+        find_response = views.find_response
+        lookups = []
+
+        def find_after_first_lookup(*args):
+            # Not visible yet when the request looks it up, so it only meets it at the INSERT
+            lookups.append(args)
+            return None if len(lookups) == 1 else find_response(*args)
+
+        with mock.patch.object(views, 'find_response', side_effect=find_after_first_lookup):
+            response = self.submit('race')
+
+        self.assertEqual(len(lookups), 2)  # Looked up again after the IntegrityError
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.json()['id'], stored.pk)
+        self.assertEqual(QuizResult.objects.filter(quiz=self.quiz).count(), 1)
+
+
+# The async views, routed as backend/urls.py does when ASYNC_VIEWS is on (under RockaeWebAPI.asgi)
+urlpatterns = [
+    path('api/user/profile/', async_views.user_profile),
+    path('api/quiz/', async_views.quizzes),
+    path('api/quiz/<int:quiz_id>/question/', async_views.add_question),
+    path('api/quiz/<int:quiz_id>/submit/', async_views.submit_quiz),
+]
+
+
+class AsyncViewTests(TestCase):
+    """The async views answer like the DRF views they replace, through the ASGI handler."""
+
+    def setUp(self):
+        clear_caches()
+        dataset = seed_dataset(users=1, quizzes_per_user=2, questions_per_quiz=3, results_per_quiz=0)
+        self.user = dataset.users[0]
+        self.quiz = QuizPool.objects.filter(user=self.user).first()
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def asgi(self, method, url, data=None, **headers):
+        headers.setdefault('Authorization', f"Bearer {self.token}")
+        kwargs = {} if data is None else {'data': data, 'content_type': 'application/json'}
+
+        async def send():
+            return await getattr(self.async_client, method)(url, secure=True, headers=headers, **kwargs)
+
+        with override_settings(ROOT_URLCONF=__name__):
+            return async_to_sync(send)()
+
+    def wsgi(self, method, url, data=None):
+        request = getattr(self.client, method)
+        return request(url, data, content_type='application/json', secure=True, HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def test_reads_match_the_drf_views(self):
+        for url in ('/api/user/profile/', '/api/quiz/', '/api/quiz/?limit=1'):
+            with self.subTest(url=url):
+                response = self.asgi('get', url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), self.wsgi('get', url).json())
+
+    def test_profile_update(self):
+        response = self.asgi('put', '/api/user/profile/', {'firstname': 'Ada'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['firstname'], 'Ada')
+        self.assertEqual(self.wsgi('get', '/api/user/profile/').json(), response.json())
+
+    def test_create_quiz_and_question(self):
+        quiz = self.asgi('post', '/api/quiz/', {'quiz_title': 'Async quiz'})
+        self.assertEqual(quiz.status_code, 201)
+        self.assertEqual(quiz.json().keys(), self.wsgi('post', '/api/quiz/', {'quiz_title': 'Sync quiz'}).json().keys())
+
+        url = f"/api/quiz/{quiz.json()['id']}/question/"
+        created = self.asgi('post', url, question("Which way?"))
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(created.json()['quiz'], quiz.json()['id'])
+        self.assertEqual(created.json().keys(), self.wsgi('post', url, question("Sync?")).json().keys())
+
+    def test_submit_and_replay(self):
+        answers = {str(pk): 'A' for pk in self.quiz.questions.values_list('id', flat=True)}
+        url = f'/api/quiz/{self.quiz.pk}/submit/'
+        body = {'candidate_name': 'Grace', 'answers': answers}
+
+        first = self.asgi('post', url, body, **{'Idempotency-Key': 'async-1'})
+        replay = self.asgi('post', url, body, **{'Idempotency-Key': 'async-1'})
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((replay.status_code, replay['Idempotent-Replayed']), (201, 'true'))
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(QuizResult.objects.filter(quiz=self.quiz).count(), 1)
+
+    def test_errors(self):
+        cases = (
+            ('get', '/api/quiz/0/submit/', None, {}, 405),
+            ('get', '/api/user/profile/', None, {'Authorization': ''}, 401),
+            ('post', '/api/quiz/0/question/', question("Lost"), {}, 404),
+            ('post', f'/api/quiz/{self.quiz.pk}/submit/', {'candidate_name': 'X', 'answers': {'0': 'A'}}, {}, 400),
+            ('post', '/api/quiz/', {}, {}, 400),  # No quiz_title
+        )
+        for method, url, data, headers, expected in cases:
+            with self.subTest(method=method, url=url):
+                self.assertEqual(self.asgi(method, url, data, **headers).status_code, expected)
@@ -1,10 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from .views import user_profile, quizzes, add_question, submit_quiz,delete_quiz
+from .views import user_profile, quizzes, add_question, bulk_add_questions, submit_quiz, quiz_detail, quiz_stats, quiz_leaderboard, export_results
+
+if settings.ASYNC_VIEWS:
+    # Under ASGI, serve the async-native versions of the hot endpoints
+    from apps.shared.async_api import documented_as
+    from . import async_views
+    user_profile = documented_as(async_views.user_profile, user_profile)
+    quizzes = documented_as(async_views.quizzes, quizzes)
+    add_question = documented_as(async_views.add_question, add_question)
+    submit_quiz = documented_as(async_views.submit_quiz, submit_quiz)
 
 urlpatterns = [
     path('user/profile/', user_profile, name="user-profile"),
     path('quiz/', quizzes, name="quizzes"),
-    path('quiz/<int:quiz_id>/', delete_quiz, name="delete-quiz"),
+    path('quiz/<int:quiz_id>/', quiz_detail, name="quiz-detail"),
     path('quiz/<int:quiz_id>/question/', add_question, name="add-question"),
+    path('quiz/<int:quiz_id>/questions/bulk/', bulk_add_questions, name="bulk-add-questions"),
     path('quiz/<int:quiz_id>/submit/', submit_quiz, name="submit-quiz"),
+    path('quiz/<int:quiz_id>/stats/', quiz_stats, name="quiz-stats"),
+    path('quiz/<int:quiz_id>/leaderboard/', quiz_leaderboard, name="quiz-leaderboard"),
+    path('quiz/<int:quiz_id>/results/export/', export_results, name="export-results"),
 ]
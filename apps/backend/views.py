@@ -1,17 +1,33 @@
-from rest_framework.decorators import api_view, permission_classes,parser_classes
+import re
+from rest_framework.decorators import api_view, permission_classes,parser_classes,renderer_classes
 from rest_framework.permissions import AllowAny,IsAuthenticated
 from rest_framework.response import Response
-from rest_framework import status
-from django.http import JsonResponse
-from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import status, serializers
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.cache import patch_vary_headers
 from rest_framework.parsers import MultiPartParser
 from django.apps import apps
-from .models import User, UserProfile, QuizPool, QuizQuestion, QuizResult
-from .serializers import UserProfileSerializer, QuizSerializer, QuestionSerializer, QuizResultSerializer
+from django.db import IntegrityError
+from django.db.models import prefetch_related_objects
+from django.utils.http import quote_etag, parse_etags
+from .models import User, UserProfile, QuizPool
+from .serializers import UserProfileSerializer, QuizSerializer, QuizListSerializer, QuizDetailSerializer, QuestionSerializer, QuizResultSerializer, QuizSubmissionSerializer, LeaderboardEntrySerializer
+from .grading import get_answer_key, grade
+from .results import create_result, get_quiz_stats
+from .idempotency import IDEMPOTENCY_HEADER, REPLAY_HEADERS, InvalidIdempotencyKey, get_idempotency_key, find_response, remember_response
+from .leaderboard import LEADERBOARD_SIZE, get_leaderboard, invalidate_leaderboard
+from .profiles import get_profile_data, remember_profile
+from .pagination import KeysetPagination
+from .importers import import_questions, iter_csv_rows, iter_json_array, ImportFormatError
+from .exports import ResultExport, CSVExportRenderer, NDJSONExportRenderer
 from apps.shared.serializers import SuccessResponseSerializer,ErrorResponseSerializer
+from apps.shared.query_budget import query_budget
+from apps.shared.openapi import OpenApiParameter, OpenApiTypes, extend_schema, inline_serializer
 
 
 # ----------------- USER PROFILE MANAGEMENT -----------------
+@query_budget(5)
 @extend_schema(
     methods=["GET"],
     responses={200: UserProfileSerializer, 400: {"description": "Bad Request"}},
@@ -30,21 +46,20 @@ from apps.shared.serializers import SuccessResponseSerializer,ErrorResponseSeria
 @api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
 def user_profile(request):
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
-
     if request.method == 'GET':
-        serializer = UserProfileSerializer(profile)
-        return Response(serializer.data)
+        return Response(get_profile_data(request.user))
 
     elif request.method == 'PUT':
+        profile = UserProfile.objects.get(user_id=request.user.id)
         serializer = UserProfileSerializer(profile, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return Response(remember_profile(serializer.instance))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # ----------------- QUIZ MANAGEMENT -----------------
 
+@query_budget(3)
 @extend_schema(
     methods=["POST"],
     request=QuizSerializer,
@@ -55,18 +70,30 @@ def user_profile(request):
 )
 @extend_schema(
     methods=["GET"],
-    responses={200: QuizSerializer(many=True), 400: {"description": "Bad Request"}},
+    parameters=[
+        OpenApiParameter(name="cursor", type=str, description="Cursor returned in `next` by the previous page"),
+        OpenApiParameter(name="limit", type=int, description="Page size (default 50, max 200)"),
+    ],
+    responses={
+        200: inline_serializer(
+            name="PaginatedQuizList",
+            fields={"next": serializers.URLField(allow_null=True), "results": QuizListSerializer(many=True)},
+        ),
+        400: {"description": "Bad Request"},
+    },
     summary="Retrieve All Quizzes",
-    description="Retrieves a list of all available quizzes created by authenticated user.",
+    description="Retrieves the quizzes created by the authenticated user, newest first, one page at a time.",
     tags=["Quiz Management"]
 )
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def quizzes(request):
     if request.method == 'GET':
-        quizzes = QuizPool.objects.filter(user=request.user)
-        serializer = QuizSerializer(quizzes, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination()
+        quizzes = QuizPool.objects.filter(user=request.user).with_counts()
+        page = paginator.paginate_queryset(quizzes, request)
+        serializer = QuizListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     elif request.method == 'POST':
         serializer = QuizSerializer(data=request.data)
@@ -75,6 +102,41 @@ def quizzes(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def quiz_etag(quiz):
+    """
+    Strong ETag of a quiz's detail representation. Its version changes
+    whenever the quiz or its questions change, so nothing is serialized.
+    """
+    return quote_etag(f"quiz-{quiz.pk}-v{quiz.version}")
+
+
+@query_budget(8)
+@extend_schema(
+    methods=["GET"],
+    operation_id="api_quiz_detail_retrieve",
+    parameters=[
+        OpenApiParameter(
+            name="quiz_id",
+            type=int,
+            location=OpenApiParameter.PATH,
+            description="ID of the quiz to retrieve"
+        ),
+        OpenApiParameter(
+            name="If-None-Match",
+            type=str,
+            location=OpenApiParameter.HEADER,
+            description="ETag of a previously fetched copy of the quiz"
+        )
+    ],
+    responses={
+        200: QuizDetailSerializer,
+        304: {"description": "Quiz has not changed"},
+        404: {"description": "Quiz not found"},
+    },
+    summary="Retrieve a Quiz",
+    description="Retrieves a quiz of the authenticated user together with its questions. Supports conditional requests through ETag/If-None-Match.",
+    tags=["Quiz Management"]
+)
 @extend_schema(
     methods=["DELETE"],
     parameters=[
@@ -93,19 +155,35 @@ def quizzes(request):
     description="Deletes a quiz related to authenicated user",
     tags=["Quiz Management"]
 )    
-@api_view(['DELETE'])
+@api_view(['GET', 'DELETE'])
 @permission_classes([IsAuthenticated])
-def delete_quiz(request, quiz_id):
+def quiz_detail(request, quiz_id):
     quiz = QuizPool.objects.filter(id=quiz_id, user=request.user).first()
 
+    if request.method == 'GET':
+        if not quiz:
+            return Response({"error": "Quiz not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = quiz_etag(quiz)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        prefetch_related_objects([quiz], 'questions')
+        serializer = QuizDetailSerializer(quiz)
+        return Response(serializer.data, headers=headers)
+
     if not quiz:
             return Response({"error": "Quiz not found or you are not authorized to delete it"}, status=status.HTTP_404_NOT_FOUND)
 
     quiz.delete()
+    invalidate_leaderboard(quiz_id)
     return Response({"message": "Quiz deleted successfully"}, status=status.HTTP_200_OK)
 
 # ----------------- QUIZ QUESTIONS MANAGEMENT -----------------
 
+@query_budget(5)
 @extend_schema(
     methods=["POST"],
     request=QuestionSerializer,
@@ -129,27 +207,237 @@ def add_question(request, quiz_id):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@query_budget(None)  # One INSERT per IMPORT_BATCH_SIZE rows of the upload
+@extend_schema(
+    methods=["POST"],
+    request={
+        "multipart/form-data": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        },
+        "application/json": QuestionSerializer(many=True),
+        "text/csv": {"type": "string"},
+    },
+    responses={201: {"description": "Import summary with per-row errors"}, 400: {"description": "Bad Request"}},
+    summary="Bulk Import Questions",
+    description="Imports questions into a quiz from a JSON array or a CSV file (header: question_text, answer_a, answer_b, answer_c, answer_d, correct_answer). Invalid rows are skipped and reported.",
+    tags=["Quiz Questions"]
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser])
+def bulk_add_questions(request, quiz_id):
+    quiz = QuizPool.objects.filter(id=quiz_id, user=request.user).first()
+    if not quiz:
+        return Response({"error": "Quiz not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    content_type = request.content_type.split(';')[0].strip().lower()
+    if content_type == 'multipart/form-data':
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
+        is_csv = upload.name.lower().endswith('.csv') or upload.content_type == 'text/csv'
+        stream = upload
+    elif content_type in ('text/csv', 'application/json'):
+        is_csv = content_type == 'text/csv'
+        stream = request.stream
+    else:
+        return Response({"error": "Upload a CSV or JSON file"}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    if stream is None:
+        return Response({"error": "Empty upload"}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = iter_csv_rows(stream) if is_csv else iter_json_array(stream)
+    try:
+        result = import_questions(quiz, rows)
+    except ImportFormatError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    response_status = status.HTTP_201_CREATED if result.created or not result.failed else status.HTTP_400_BAD_REQUEST
+    return Response(
+        {"created": result.created, "failed": result.failed, "errors": result.errors},
+        status=response_status
+    )
+
 # ----------------- QUIZ RESULTS MANAGEMENT -----------------
 
+@query_budget(8)
 @extend_schema(
     methods=["POST"],
-    request=QuizResultSerializer,
+    request=QuizSubmissionSerializer,
+    parameters=[
+        OpenApiParameter(
+            name=IDEMPOTENCY_HEADER,
+            type=str,
+            location=OpenApiParameter.HEADER,
+            description="Unique key per submission. Retrying with the same key returns the original "
+                        "response (with an Idempotent-Replayed header) instead of storing a new result."
+        )
+    ],
     responses={201: QuizResultSerializer, 400: {"description": "Bad Request"}},
     summary="Submit Quiz Results",
-    description="Submit quiz answers and calculate scores.",
+    description="Submit quiz answers keyed by question id. The score is calculated on the server.",
     tags=["Quiz Results"]
 )
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_quiz(request, quiz_id):
+    try:
+        idempotency_key = get_idempotency_key(request)
+    except InvalidIdempotencyKey as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if idempotency_key:
+        replay = find_response(quiz_id, request.user.id, idempotency_key)
+        if replay is not None:
+            return Response(replay, status=status.HTTP_201_CREATED, headers=REPLAY_HEADERS)
+
     try:
         quiz = QuizPool.objects.get(id=quiz_id)
     except QuizPool.DoesNotExist:
         return Response({"error": "Quiz not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    serializer = QuizResultSerializer(data=request.data)
-    if serializer.is_valid():
-        serializer.save(quiz=quiz)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-    
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    serializer = QuizSubmissionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    answers = serializer.validated_data['answers']
+    answer_key = get_answer_key(quiz)
+    unknown = [question_id for question_id in answers if question_id not in answer_key]
+    if unknown:
+        return Response({"error": f"Unknown question ids: {unknown}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    result = grade(answer_key, answers)
+    try:
+        quiz_result = create_result(
+            quiz,
+            candidate_name=serializer.validated_data['candidate_name'],
+            candidate_app_id=serializer.validated_data.get('candidate_app_id'),
+            score=result.score,
+            idempotency_key=idempotency_key,
+            submitted_by_id=request.user.id,
+        )
+    except IntegrityError:
+        # A concurrent request with the same key stored its result first
+        replay = find_response(quiz_id, request.user.id, idempotency_key) if idempotency_key else None
+        if replay is None:
+            raise
+        return Response(replay, status=status.HTTP_201_CREATED, headers=REPLAY_HEADERS)
+    return Response(remember_response(quiz_result), status=status.HTTP_201_CREATED)
+
+
+@query_budget(3)
+@extend_schema(
+    methods=["GET"],
+    responses={
+        200: inline_serializer(
+            name="QuizStats",
+            fields={
+                "count": serializers.IntegerField(),
+                "mean": serializers.FloatField(allow_null=True),
+                "stddev": serializers.FloatField(allow_null=True),
+                "median": serializers.FloatField(allow_null=True),
+                "percentiles": serializers.DictField(child=serializers.FloatField(allow_null=True)),
+                "histogram": inline_serializer(
+                    name="QuizScoreBucket",
+                    fields={"min": serializers.IntegerField(), "max": serializers.IntegerField(), "count": serializers.IntegerField()},
+                    many=True,
+                ),
+            },
+        ),
+        404: {"description": "Quiz not found"},
+    },
+    summary="Quiz Result Statistics",
+    description="Score statistics of a quiz owned by the authenticated user: mean, standard deviation, "
+                "estimated median and percentiles, and a histogram in buckets of 10 points.",
+    tags=["Quiz Results"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def quiz_stats(request, quiz_id):
+    if not QuizPool.objects.filter(id=quiz_id, user=request.user).exists():
+        return Response({"error": "Quiz not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(get_quiz_stats(quiz_id))
+
+
+
+@query_budget(3)
+@extend_schema(
+    methods=["GET"],
+    parameters=[
+        OpenApiParameter(
+            name="limit",
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description=f"Number of entries (default 10, max {LEADERBOARD_SIZE})"
+        )
+    ],
+    responses={
+        200: inline_serializer(
+            name="Leaderboard",
+            fields={"quiz": serializers.IntegerField(), "results": LeaderboardEntrySerializer(many=True)},
+        ),
+        404: {"description": "Quiz not found"},
+    },
+    summary="Quiz Leaderboard",
+    description="Best results of a quiz owned by the authenticated user, ranked by score and then by completion date.",
+    tags=["Quiz Results"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def quiz_leaderboard(request, quiz_id):
+    try:
+        limit = max(1, min(int(request.query_params.get("limit", 10)), LEADERBOARD_SIZE))
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+    leaderboard = get_leaderboard(quiz_id, limit)
+    # Results are only visible to the quiz's owner, as in quiz_stats and export_results
+    if leaderboard is None or leaderboard[0] != request.user.id:
+        return Response({"error": "Quiz not found"}, status=status.HTTP_404_NOT_FOUND)
+    entries = leaderboard[1]
+
+    ranked = [{"rank": rank, **entry} for rank, entry in enumerate(entries, start=1)]
+    return Response({"quiz": quiz_id, "results": LeaderboardEntrySerializer(ranked, many=True).data})
+
+@query_budget(3)
+@extend_schema(
+    methods=["GET"],
+    parameters=[
+        OpenApiParameter(
+            name="format",
+            type=str,
+            enum=["csv", "ndjson"],
+            location=OpenApiParameter.QUERY,
+            description="Export format (default csv)"
+        )
+    ],
+    responses={
+        (200, "text/csv"): OpenApiTypes.STR,
+        (200, "application/x-ndjson"): OpenApiTypes.STR,
+        404: {"description": "Quiz not found"},
+    },
+    summary="Export Quiz Results",
+    description="Streams every result of a quiz owned by the authenticated user as CSV or NDJSON, "
+                "gzip-compressed when the client accepts it.",
+    tags=["Quiz Results"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([CSVExportRenderer, NDJSONExportRenderer])
+def export_results(request, quiz_id):
+    if not QuizPool.objects.filter(id=quiz_id, user=request.user).exists():
+        return Response({"error": "Quiz not found"}, status=status.HTTP_404_NOT_FOUND, content_type="application/json")
+
+    renderer = request.accepted_renderer
+    compress = bool(re.search(r"\bgzip\b", request.headers.get("Accept-Encoding", "")))
+    export = ResultExport(quiz_id, renderer.format, compress=compress)
+    # The ASGI handler consumes async iterators as they go; a sync one would be buffered whole.
+    # Decided per request: the same code may be served by runserver (WSGI) and uvicorn (ASGI).
+    content = export.__aiter__() if isinstance(request._request, ASGIRequest) else iter(export)
+
+    response = StreamingHttpResponse(content, content_type=f"{renderer.media_type}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="quiz-{quiz_id}-results.{renderer.format}"'
+    if compress:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
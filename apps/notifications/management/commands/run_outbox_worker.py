@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.notifications.outbox import deliver_batch
+from apps.shared.http import get_smtp_client
+from apps.shared.middleware import flush_metrics
+
+
+class Command(BaseCommand):
+    help = "Send queued outbox emails in concurrent batches, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--concurrency', type=int, default=None)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the due messages and exit.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                close_old_connections()
+                report = deliver_batch(options['batch_size'], options['concurrency'])
+                if report.claimed:
+                    self.stdout.write(
+                        f"claimed={report.claimed} sent={report.sent} retried={report.retried} "
+                        f"failed={report.failed} deferred={report.deferred}"
+                    )
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f"smtp client: {get_smtp_client().stats()}")
+                    flush_metrics()  # The SMTP client's stats show up in /metrics next to the web workers'
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Outbox worker stopped.")
+        finally:
+            flush_metrics()
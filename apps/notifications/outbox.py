@@ -0,0 +1,108 @@
+import random
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from apps.shared.http import CircuitOpenError
+from apps.shared.util import deliver_email
+from .models import OutboxEmail
+
+DeliveryReport = namedtuple("DeliveryReport", ["claimed", "sent", "retried", "failed", "deferred"])
+
+# Outcome of a send that was not attempted because the provider's circuit is open.
+CIRCUIT_OPEN = object()
+
+
+def enqueue_email(subject, body, recipients):
+    """Store an email in the outbox; it is sent later by the outbox worker."""
+    return OutboxEmail.objects.create(subject=subject, body=body, recipients=recipients)
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given number of attempts made so far."""
+    base = settings.EMAIL_OUTBOX_RETRY_BACKOFF
+    delay = min(base * (2 ** (attempts - 1)), settings.EMAIL_OUTBOX_MAX_BACKOFF)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size):
+    """
+    Lock up to batch_size due messages and lease them to this worker.
+    Messages left in 'sending' by a crashed worker are claimed again once
+    their lease has expired.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=OutboxEmail.STATUS_QUEUED) | Q(status=OutboxEmail.STATUS_SENDING), next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[message.pk for message in messages]).update(
+            status=OutboxEmail.STATUS_SENDING,
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE),
+        )
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+def _send(message):
+    try:
+        deliver_email({"subject": message.subject, "body": message.body, "to": message.recipients})
+    except CircuitOpenError:
+        return CIRCUIT_OPEN
+    except Exception as e:
+        return str(e) or e.__class__.__name__
+    return None
+
+
+def deliver_batch(batch_size=None, concurrency=None):
+    """
+    Claim a batch of due messages, send them concurrently and record the
+    outcome of each one. Failed sends are retried with backoff until
+    EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+    """
+    messages = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not messages:
+        return DeliveryReport(0, 0, 0, 0, 0)
+
+    with ThreadPoolExecutor(max_workers=concurrency or settings.EMAIL_OUTBOX_CONCURRENCY) as executor:
+        errors = list(executor.map(_send, messages))
+
+    now = timezone.now()
+    sent_ids = []
+    deferred_ids = []
+    retried = failed = 0
+    for message, error in zip(messages, errors):
+        if error is None:
+            sent_ids.append(message.pk)
+        elif error is CIRCUIT_OPEN:
+            deferred_ids.append(message.pk)
+        elif message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            failed += 1
+            OutboxEmail.objects.filter(pk=message.pk).update(status=OutboxEmail.STATUS_FAILED, last_error=error)
+        else:
+            retried += 1
+            OutboxEmail.objects.filter(pk=message.pk).update(
+                status=OutboxEmail.STATUS_QUEUED,
+                last_error=error,
+                next_attempt_at=now + retry_delay(message.attempts),
+            )
+
+    if sent_ids:
+        OutboxEmail.objects.filter(pk__in=sent_ids).update(status=OutboxEmail.STATUS_SENT, sent_at=now, last_error=None)
+
+    if deferred_ids:
+        # Nothing was sent, so the attempt is given back instead of counting towards the limit.
+        OutboxEmail.objects.filter(pk__in=deferred_ids).update(
+            status=OutboxEmail.STATUS_QUEUED,
+            attempts=F('attempts') - 1,
+            next_attempt_at=now + timedelta(seconds=settings.SMTP_CIRCUIT_RESET_TIMEOUT),
+        )
+
+    return DeliveryReport(len(messages), len(sent_ids), retried, failed, len(deferred_ids))
@@ -0,0 +1,144 @@
+import http.server
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from apps.shared import http as smtp_http
+from .models import OutboxEmail
+from .outbox import deliver_batch, enqueue_email
+
+
+class StubMailHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((self.headers['Authorization'], json.loads(body)))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class StubMailServer(http.server.ThreadingHTTPServer):
+    """Local stand-in for the SMTP API. Answers with the queued statuses, then 200."""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubMailHandler)
+        self.received = []
+        self.statuses = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/send"
+
+
+@override_settings(
+    SMTP_API_KEY='test-key',
+    SMTP_CIRCUIT_FAILURE_THRESHOLD=5,
+    SMTP_CIRCUIT_RESET_TIMEOUT=30,
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_BACKOFF=30,
+    EMAIL_OUTBOX_MAX_BACKOFF=3600,
+)
+class OutboxDeliveryTests(TestCase):
+    def setUp(self):
+        self.server = StubMailServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        settings_override = override_settings(SMTP_SEND_MAIL_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Every test gets a fresh SMTP client (and circuit breaker) for the stub's URL
+        client_reset = mock.patch.object(smtp_http, '_client', None)
+        client_reset.start()
+        self.addCleanup(client_reset.stop)
+
+    def make_due(self, message):
+        OutboxEmail.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+
+    def test_delivers_queued_message(self):
+        message = enqueue_email("Welcome", "Hello", ["candidate@example.com"])
+
+        report = deliver_batch()
+
+        self.assertEqual((report.claimed, report.sent), (1, 1))
+        self.assertEqual(
+            self.server.received,
+            [("Bearer test-key", {"subject": "Welcome", "body": "Hello", "to": ["candidate@example.com"]})],
+        )
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxEmail.STATUS_SENT)
+        self.assertEqual(message.attempts, 1)
+        self.assertIsNotNone(message.sent_at)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.server.statuses = [500]
+        message = enqueue_email("Reset", "Link", ["candidate@example.com"])
+
+        before = timezone.now()
+        report = deliver_batch()
+
+        self.assertEqual(report.retried, 1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxEmail.STATUS_QUEUED)
+        self.assertEqual(message.attempts, 1)
+        self.assertIn("Failed to send email", message.last_error)
+        # 30 seconds after the first attempt, with up to 20% jitter
+        self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=24))
+        self.assertLessEqual(message.next_attempt_at, timezone.now() + timedelta(seconds=36))
+
+        # Not due yet, so nothing is claimed
+        self.assertEqual(deliver_batch().claimed, 0)
+
+        self.make_due(message)
+        self.assertEqual(deliver_batch().sent, 1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxEmail.STATUS_SENT)
+        self.assertEqual(message.attempts, 2)
+        self.assertEqual(len(self.server.received), 2)
+
+    def test_message_fails_permanently_after_max_attempts(self):
+        self.server.statuses = [500, 500, 500]
+        message = enqueue_email("Verify", "Link", ["candidate@example.com"])
+
+        reports = []
+        for _ in range(3):
+            reports.append(deliver_batch())
+            self.make_due(message)
+
+        self.assertEqual([r.retried for r in reports], [1, 1, 0])
+        self.assertEqual(reports[-1].failed, 1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxEmail.STATUS_FAILED)
+        self.assertEqual(message.attempts, 3)
+        # Failed messages are left alone
+        self.assertEqual(deliver_batch().claimed, 0)
+        self.assertEqual(len(self.server.received), 3)
+
+    @override_settings(SMTP_CIRCUIT_FAILURE_THRESHOLD=1)
+    def test_open_circuit_defers_without_sending(self):
+        self.server.statuses = [500]
+        first = enqueue_email("First", "Body", ["a@example.com"])
+        self.assertEqual(deliver_batch().retried, 1)  # Opens the circuit
+        self.make_due(first)
+        second = enqueue_email("Second", "Body", ["b@example.com"])
+
+        before = timezone.now()
+        report = deliver_batch()
+
+        self.assertEqual((report.claimed, report.deferred, report.sent), (2, 2, 0))
+        self.assertEqual(len(self.server.received), 1)
+        for message, attempts in ((first, 1), (second, 0)):
+            message.refresh_from_db()
+            self.assertEqual(message.status, OutboxEmail.STATUS_QUEUED)
+            # The skipped attempt does not count towards EMAIL_OUTBOX_MAX_ATTEMPTS
+            self.assertEqual(message.attempts, attempts)
+            # Deferred until the circuit lets a trial call through
+            self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=30))
@@ -0,0 +1,91 @@
+import functools
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from .fastjson import dumps, loads
+
+# Helpers for the async-native views served under ASGI. They are plain Django
+# async views (DRF's APIView is sync-only), so they parse and answer JSON themselves.
+
+
+class BadRequest(Exception):
+    pass
+
+
+def parse_json_body(request):
+    """Return the decoded JSON body of a request (an empty dict for an empty body)."""
+    if not request.body:
+        return {}
+    try:
+        data = loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        raise BadRequest("JSON parse error")
+    if not isinstance(data, dict):
+        raise BadRequest("Expected a JSON object")
+    return data
+
+
+def json_response(data, status=200, headers=None):
+    # Any JSON value, so serializer lists can be returned as-is
+    return HttpResponse(dumps(data), status=status, headers=headers, content_type='application/json')
+
+
+def exception_response(exc):
+    """Render a DRF APIException the way DRF's exception handler would."""
+    data = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+    return json_response(data, status=exc.status_code)
+
+
+async def authenticate_request(request):
+    """
+    Authenticate a plain Django request with REST_FRAMEWORK's
+    DEFAULT_AUTHENTICATION_CLASSES, as DRF would. Returns the user or None.
+    """
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = await sync_to_async(authentication_class().authenticate)(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+def async_api_view(methods, authenticated=False):
+    """
+    Decorator for async views: rejects other HTTP methods with 405, optionally
+    requires an authenticated user (set on request.user), and exempts the
+    view from CSRF (it is token-authenticated like the DRF views).
+    Django 4.2's require_http_methods/csrf_exempt wrap views in sync functions,
+    which would hide the coroutine from the handler.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response(
+                    {"detail": f'Method "{request.method}" not allowed.'},
+                    status=405,
+                    headers={"Allow": ", ".join(methods)}
+                )
+            if authenticated:
+                try:
+                    user = await authenticate_request(request)
+                except APIException as e:
+                    return exception_response(e)
+                if user is None or not user.is_authenticated:
+                    return json_response({"detail": "Authentication credentials were not provided."}, status=401)
+                request.user = user
+            return await view(request, *args, **kwargs)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def documented_as(view, drf_view):
+    """
+    Have schema generation document an async view as the DRF view it
+    replaces (drf_spectacular only inspects DRF views), so the OpenAPI
+    schema does not lose endpoints under ASGI.
+    """
+    view.cls = drf_view.cls
+    view.initkwargs = drf_view.initkwargs
+    return view
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db import transaction
+
+
+class LRUCache:
+    """
+    Small thread-safe, per-process LRU cache.
+    Keeps hit/miss counters so callers can report how effective it is.
+    With `ttl` (seconds), entries also expire that long after being set.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class StampedLRUCache(LRUCache):
+    """
+    Per-process LRU cache whose entries are only used while a per-key stamp
+    in the default Django cache is unchanged. invalidate() replaces the
+    stamp once the writer's transaction commits, so with a shared cache
+    (CACHE_URL) a change made by any process invalidates every process's
+    copy. A lookup costs one read of the shared cache.
+
+    A reader stores what it loaded under the stamp it saw before loading,
+    so a load that overlaps a change is stored under the old stamp and
+    never used.
+    """
+
+    def __init__(self, prefix, maxsize=1024, ttl=None):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.prefix = prefix
+
+    def _stamp_key(self, key):
+        return f"{self.prefix}:{key}:stamp"
+
+    def stamp(self, key):
+        stamp_key = self._stamp_key(key)
+        stamp = cache.get(stamp_key)
+        if stamp is None:
+            # A lost stamp must not restart at a value an old entry may still carry
+            cache.add(stamp_key, time.time_ns(), timeout=None)
+            stamp = cache.get(stamp_key)
+        return stamp
+
+    def lookup(self, key):
+        """Return (value or None, stamp); pass the stamp to store() after a miss."""
+        stamp = self.stamp(key)
+        entry = self.get(key)
+        if entry is None:
+            return None, stamp
+        if entry[0] != stamp:
+            with self._lock:
+                self.hits -= 1
+                self.misses += 1
+            return None, stamp
+        return entry[1], stamp
+
+    def store(self, key, value, stamp):
+        self.set(key, (stamp, value))
+
+    def invalidate(self, key):
+        """Invalidate the entry of `key` in every process, after the current transaction commits."""
+        self.delete(key)
+        transaction.on_commit(lambda: self._bump(key))
+
+    def _bump(self, key):
+        try:
+            cache.incr(self._stamp_key(key))
+        except ValueError:
+            pass  # No stamp: nothing was stored under one either
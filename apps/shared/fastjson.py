@@ -0,0 +1,58 @@
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional: without it everything falls back to the stdlib json module
+    orjson = None
+
+# orjson encodes datetimes, dates, times and UUIDs itself (UTC as 'Z', like
+# DRF). Anything else it does not know, such as Decimals, lazy translations
+# or querysets, goes through DRF's encoder, so it comes out as on the stdlib path.
+_drf_encoder = JSONEncoder()
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def dumps(data):
+    """Encode to compact UTF-8 JSON bytes, like DRF's JSONRenderer with its default settings."""
+    if orjson is None:
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    return orjson.dumps(data, default=_drf_encoder.default, option=OPTIONS)
+
+
+def loads(content):
+    """Decode JSON bytes or str. Raises ValueError on invalid JSON."""
+    if orjson is None:
+        return json.loads(content)
+    return orjson.loads(content)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            # Indented output (?indent= or the browsable API) is rare; orjson only indents by 2
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like DRF does, so responses stay safe to embed in a <script>
+        return dumps(data).replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser that decodes with orjson when it is installed."""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from apps.shared.metrics import Histogram, register_client
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider that is considered down."""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After failure_threshold consecutive failures the
+    circuit opens and calls fail fast for reset_timeout seconds; then a single
+    trial call is let through (half-open) to decide whether to close again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._clock = clock
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+class SmtpApiClient:
+    """
+    Keep-alive HTTP client for the SMTP API: one pooled session per process,
+    connect/read timeouts, a circuit breaker and call metrics.
+    """
+
+    def __init__(self, url, api_key, connect_timeout, read_timeout, pool_size,
+                 failure_threshold, reset_timeout):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = Histogram()
+        self.rejected = 0
+        self.errors = 0
+
+    def post(self, payload):
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("SMTP API circuit is open; not sending.")
+
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except requests.RequestException:
+            self.errors += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.latency.observe(time.perf_counter() - started)
+
+        # Only server-side failures say anything about the provider's health.
+        if response.status_code >= 500:
+            self.errors += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def pool_stats(self):
+        """
+        Connection pool reuse: a miss is a request that had to open a new
+        connection, every other request reused a kept-alive one.
+        """
+        requests_made = connections_opened = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_made += pool.num_requests
+                connections_opened += pool.num_connections
+        return {"hits": requests_made - connections_opened, "misses": connections_opened}
+
+    def stats(self):
+        return {
+            "pool": self.pool_stats(),
+            "circuit": self.breaker.state,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "latency": self.latency.snapshot(),
+        }
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_smtp_client():
+    """Return the process-wide SMTP API client, creating it on first use (and again after a fork)."""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = SmtpApiClient(
+                    url=settings.SMTP_SEND_MAIL_URL,
+                    api_key=settings.SMTP_API_KEY,
+                    connect_timeout=settings.SMTP_CONNECT_TIMEOUT,
+                    read_timeout=settings.SMTP_READ_TIMEOUT,
+                    pool_size=settings.SMTP_POOL_SIZE,
+                    failure_threshold=settings.SMTP_CIRCUIT_FAILURE_THRESHOLD,
+                    reset_timeout=settings.SMTP_CIRCUIT_RESET_TIMEOUT,
+                )
+                _client_pid = pid
+                register_client('smtp', _client.stats)
+    return _client
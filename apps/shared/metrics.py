@@ -0,0 +1,364 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+from bisect import bisect_left
+
+# Upper bounds in seconds, in the style of Prometheus latency buckets.
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram."""
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """Return cumulative bucket counts keyed by upper bound, plus sum and count."""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+
+class RequestMetrics:
+    """
+    Per-process request metrics keyed by view (URL name): request counts by
+    method and status, a latency histogram, DB query count and time, and
+    response bytes (None for a streamed body of unknown size, which is
+    counted as streamed instead). dump() returns plain data that can be
+    merged across processes with merge_snapshots().
+    """
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, method, status, duration, queries, query_seconds, response_bytes):
+        index = bisect_left(self.buckets, duration)
+        with self._lock:
+            entry = self._views.get(view)
+            if entry is None:
+                entry = self._views[view] = {
+                    "requests": {},
+                    "latency": [0] * (len(self.buckets) + 1),
+                    "latency_sum": 0.0,
+                    "queries": 0,
+                    "query_seconds": 0.0,
+                    "response_bytes": 0,
+                    "streamed": 0,
+                }
+            key = f"{method} {status}"
+            entry["requests"][key] = entry["requests"].get(key, 0) + 1
+            entry["latency"][index] += 1
+            entry["latency_sum"] += duration
+            entry["queries"] += queries
+            entry["query_seconds"] += query_seconds
+            if response_bytes is None:
+                entry["streamed"] += 1
+            else:
+                entry["response_bytes"] += response_bytes
+
+    def dump(self):
+        with self._lock:
+            views = {
+                view: dict(entry, requests=dict(entry["requests"]), latency=list(entry["latency"]))
+                for view, entry in self._views.items()
+            }
+        return {
+            "buckets": list(self.buckets), "views": views,
+            "caches": collect_cache_stats(), "pools": collect_pool_stats(), "clients": collect_client_stats(),
+        }
+
+
+_cache_collectors = {}
+
+
+def register_cache(name, stats):
+    """Report a per-process cache in the metrics; `stats` returns {"size", "hits", "misses"}."""
+    _cache_collectors[name] = stats
+
+
+def collect_cache_stats():
+    return {name: stats() for name, stats in _cache_collectors.items()}
+
+
+_pool_collectors = {}
+POOL_FIELDS = (
+    "max_size", "idle", "in_use", "opened", "discarded", "checkouts", "waits", "wait_seconds", "timeouts", "failed_checks",
+)
+
+
+def register_pool(name, stats):
+    """Report a per-process connection pool in the metrics; `stats` returns a dict with POOL_FIELDS."""
+    _pool_collectors[name] = stats
+
+
+def collect_pool_stats():
+    return {name: stats() for name, stats in _pool_collectors.items()}
+
+
+_client_collectors = {}
+
+
+def register_client(name, stats):
+    """Report a per-process outbound HTTP client in the metrics; `stats` returns SmtpApiClient.stats()-shaped data."""
+    _client_collectors[name] = stats
+
+
+CLIENT_FIELDS = ("pool_hits", "pool_misses", "rejected", "errors", "circuit_open")
+
+
+def collect_client_stats():
+    clients = {}
+    for name, collect in _client_collectors.items():
+        stats = collect()
+        clients[name] = {
+            "pool_hits": stats["pool"]["hits"],
+            "pool_misses": stats["pool"]["misses"],
+            "rejected": stats["rejected"],
+            "errors": stats["errors"],
+            "circuit_open": int(stats["circuit"] != "closed"),
+            "latency": stats["latency"],
+        }
+    return clients
+
+
+# Fields that describe a process's current state rather than count events:
+# dropped from the snapshots of processes that have exited.
+GAUGE_FIELDS = {"caches": ("size",), "pools": ("max_size", "idle", "in_use"), "clients": ("circuit_open",)}
+
+
+def without_gauges(snapshot):
+    """Return a copy of a process snapshot with its gauges zeroed, keeping its counters."""
+    snapshot = dict(snapshot)
+    for section, fields in GAUGE_FIELDS.items():
+        snapshot[section] = {
+            name: dict(stats, **dict.fromkeys(fields, 0)) for name, stats in snapshot.get(section, {}).items()
+        }
+    return snapshot
+
+
+def _pid_exited(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # Alive, as another user
+    return False
+
+
+class MetricsStore:
+    """
+    File-backed store that lets worker processes share metrics without an
+    external service: each process atomically rewrites its own snapshot
+    file and readers merge all of them. When a worker exits, retire() folds
+    its counters into one "retired" snapshot and removes its file; until
+    then (or when nothing calls it) read_all() leaves out the gauges of
+    processes that are gone, so they are not summed with the live ones.
+    """
+    RETIRED = "retired"
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, name):
+        return os.path.join(self.directory, f"metrics-{name}.json")
+
+    def write(self, snapshot, name=None):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".metrics-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path(name or os.getpid()))
+
+    def retire(self, pid):
+        """
+        Fold the counters of an exited process into the retired snapshot.
+        Called from the gunicorn master only, so retirements never race.
+        """
+        dead = self._load(self.path(pid))
+        if dead is None:
+            return
+        retired = self._load(self.path(self.RETIRED))
+        snapshots = [without_gauges(dead)] + ([retired] if retired else [])
+        self.write(merge_snapshots(snapshots), name=self.RETIRED)
+        os.remove(self.path(pid))
+
+    def clear(self):
+        """Remove every process snapshot, e.g. those of a previous server run."""
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def read_all(self):
+        snapshots = []
+        for path in glob.glob(self.path("*")):
+            snapshot = self._load(path)
+            if snapshot is None:
+                continue  # Removed or being replaced; the next scrape will see it
+            name = os.path.basename(path)[len("metrics-"):-len(".json")]
+            if name.isdigit() and _pid_exited(int(name)):
+                snapshot = without_gauges(snapshot)
+            snapshots.append(snapshot)
+        return snapshots
+
+    def _load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def merge_snapshots(snapshots):
+    """Sum process snapshots (from RequestMetrics.dump) into one."""
+    merged = {"buckets": None, "views": {}, "caches": {}, "pools": {}, "clients": {}}
+    for snapshot in snapshots:
+        merged["buckets"] = merged["buckets"] or snapshot["buckets"]
+        if snapshot["buckets"] != merged["buckets"]:
+            continue  # Written with other bucket settings (e.g. before a deploy)
+        for view, entry in snapshot["views"].items():
+            target = merged["views"].setdefault(view, {
+                "requests": {}, "latency": [0] * len(entry["latency"]), "latency_sum": 0.0,
+                "queries": 0, "query_seconds": 0.0, "response_bytes": 0, "streamed": 0,
+            })
+            for key, count in entry["requests"].items():
+                target["requests"][key] = target["requests"].get(key, 0) + count
+            target["latency"] = [a + b for a, b in zip(target["latency"], entry["latency"])]
+            for field in ("latency_sum", "queries", "query_seconds", "response_bytes", "streamed"):
+                target[field] += entry.get(field, 0)
+        for name, stats in snapshot.get("caches", {}).items():
+            target = merged["caches"].setdefault(name, {"size": 0, "hits": 0, "misses": 0})
+            for field in target:
+                target[field] += stats.get(field, 0)
+        for name, stats in snapshot.get("pools", {}).items():
+            target = merged["pools"].setdefault(name, dict.fromkeys(POOL_FIELDS, 0))
+            for field in POOL_FIELDS:
+                target[field] += stats.get(field, 0)
+        for name, stats in snapshot.get("clients", {}).items():
+            target = merged["clients"].setdefault(name, dict.fromkeys(CLIENT_FIELDS, 0))
+            for field in CLIENT_FIELDS:
+                target[field] += stats.get(field, 0)
+            latency = target.setdefault("latency", {"buckets": {}, "sum": 0.0, "count": 0})
+            for bound, count in stats["latency"]["buckets"].items():
+                latency["buckets"][bound] = latency["buckets"].get(bound, 0) + count
+            latency["sum"] += stats["latency"]["sum"]
+            latency["count"] += stats["latency"]["count"]
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def render_prometheus(merged, prefix="rockae"):
+    """Render merged metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+    views = sorted(merged["views"].items())
+    family("http_requests_total", "counter", "Requests by view, method and status.")
+    for view, entry in views:
+        for key, count in sorted(entry["requests"].items()):
+            method, status = key.split(" ", 1)
+            lines.append(f"{prefix}_http_requests_total{{{_labels(view=view, method=method, status=status)}}} {count}")
+
+    family("http_request_duration_seconds", "histogram", "Time spent in the view and middleware, by view.")
+    bounds = [str(bound) for bound in merged["buckets"] or []] + ["+Inf"]
+    for view, entry in views:
+        running = 0
+        for bound, count in zip(bounds, entry["latency"]):
+            running += count
+            lines.append(f"{prefix}_http_request_duration_seconds_bucket{{{_labels(view=view, le=bound)}}} {running}")
+        lines.append(f"{prefix}_http_request_duration_seconds_sum{{{_labels(view=view)}}} {entry['latency_sum']}")
+        lines.append(f"{prefix}_http_request_duration_seconds_count{{{_labels(view=view)}}} {running}")
+
+    for name, field, help_text in (
+        ("db_queries_total", "queries", "Database queries by view."),
+        ("db_query_duration_seconds_total", "query_seconds", "Time spent in database queries by view."),
+        ("http_response_bytes_total", "response_bytes", "Response body bytes by view (streamed bodies excluded)."),
+        ("http_streamed_responses_total", "streamed", "Responses streamed with no known size, so not in http_response_bytes_total."),
+    ):
+        family(name, "counter", help_text)
+        for view, entry in views:
+            lines.append(f"{prefix}_{name}{{{_labels(view=view)}}} {entry[field]}")
+
+    caches = sorted(merged["caches"].items())
+    for name, field, kind, help_text in (
+        ("cache_hits_total", "hits", "counter", "In-process cache hits."),
+        ("cache_misses_total", "misses", "counter", "In-process cache misses."),
+        ("cache_entries", "size", "gauge", "Entries held by in-process caches, summed over workers."),
+    ):
+        family(name, kind, help_text)
+        for cache, stats in caches:
+            lines.append(f"{prefix}_{name}{{{_labels(cache=cache)}}} {stats[field]}")
+
+    pools = sorted(merged["pools"].items())
+    family("db_pool_connections", "gauge", "Pooled database connections by state, summed over workers.")
+    for pool, stats in pools:
+        for state in ("idle", "in_use"):
+            lines.append(f"{prefix}_db_pool_connections{{{_labels(pool=pool, state=state)}}} {stats[state]}")
+    for name, field, kind, help_text in (
+        ("db_pool_max_connections", "max_size", "gauge", "Connection limit of the pools, summed over workers."),
+        ("db_pool_checkouts_total", "checkouts", "counter", "Connections handed out by the pool."),
+        ("db_pool_connections_opened_total", "opened", "counter", "Connections opened by the pool."),
+        ("db_pool_connections_discarded_total", "discarded", "counter", "Broken, expired or surplus connections closed by the pool."),
+        ("db_pool_waits_total", "waits", "counter", "Checkouts that had to wait for a free connection."),
+        ("db_pool_wait_seconds_total", "wait_seconds", "counter", "Time spent waiting for a free connection."),
+        ("db_pool_timeouts_total", "timeouts", "counter", "Checkouts that gave up waiting for a connection."),
+        ("db_pool_health_check_failures_total", "failed_checks", "counter", "Idle connections that failed their health check."),
+    ):
+        family(name, kind, help_text)
+        for pool, stats in pools:
+            lines.append(f"{prefix}_{name}{{{_labels(pool=pool)}}} {stats[field]}")
+
+    clients = sorted(merged["clients"].items())
+    family("http_client_request_duration_seconds", "histogram", "Time spent in calls to external HTTP APIs, by client.")
+    for client, stats in clients:
+        latency = stats["latency"]
+        for bound, count in latency["buckets"].items():
+            lines.append(f"{prefix}_http_client_request_duration_seconds_bucket{{{_labels(client=client, le=bound)}}} {count}")
+        lines.append(f"{prefix}_http_client_request_duration_seconds_sum{{{_labels(client=client)}}} {latency['sum']}")
+        lines.append(f"{prefix}_http_client_request_duration_seconds_count{{{_labels(client=client)}}} {latency['count']}")
+    for name, field, kind, help_text in (
+        ("http_client_connections_reused_total", "pool_hits", "counter", "Calls that reused a kept-alive connection."),
+        ("http_client_connections_opened_total", "pool_misses", "counter", "Calls that had to open a new connection."),
+        ("http_client_errors_total", "errors", "counter", "Calls that failed to connect or got a 5xx answer."),
+        ("http_client_rejected_total", "rejected", "counter", "Calls failed fast by an open circuit breaker."),
+        ("http_client_circuit_open", "circuit_open", "gauge", "Workers whose circuit breaker for the client is open or half-open."),
+    ):
+        family(name, kind, help_text)
+        for client, stats in clients:
+            lines.append(f"{prefix}_{name}{{{_labels(client=client)}}} {stats[field]}")
+
+    return "\n".join(lines) + "\n"
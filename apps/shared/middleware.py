@@ -0,0 +1,154 @@
+import atexit
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from .metrics import MetricsStore, RequestMetrics
+from .query_budget import check_query_budget, counts_towards_budget, get_query_budget
+
+request_metrics = RequestMetrics()
+metrics_store = MetricsStore(settings.METRICS_DIR)
+
+# Query totals of the request being handled; copied into sync_to_async threads with the context
+_query_stats = ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    __slots__ = ('count', 'budgeted', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.budgeted = 0  # Excludes transaction control, see apps.shared.query_budget
+        self.seconds = 0.0
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.budgeted += counts_towards_budget(sql)
+        stats.seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def _install_query_recorder(sender, connection, **kwargs):
+    # First in the list, so it survives the pop() of temporary execute_wrapper() blocks
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def flush_metrics():
+    """Write this process's metrics to the shared store."""
+    metrics_store.write(request_metrics.dump())
+
+
+class MetricsMiddleware:
+    """
+    Records count, latency, DB queries and response size of every request
+    by URL name. The hot path only takes a few timer reads and one locked
+    counter update. Totals are written to the file-backed store at most
+    every METRICS_FLUSH_INTERVAL seconds, on the next request after the
+    interval or at exit, and /metrics merges them across worker processes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.flush_interval = settings.METRICS_FLUSH_INTERVAL
+        self.last_flush = time.monotonic()
+        atexit.register(flush_metrics)
+        # Connections opened before this module was imported missed connection_created
+        for connection in connections.all(initialized_only=True):
+            _install_query_recorder(sender=None, connection=connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def record(self, request, response, duration, stats):
+        match = request.resolver_match
+        if match is None:
+            view = 'unresolved'
+        else:
+            view = match.url_name or 'unnamed'
+        if response.streaming:
+            size = int(response['Content-Length']) if response.has_header('Content-Length') else None
+        else:
+            size = len(response.content)
+        request_metrics.record(view, request.method, response.status_code, duration, stats.count, stats.seconds, size)
+
+        now = time.monotonic()
+        if now - self.last_flush >= self.flush_interval:
+            self.last_flush = now
+            flush_metrics()
+
+
+class QueryBudgetMiddleware:
+    """
+    Logs or raises (QUERY_BUDGET_ACTION) when a request runs more queries
+    than its view's @query_budget. It reads the query count kept by
+    MetricsMiddleware, so it must come right after it. Queries run while a
+    streaming response is sent are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.QUERY_BUDGET_ACTION == 'off':
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.check(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.check(request)
+        return response
+
+    def check(self, request):
+        stats = _query_stats.get()
+        match = request.resolver_match
+        if stats is None or match is None:
+            return
+        check_query_budget(match.view_name, get_query_budget(match.func), stats.budgeted)
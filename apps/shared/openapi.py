@@ -0,0 +1,203 @@
+import functools
+import gzip
+import hashlib
+import importlib
+import logging
+import os
+import threading
+import time
+from importlib import metadata
+from django.conf import settings
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+# Precomputed OpenAPI schema. The schema only changes with the code, so it is
+# generated once, by the build_openapi_schema command at image build time or
+# else on the first request, and kept as files (plain and gzipped) in
+# OPENAPI_SCHEMA_DIR and in memory. drf_spectacular's generator is imported
+# only when a schema actually has to be generated.
+#
+# The files are stamped with a hash of the code they were generated from
+# (VERSION_FILE). Files stamped by other code, e.g. a directory left over
+# from a previous release, are regenerated rather than served.
+#
+# Views take their schema annotations (extend_schema and its helpers) from
+# here. Where drf_spectacular is not installed (the slim runtime profile,
+# which serves the schema built at image build time) they are inert
+# stand-ins, so API workers never import drf_spectacular.
+SCHEMA_ANNOTATIONS = 'drf_spectacular' in settings.INSTALLED_APPS
+
+if SCHEMA_ANNOTATIONS:
+    from drf_spectacular.types import OpenApiTypes  # noqa: F401
+    from drf_spectacular.utils import (  # noqa: F401
+        OpenApiParameter, extend_schema, extend_schema_view, inline_serializer,
+    )
+else:
+    class _Ignored:
+        """Any call or attribute gives itself back: OpenApiParameter(...), OpenApiTypes.STR, ..."""
+
+        def __call__(self, *args, **kwargs):
+            return self
+
+        def __getattr__(self, name):
+            return self
+
+    OpenApiParameter = OpenApiTypes = inline_serializer = _Ignored()
+
+    def extend_schema(*args, **kwargs):
+        return lambda view: view
+
+    extend_schema_view = extend_schema
+
+
+class SchemaUnavailable(Exception):
+    """No current schema is stored and this process cannot generate one."""
+
+FORMATS = {
+    # format: (file name, content type)
+    'yaml': ('schema.yaml', 'application/vnd.oai.openapi; charset=utf-8'),
+    'json': ('schema.json', 'application/vnd.oai.openapi+json; charset=utf-8'),
+}
+VERSION_FILE = 'schema.version'
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """
+    Hash of everything the schema is generated from: the Python sources of
+    the apps and of the URLconf's package, SPECTACULAR_SETTINGS and the
+    installed drf-spectacular version. Nothing that differs between runtime
+    profiles (such as the renderer classes) goes in, so a schema built with
+    the full profile is current for slim workers too.
+    """
+    urlconf_dir = os.path.dirname(importlib.import_module(settings.ROOT_URLCONF).__file__)
+    digest = hashlib.sha256()
+    for top in (os.path.join(settings.BASE_DIR, 'apps'), urlconf_dir):
+        for root, dirs, files in os.walk(top):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    path = os.path.join(root, name)
+                    digest.update(os.path.relpath(path, settings.BASE_DIR).encode())
+                    with open(path, 'rb') as f:
+                        digest.update(f.read())
+    digest.update(repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode())
+    try:
+        digest.update(metadata.version('drf-spectacular').encode())
+    except metadata.PackageNotFoundError:
+        pass
+    return digest.hexdigest()[:20]
+
+
+class SchemaArtifact:
+    """One rendered schema: its bytes, the gzipped bytes and validators for conditional requests."""
+
+    def __init__(self, content, compressed, last_modified):
+        self.content = content
+        self.compressed = compressed
+        self.last_modified = last_modified
+        digest = hashlib.sha256(content).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+        self.last_modified_header = http_date(last_modified)
+
+
+def generate_schema():
+    """Generate the schema from the URL patterns and render it in every format."""
+    if not SCHEMA_ANNOTATIONS:
+        raise SchemaUnavailable(
+            "drf_spectacular is not installed, so the views carry no schema annotations; "
+            "build the schema with `manage.py build_openapi_schema` under the full runtime profile"
+        )
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return {
+        'yaml': OpenApiYamlRenderer().render(schema, renderer_context={}),
+        'json': OpenApiJsonRenderer().render(schema, renderer_context={}),
+    }
+
+
+def _write_atomic(path, content):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def write_schema(directory=None):
+    """
+    Generate the schema and write schema.{yaml,json} and their .gz next to
+    them, then the code version they belong to. Returns the paths.
+    """
+    directory = directory or settings.OPENAPI_SCHEMA_DIR
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for fmt, content in generate_schema().items():
+        path = os.path.join(directory, FORMATS[fmt][0])
+        _write_atomic(path, content)
+        # mtime=0 keeps the .gz identical across builds of the same schema
+        _write_atomic(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        paths += [path, path + '.gz']
+    # Last, so the files are only stamped current once they all are
+    path = os.path.join(directory, VERSION_FILE)
+    _write_atomic(path, code_version().encode())
+    paths.append(path)
+    return paths
+
+
+_artifacts = {}
+_lock = threading.Lock()
+
+
+def _read(fmt):
+    """The artifact stored in OPENAPI_SCHEMA_DIR, or None if it is missing or stamped by other code."""
+    directory = settings.OPENAPI_SCHEMA_DIR
+    path = os.path.join(directory, FORMATS[fmt][0])
+    try:
+        with open(os.path.join(directory, VERSION_FILE)) as f:
+            built_for = f.read().strip()
+        if built_for != code_version():
+            logger.warning("OpenAPI schema in %s was built from other code (%s); regenerating", directory, built_for)
+            return None
+        with open(path, 'rb') as f:
+            content = f.read()
+        with open(path + '.gz', 'rb') as f:
+            compressed = f.read()
+        last_modified = os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+    return SchemaArtifact(content, compressed, last_modified)
+
+
+def _load(fmt):
+    artifact = _read(fmt)
+    if artifact is None:
+        try:
+            write_schema()
+        except OSError:
+            pass
+        else:
+            artifact = _read(fmt)
+    if artifact is None:
+        # Read-only deployment without a current prebuilt schema: keep it in memory only
+        content = generate_schema()[fmt]
+        artifact = SchemaArtifact(content, gzip.compress(content, mtime=0), time.time())
+    return artifact
+
+
+def get_schema_artifact(fmt):
+    """The schema in the given format, loaded from OPENAPI_SCHEMA_DIR (or generated) once per process."""
+    artifact = _artifacts.get(fmt)
+    if artifact is None:
+        with _lock:
+            artifact = _artifacts.get(fmt)
+            if artifact is None:
+                artifact = _artifacts[fmt] = _load(fmt)
+    return artifact
+
+
+def clear_schema_cache():
+    _artifacts.clear()
@@ -0,0 +1,81 @@
+import functools
+import os
+import threading
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+from apps.shared.metrics import register_pool
+from .pool import ConnectionPool
+
+# One pool per database alias and connection parameters in this process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _forget_pools():
+    # A forked worker opens its own connections. The inherited ones share the
+    # parent's sockets: closing one here, or freeing it with a psycopg2 that
+    # does not check the owning pid, calls PQfinish, whose Terminate message
+    # ends the parent's session. detach() points this process's copy of each
+    # socket at /dev/null first, then closes the connections.
+    for pool in _pools.values():
+        pool.detach()
+    _pools.clear()
+
+
+os.register_at_fork(after_in_child=_forget_pools)
+
+
+def get_pool(alias, conn_params, options):
+    key = (alias, tuple(sorted((name, repr(value)) for name, value in conn_params.items())))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    min_size=options.get('MIN_SIZE', 0),
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 10.0),
+                    max_idle=options.get('MAX_IDLE', 600.0),
+                    max_lifetime=options.get('MAX_LIFETIME', 3600.0),
+                    check_interval=options.get('CHECK_INTERVAL', 30.0),
+                )
+                pool.dbname = conn_params.get('dbname')
+                register_pool(alias, pool.stats)
+    return pool
+
+
+def close_pools(dbname):
+    """Close the pools connected to a database, e.g. before it is dropped."""
+    with _pools_lock:
+        for key, pool in list(_pools.items()):
+            if pool.dbname == dbname:
+                pool.close()
+                del _pools[key]
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections to the test database would block DROP DATABASE
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that takes connections from a per-process pool
+    shared by all threads, configured by the POOL dict of the database
+    settings. Closing the connection, which Django does at the end of every
+    request when CONN_MAX_AGE is 0, returns it to the pool.
+    """
+    creation_class = DatabaseCreation
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, conn_params, self.settings_dict.get('POOL', {}))
+        return self.pool.getconn(functools.partial(super().get_new_connection, conn_params))
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from collections import deque
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+class _Entry:
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection, now):
+        self.connection = connection
+        self.created_at = self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of raw psycopg2 connections to one database.
+
+    Connections are opened on demand up to max_size; when all are checked
+    out, getconn() waits up to `timeout` seconds for one to come back.
+    The most recently returned connection is handed out first, so surplus
+    connections sit idle and are closed after max_idle seconds (down to
+    min_size). A connection idle for longer than check_interval is pinged
+    before it is handed out, and one older than max_lifetime is replaced,
+    so server restarts and dropped connections are not seen by requests.
+    """
+
+    def __init__(self, min_size=0, max_size=10, timeout=10.0, max_idle=600.0, max_lifetime=3600.0, check_interval=30.0):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0  # Open connections (idle and in use) plus ones being opened
+        self._closed = False
+        self._cond = threading.Condition()
+        self.opened = 0
+        self.discarded = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.failed_checks = 0
+
+    def getconn(self, connect):
+        """Check out a connection, opening one with connect() when none is idle."""
+        while True:
+            entry = self._acquire()
+            if entry is None:
+                break  # A slot was reserved for a new connection
+            if self._usable(entry):
+                with self._cond:
+                    self._in_use[id(entry.connection)] = entry
+                return entry.connection
+            self._discard(entry)
+
+        try:
+            connection = connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.opened += 1
+            self._in_use[id(connection)] = _Entry(connection, time.monotonic())
+        return connection
+
+    def putconn(self, connection):
+        """Return a checked-out connection; one that cannot be reset is closed."""
+        with self._cond:
+            entry = self._in_use.pop(id(connection))
+        if self._closed or not self._reset(connection):
+            self._discard(entry)
+            return
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def close(self):
+        """Close idle connections now and checked-out ones when they are returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+        for entry in idle:
+            self._discard(entry)
+
+    def detach(self):
+        """
+        In a forked child: close this process's copies of the connections
+        without ending their server sessions, which still belong to the
+        parent. The child is single-threaded here, so no lock is taken (one
+        held by another parent thread at fork time would never be released).
+        """
+        entries = list(self._idle) + list(self._in_use.values())
+        self._idle, self._in_use, self._closed = deque(), {}, True
+        devnull = os.open(os.devnull, os.O_RDWR)
+        try:
+            for entry in entries:
+                if not entry.connection.closed:
+                    # PQfinish then writes its Terminate message to /dev/null
+                    os.dup2(devnull, entry.connection.fileno())
+                    entry.connection.close()
+        finally:
+            os.close(devnull)
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "max_size": self.max_size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "opened": self.opened,
+                "discarded": self.discarded,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "timeouts": self.timeouts,
+                "failed_checks": self.failed_checks,
+            }
+
+    def _acquire(self):
+        """Pop an idle entry, or reserve a slot for a new connection (None), waiting while the pool is full."""
+        expired = []
+        try:
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.OperationalError("connection pool is closed")
+                # Idle connections are ordered oldest first
+                now = time.monotonic()
+                while self._idle and self._size - len(expired) > self.min_size and now - self._idle[0].last_used > self.max_idle:
+                    expired.append(self._idle.popleft())
+
+                started = deadline = None
+                while not self._idle and self._size - len(expired) >= self.max_size:
+                    now = time.monotonic()
+                    if deadline is None:
+                        started, deadline = now, now + self.timeout
+                        self.waits += 1
+                    if now >= deadline:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"no database connection available within {self.timeout}s (pool of {self.max_size})")
+                    self._cond.wait(deadline - now)
+                if started is not None:
+                    self.wait_seconds += time.monotonic() - started
+
+                self.checkouts += 1
+                if self._idle:
+                    return self._idle.pop()
+                self._size += 1
+                return None
+        finally:
+            for entry in expired:
+                self._discard(entry)
+
+    def _usable(self, entry):
+        connection = entry.connection
+        now = time.monotonic()
+        if connection.closed or now - entry.created_at > self.max_lifetime:
+            return False
+        if now - entry.last_used > self.check_interval:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                with self._cond:
+                    self.failed_checks += 1
+                return False
+        return True
+
+    def _reset(self, connection):
+        """End any transaction left open, so the next user starts clean."""
+        if connection.closed:
+            return False
+        status = connection.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        try:
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, entry):
+        try:
+            entry.connection.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._cond.notify()
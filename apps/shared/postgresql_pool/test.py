@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+from django.test import SimpleTestCase
+import psycopg2
+from psycopg2 import extensions
+from .pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        self.connection.executed.append(sql)
+        if self.connection.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+
+class FakeConnection:
+    """The parts of a psycopg2 connection the pool uses."""
+
+    def __init__(self, fd=None):
+        self.closed = 0
+        self.broken = False
+        self.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+        self.executed = []
+        self.rollbacks = 0
+        self.fd = fd
+
+    @property
+    def info(self):
+        return SimpleNamespace(transaction_status=self.transaction_status)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+    def fileno(self):
+        return self.fd
+
+
+class FakeConnect:
+    """A connection factory that records what it opened and can be made to fail."""
+
+    def __init__(self):
+        self.opened = []
+        self.error = None
+
+    def __call__(self):
+        if self.error:
+            raise self.error
+        connection = FakeConnection()
+        self.opened.append(connection)
+        return connection
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.connect = FakeConnect()
+
+    def make_pool(self, **options):
+        options = {'max_size': 2, 'timeout': 1.0, **options}
+        return ConnectionPool(**options)
+
+    def age(self, pool, seconds):
+        """Make every idle connection look `seconds` older."""
+        for entry in pool._idle:
+            entry.created_at -= seconds
+            entry.last_used -= seconds
+
+    def test_returned_connection_is_reused(self):
+        pool = self.make_pool()
+        first = pool.getconn(self.connect)
+        pool.putconn(first)
+        self.assertIs(pool.getconn(self.connect), first)
+        self.assertEqual(len(self.connect.opened), 1)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+
+    def test_most_recently_returned_connection_is_handed_out_first(self):
+        pool = self.make_pool()
+        first, second = pool.getconn(self.connect), pool.getconn(self.connect)
+        pool.putconn(first)
+        pool.putconn(second)
+        self.assertIs(pool.getconn(self.connect), second)
+
+    def test_full_pool_waits_for_a_connection_to_come_back(self):
+        pool = self.make_pool(max_size=1)
+        held = pool.getconn(self.connect)
+        timer = threading.Timer(0.05, pool.putconn, [held])
+        timer.start()
+        self.addCleanup(timer.join)
+
+        self.assertIs(pool.getconn(self.connect), held)
+        stats = pool.stats()
+        self.assertEqual((stats['waits'], stats['timeouts'], stats['opened']), (1, 0, 1))
+        self.assertGreater(stats['wait_seconds'], 0)
+
+    def test_full_pool_times_out(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.getconn(self.connect)
+        started = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(self.connect)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_failed_connect_gives_its_slot_back(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        self.connect.error = psycopg2.OperationalError("could not connect to server")
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.getconn(self.connect)
+        self.assertEqual(pool.stats()['in_use'], 0)
+
+        self.connect.error = None
+        self.assertIs(pool.getconn(self.connect), self.connect.opened[0])
+
+    def test_connection_idle_past_check_interval_is_pinged(self):
+        pool = self.make_pool(check_interval=30)
+        connection = pool.getconn(self.connect)
+        pool.putconn(connection)
+        self.assertIs(pool.getconn(self.connect), connection)
+        self.assertEqual(connection.executed, [])  # Used moments ago: no ping
+
+        pool.putconn(connection)
+        self.age(pool, 31)
+        self.assertIs(pool.getconn(self.connect), connection)
+        self.assertEqual(connection.executed, ["SELECT 1"])
+
+    def test_connection_failing_its_check_is_replaced(self):
+        pool = self.make_pool(check_interval=30)
+        dead = pool.getconn(self.connect)
+        pool.putconn(dead)
+        dead.broken = True
+        self.age(pool, 31)
+
+        replacement = pool.getconn(self.connect)
+        self.assertIsNot(replacement, dead)
+        self.assertTrue(dead.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['failed_checks'], stats['discarded'], stats['in_use']), (1, 1, 1))
+
+    def test_connection_past_max_lifetime_is_replaced(self):
+        pool = self.make_pool(max_lifetime=3600, check_interval=30)
+        old = pool.getconn(self.connect)
+        pool.putconn(old)
+        self.age(pool, 3601)
+
+        self.assertIsNot(pool.getconn(self.connect), old)
+        self.assertTrue(old.closed)
+        self.assertEqual(old.executed, [])  # Replaced without a ping
+
+    def test_connections_idle_past_max_idle_are_closed_down_to_min_size(self):
+        pool = self.make_pool(max_size=3, min_size=1, max_idle=600)
+        connections = [pool.getconn(self.connect) for _ in range(3)]
+        for connection in connections:
+            pool.putconn(connection)
+        self.age(pool, 601)
+
+        kept = pool.getconn(self.connect)
+        self.assertEqual(sum(bool(connection.closed) for connection in connections), 2)
+        self.assertFalse(kept.closed)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    def test_returned_connection_is_rolled_back(self):
+        pool = self.make_pool()
+        connection = pool.getconn(self.connect)
+        connection.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(connection)
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertIs(pool.getconn(self.connect), connection)
+
+    def test_returned_connection_in_unknown_state_is_closed(self):
+        pool = self.make_pool()
+        connection = pool.getconn(self.connect)
+        connection.transaction_status = extensions.TRANSACTION_STATUS_UNKNOWN
+        pool.putconn(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['idle'], 0)
+
+    def test_closed_pool(self):
+        pool = self.make_pool()
+        idle, held = pool.getconn(self.connect), pool.getconn(self.connect)
+        pool.putconn(idle)
+        pool.close()
+        self.assertTrue(idle.closed)
+        self.assertFalse(held.closed)
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.getconn(self.connect)
+        pool.putconn(held)
+        self.assertTrue(held.closed)
+
+    def test_detach_points_sockets_at_devnull_before_closing(self):
+        pool = self.make_pool()
+        ours, theirs = os.pipe()  # Stands in for the socket shared with the parent process
+        self.addCleanup(os.close, theirs)
+        self.addCleanup(os.close, ours)
+        self.connect.opened.append(FakeConnection(fd=ours))
+        pool.putconn(pool.getconn(lambda: self.connect.opened[0]))
+
+        pool.detach()
+
+        self.assertTrue(self.connect.opened[0].closed)
+        self.assertTrue(os.path.samestat(os.fstat(ours), os.stat(os.devnull)))
+        self.assertEqual(pool.stats()['idle'], 0)
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.getconn(self.connect)
@@ -0,0 +1,79 @@
+import logging
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+_UNDECLARED = object()
+
+# Budgets count the statements that read or write data. Transaction control
+# is left out: whether it is sent as SQL depends on the backend (SQLite sends
+# BEGIN, PostgreSQL does not) and on nesting (tests turn atomic() into savepoints).
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+
+def counts_towards_budget(sql):
+    return not sql.lstrip()[:20].upper().startswith(TRANSACTION_STATEMENTS)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """
+    Declare the most database queries one request to a view may run,
+    authentication included. Put it above every other decorator (or on the
+    class of a class-based view). None marks a view whose query count
+    grows with its input, such as a batched import, as deliberately unbounded.
+    Budgets are enforced by QueryBudgetMiddleware and the loadtest command.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def get_query_budget(view, default=None):
+    """The budget declared on a view function or on the class behind it."""
+    for target in (view, getattr(view, 'view_class', None)):
+        if hasattr(target, 'query_budget'):
+            return target.query_budget
+    return default
+
+
+def declares_query_budget(view):
+    return get_query_budget(view, _UNDECLARED) is not _UNDECLARED
+
+
+def check_query_budget(view_name, budget, count):
+    """Log or raise, per QUERY_BUDGET_ACTION, if `count` queries exceed the budget."""
+    if budget is None or count <= budget:
+        return
+    message = f"{view_name} ran {count} queries, over its budget of {budget}"
+    if settings.QUERY_BUDGET_ACTION == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def assert_within_query_budget(client, method, path, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Test helper: make a request with a Django test client, consuming any
+    streamed body, and assert that it ran no more queries than the budget
+    of the view that served it. Returns the response.
+    """
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connections[using]) as context:
+        response = getattr(client, method.lower())(path, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    view = response.resolver_match.func
+    assert declares_query_budget(view), f"{response.resolver_match.view_name} declares no query budget"
+    budget = get_query_budget(view)
+    queries = [query['sql'] for query in context.captured_queries if counts_towards_budget(query['sql'])]
+    if budget is not None and len(queries) > budget:
+        raise AssertionError(
+            f"{method.upper()} {path} ran {len(queries)} queries, over its budget of {budget}:\n" + "\n".join(queries)
+        )
+    return response
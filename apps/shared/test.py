@@ -0,0 +1,409 @@
+import datetime
+import decimal
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+from zoneinfo import ZoneInfo
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.accounts.models import User
+from apps.backend.management.commands.profile_startup import BOOT_SCRIPT
+from . import fastjson, metrics, openapi, throttling
+from .cache import StampedLRUCache
+from .http import CircuitBreaker, CircuitOpenError, SmtpApiClient
+from .query_budget import assert_within_query_budget
+
+
+# The middleware only logs, so a request over budget fails in the helper, which lists its queries
+@override_settings(QUERY_BUDGET_ACTION='log', METRICS_TOKEN='scraper-token')
+class QueryBudgetTests(TestCase):
+    """The shared endpoints stay within their @query_budget."""
+
+    def test_metrics_with_token(self):
+        response = assert_within_query_budget(
+            self.client, 'get', '/metrics', secure=True, HTTP_AUTHORIZATION="Bearer scraper-token",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_as_staff(self):
+        staff = User.objects.create_user(email="staff@example.com", username="staff", is_staff=True)
+        token = RefreshToken.for_user(staff).access_token
+        response = assert_within_query_budget(
+            self.client, 'get', '/metrics', secure=True, HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @unittest.skipUnless(settings.OPENAPI_SCHEMA_MODE == 'static', "drf_spectacular serves the schema")
+    def test_static_schema(self):
+        # Generated into a scratch directory, never the deployment's OPENAPI_SCHEMA_DIR
+        with tempfile.TemporaryDirectory() as directory, override_settings(OPENAPI_SCHEMA_DIR=directory):
+            openapi.clear_schema_cache()
+            self.addCleanup(openapi.clear_schema_cache)
+            response = assert_within_query_budget(self.client, 'get', '/api/schema/?format=json', secure=True)
+        self.assertEqual(response.status_code, 200)
+
+
+class StaticSchemaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(OPENAPI_SCHEMA_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        openapi.clear_schema_cache()
+        self.addCleanup(openapi.clear_schema_cache)
+
+    def write(self, name, content):
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(content)
+
+    def test_current_schema_is_served_from_disk(self):
+        openapi.write_schema()
+        self.write('schema.json', b'{"served": "from disk"}')
+        self.assertEqual(json.loads(openapi.get_schema_artifact('json').content), {"served": "from disk"})
+
+    def test_schema_built_from_other_code_is_regenerated(self):
+        openapi.write_schema()
+        self.write('schema.json', b'{"stale": true}')
+        self.write(openapi.VERSION_FILE, b'previous-release')
+
+        schema = json.loads(openapi.get_schema_artifact('json').content)
+
+        self.assertIn('paths', schema)
+        with open(os.path.join(self.directory, openapi.VERSION_FILE)) as f:
+            self.assertEqual(f.read(), openapi.code_version())
+
+    def test_code_version_is_the_same_in_every_runtime_profile(self):
+        self.addCleanup(openapi.code_version.cache_clear)
+        openapi.code_version.cache_clear()
+        full = openapi.code_version()
+        slim_rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_RENDERER_CLASSES': [settings.JSON_RENDERER]}
+        with override_settings(REST_FRAMEWORK=slim_rest_framework):
+            openapi.code_version.cache_clear()
+            self.assertEqual(openapi.code_version(), full)
+
+    def test_unstamped_schema_is_regenerated(self):
+        self.write('schema.json', b'{"stale": true}')
+        self.write('schema.json.gz', b'')
+        self.assertIn('paths', json.loads(openapi.get_schema_artifact('json').content))
+
+
+class StampedLRUCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = StampedLRUCache('test', maxsize=10)
+
+    def test_load_overlapping_an_invalidation_is_not_used(self):
+        value, stamp = self.cache.lookup('key')
+        self.assertIsNone(value)
+        # The row changes while the miss is loading the old one
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cache.invalidate('key')
+        self.cache.store('key', 'old row', stamp)
+        self.assertEqual(self.cache.lookup('key')[0], None)
+
+    def test_invalidation_waits_for_commit(self):
+        _, stamp = self.cache.lookup('key')
+        self.cache.store('key', 'row', stamp)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.cache.invalidate('key')
+            self.cache.store('key', 'row read before the commit', stamp)
+            self.assertEqual(self.cache.lookup('key')[0], 'row read before the commit')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.cache.lookup('key'), (None, stamp + 1))
+
+
+class SlimProfileTests(SimpleTestCase):
+    def test_slim_worker_does_not_import_drf_spectacular(self):
+        # A fresh interpreter booted like a worker: setup, middleware, URLconf and warm_up()
+        script = BOOT_SCRIPT + "import sys\nprint(json.dumps(sorted(m for m in sys.modules if m.startswith('drf_spectacular'))))\n"
+        env = dict(os.environ, RUNTIME_PROFILE='slim', OPENAPI_SCHEMA_MODE='static')
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout.splitlines()[-1]), [])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class BucketStoreTests:
+    """Run against LocalBucketStore and CacheBucketStore by the subclasses below."""
+
+    def make_store(self, clock):
+        raise NotImplementedError
+
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        self.store = self.make_store(self.clock)
+        self.login = ('login.ip:10.0.0.1', *throttling.parse_rate('2/min'))
+
+    def test_rejects_once_empty_and_refills(self):
+        self.assertEqual(self.store.take([self.login]), 0)
+        self.assertEqual(self.store.take([self.login]), 0)
+        self.assertAlmostEqual(self.store.take([self.login]), 30)
+        self.clock.now += 29
+        self.assertAlmostEqual(self.store.take([self.login]), 1)
+        self.clock.now += 1
+        self.assertEqual(self.store.take([self.login]), 0)
+
+    def test_rejected_request_takes_no_token(self):
+        account = ('login.account:locked@example.com', *throttling.parse_rate('1/min'))
+        self.assertEqual(self.store.take([self.login, account]), 0)
+        self.assertGreater(self.store.take([self.login, account]), 0)
+        self.assertGreater(self.store.take([self.login, account]), 0)
+        # The address still has the token the rejected requests did not take
+        self.assertEqual(self.store.take([self.login]), 0)
+
+    def test_async_take_shares_the_buckets(self):
+        self.assertEqual(async_to_sync(self.store.atake)([self.login]), 0)
+        self.assertEqual(self.store.take([self.login]), 0)
+        self.assertGreater(async_to_sync(self.store.atake)([self.login]), 0)
+
+
+class LocalBucketStoreTests(BucketStoreTests, SimpleTestCase):
+    def make_store(self, clock):
+        return throttling.LocalBucketStore(clock=clock)
+
+    def test_least_recently_used_buckets_are_dropped(self):
+        store = throttling.LocalBucketStore(max_keys=2, clock=self.clock)
+        for ident in ('a', 'b', 'c'):
+            store.take([(ident, 1, 1 / 60)])
+        self.assertEqual(store.take([('a', 1, 1 / 60)]), 0)  # Forgotten, so full again
+        self.assertGreater(store.take([('c', 1, 1 / 60)]), 0)
+
+
+class CacheBucketStoreTests(BucketStoreTests, SimpleTestCase):
+    def make_store(self, clock):
+        return throttling.CacheBucketStore('default', clock=clock)
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_BACKEND='local', THROTTLE_NUM_PROXIES=0, THROTTLE_RATES={
+    'login.ip': '3/min', 'login.account': '1/min',
+})
+class ThrottleKeyTests(SimpleTestCase):
+    def setUp(self):
+        store = mock.patch.object(throttling, '_local_store', throttling.LocalBucketStore(clock=FakeClock()))
+        store.start()
+        self.addCleanup(store.stop)
+
+    def login(self, email, ip):
+        request = RequestFactory().post('/api/accounts/auth/login/', REMOTE_ADDR=ip)
+        return throttling.check_throttle(request, 'login', {'email': email})
+
+    def test_account_is_throttled_across_addresses(self):
+        self.assertEqual(self.login('ada@example.com', '10.0.0.1'), 0)
+        self.assertGreater(self.login('Ada@Example.com', '10.0.0.2'), 0)
+
+    def test_address_is_throttled_across_accounts(self):
+        for i in range(3):
+            self.assertEqual(self.login(f'user{i}@example.com', '10.0.0.1'), 0)
+        self.assertGreater(self.login('user3@example.com', '10.0.0.1'), 0)
+        self.assertEqual(self.login('user3@example.com', '10.0.0.2'), 0)
+
+    def test_locked_account_does_not_lock_out_its_address(self):
+        self.assertEqual(self.login('locked@example.com', '10.0.0.1'), 0)
+        for _ in range(5):
+            self.assertGreater(self.login('locked@example.com', '10.0.0.1'), 0)
+        self.assertEqual(self.login('other@example.com', '10.0.0.1'), 0)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=self.clock)
+
+    def open_circuit(self):
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.breaker.record_success()  # Not consecutive any more
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_open_circuit_fails_fast_until_reset_timeout(self):
+        self.open_circuit()
+        self.clock.now += 29
+        self.assertFalse(self.breaker.allow())
+
+        self.clock.now += 1
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())  # Only one trial call at a time
+
+    def test_successful_trial_closes_the_circuit(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens_the_circuit(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now += 29
+        self.assertFalse(self.breaker.allow())
+        self.clock.now += 1
+        self.assertTrue(self.breaker.allow())
+
+    def test_open_circuit_rejects_without_calling_the_api(self):
+        client = SmtpApiClient('http://smtp.invalid/send', 'key', 1, 1, 1, failure_threshold=1, reset_timeout=30)
+        client.breaker.record_failure()
+        with mock.patch.object(client.session, 'post') as post, self.assertRaises(CircuitOpenError):
+            client.post({"subject": "Hi"})
+        post.assert_not_called()
+        self.assertEqual(client.stats()['rejected'], 1)
+
+
+class ClientMetricsTests(SimpleTestCase):
+    def snapshot(self, circuit):
+        client = SmtpApiClient('http://smtp.invalid/send', 'key', 1, 1, 1, failure_threshold=1, reset_timeout=30)
+        client.latency.observe(0.02)
+        if circuit == 'open':
+            client.breaker.record_failure()
+            client.errors += 1
+        with mock.patch.dict(metrics._client_collectors, clear=True):
+            metrics.register_client('smtp', client.stats)
+            return metrics.RequestMetrics().dump()
+
+    def test_client_stats_are_merged_across_workers(self):
+        merged = metrics.merge_snapshots([self.snapshot('closed'), self.snapshot('open')])
+        smtp = merged['clients']['smtp']
+        self.assertEqual((smtp['errors'], smtp['circuit_open'], smtp['latency']['count']), (1, 1, 2))
+
+        text = metrics.render_prometheus(merged)
+        self.assertIn('rockae_http_client_request_duration_seconds_bucket{client="smtp",le="0.025"} 2', text)
+        self.assertIn('rockae_http_client_errors_total{client="smtp"} 1', text)
+        self.assertIn('rockae_http_client_circuit_open{client="smtp"} 1', text)
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+class MetricsStoreTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = metrics.MetricsStore(directory.name)
+
+    def snapshot(self, requests=1, in_use=2, streamed=False):
+        request_metrics = metrics.RequestMetrics()
+        for _ in range(requests):
+            request_metrics.record('quiz_list', 'GET', 200, 0.01, 1, 0.001, None if streamed else 100)
+        with mock.patch.dict(metrics._pool_collectors, clear=True), \
+                mock.patch.dict(metrics._cache_collectors, clear=True), \
+                mock.patch.dict(metrics._client_collectors, clear=True):
+            metrics.register_pool('default', lambda: dict(dict.fromkeys(metrics.POOL_FIELDS, 0), in_use=in_use, checkouts=5))
+            metrics.register_cache('users', lambda: {"size": 10, "hits": 3, "misses": 1})
+            return request_metrics.dump()
+
+    def merged(self):
+        return metrics.merge_snapshots(self.store.read_all())
+
+    def test_retired_worker_keeps_its_counters_but_not_its_gauges(self):
+        dead = exited_pid()
+        self.store.write(self.snapshot(requests=2), name=dead)
+        self.store.write(self.snapshot(requests=1))
+
+        self.store.retire(dead)
+        self.store.retire(dead)  # Already retired: nothing to fold in twice
+
+        self.assertFalse(os.path.exists(self.store.path(dead)))
+        merged = self.merged()
+        self.assertEqual(merged['views']['quiz_list']['requests'], {"GET 200": 3})
+        self.assertEqual((merged['pools']['default']['in_use'], merged['pools']['default']['checkouts']), (2, 10))
+        self.assertEqual((merged['caches']['users']['size'], merged['caches']['users']['hits']), (10, 6))
+
+    def test_retired_snapshot_accumulates(self):
+        for _ in range(2):
+            dead = exited_pid()
+            self.store.write(self.snapshot(requests=2), name=dead)
+            self.store.retire(dead)
+        self.assertEqual(self.merged()['views']['quiz_list']['requests'], {"GET 200": 4})
+
+    def test_gauges_of_exited_processes_are_not_summed(self):
+        self.store.write(self.snapshot(), name=exited_pid())
+        self.store.write(self.snapshot())
+        merged = self.merged()
+        self.assertEqual(merged['views']['quiz_list']['requests'], {"GET 200": 2})
+        self.assertEqual(merged['pools']['default']['in_use'], 2)
+        self.assertEqual(merged['caches']['users']['size'], 10)
+
+    def test_streamed_responses_are_counted_instead_of_sized(self):
+        self.store.write(self.snapshot(requests=2, streamed=True))
+        entry = self.merged()['views']['quiz_list']
+        self.assertEqual((entry['response_bytes'], entry['streamed']), (0, 2))
+        self.assertIn('rockae_http_streamed_responses_total{view="quiz_list"} 2', metrics.render_prometheus(self.merged()))
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    data = {
+        "utc": datetime.datetime(2024, 5, 1, 12, 30, 5, 123456, tzinfo=datetime.timezone.utc),
+        "offset": datetime.datetime(2024, 5, 1, 12, 30, 5, tzinfo=ZoneInfo("Europe/Paris")),
+        "naive": datetime.datetime(2024, 5, 1, 12, 30),
+        "date": datetime.date(2024, 5, 1),
+        "time": datetime.time(8, 15, 1, 500),
+        "decimal": decimal.Decimal("12.50"),
+        "uuid": uuid.UUID(int=1),
+        "separators": "line\u2028paragraph\u2029end",
+        "text": "Grâce 😀",
+        1: [1.0, None, True],
+    }
+
+    def test_same_bytes_as_drf_renderer(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(fastjson.FastJSONRenderer().render(self.data), expected)
+        with mock.patch.object(fastjson, 'orjson', None):
+            self.assertEqual(fastjson.FastJSONRenderer().render(self.data), expected)
+
+    @unittest.skipUnless(fastjson.orjson, "orjson is not installed")
+    def test_line_and_paragraph_separators_are_escaped(self):
+        body = fastjson.FastJSONRenderer().render({"text": "a\u2028b\u2029c"})
+        self.assertEqual(body, b'{"text":"a\\u2028b\\u2029c"}')
+        self.assertEqual(fastjson.loads(body), {"text": "a\u2028b\u2029c"})
+
+    def test_indented_output_matches_drf_renderer(self):
+        context = {'indent': 4}
+        self.assertEqual(
+            fastjson.FastJSONRenderer().render(self.data, renderer_context=context),
+            JSONRenderer().render(self.data, renderer_context=context),
+        )
+
+    def test_parser_round_trip(self):
+        body = fastjson.FastJSONRenderer().render({"answers": {"1": "A"}, "name": "Grâce"})
+        self.assertEqual(fastjson.FastJSONParser().parse(io.BytesIO(body)), {"answers": {"1": "A"}, "name": "Grâce"})
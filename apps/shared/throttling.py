@@ -0,0 +1,194 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+# Token-bucket throttles for the unauthenticated endpoints that hash passwords
+# or send mail. A bucket holds up to `capacity` tokens and refills at
+# `capacity` per period; a request needs a token from each of its buckets
+# (per client address and per account) and is rejected when any is empty.
+# A rejected request takes no token at all, so a locked-out account does not
+# drain the bucket of the address it is tried from. The throttles run in
+# DRF's initial(), before the view, so a rejected request costs a bucket
+# lookup and never reaches the hasher or the database.
+#
+# Buckets live in THROTTLE_BACKEND:
+#   'local'  a per-process dict (default without CACHE_URL). Every worker
+#            has its own buckets, so the limits hold per worker process, not
+#            per deployment: N workers let up to N times the rate through.
+#   'cache'  the Django cache THROTTLE_CACHE_ALIAS, shared by all workers when
+#            that cache is (e.g. Redis via CACHE_URL); with the default
+#            local-memory cache it behaves like 'local'
+# Rates are THROTTLE_RATES['<scope>.<key>'] = '<n>/<second|minute|hour|day>'.
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/min' -> (capacity 10, refill 10/60 tokens per second)."""
+    count, _, period = rate.partition('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def _take(state, capacity, refill, now):
+    """Refill a bucket up to now and take a token. Returns (new state, seconds to wait or 0)."""
+    tokens, updated = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * refill)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / refill
+
+
+def _take_all(states, buckets, now):
+    """
+    Take a token from every bucket, or from none if any is empty. Returns
+    (new states to store, or None when rejected; seconds to wait or 0).
+    """
+    taken = [_take(state, capacity, refill, now) for state, (_, capacity, refill) in zip(states, buckets)]
+    wait = max((wait for _, wait in taken), default=0)
+    if wait:
+        return None, wait
+    return [state for state, _ in taken], 0
+
+
+class LocalBucketStore:
+    """Buckets in process memory. Keeps at most `max_keys`, dropping the least recently used."""
+
+    def __init__(self, max_keys=100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        """Take a token from each (key, capacity, refill) bucket, or none. Returns 0 or the seconds to wait."""
+        with self._lock:
+            states, wait = _take_all([self._buckets.get(key) for key, _, _ in buckets], buckets, self.clock())
+            if states is not None:
+                for (key, _, _), state in zip(buckets, states):
+                    self._buckets[key] = state
+                    self._buckets.move_to_end(key)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+        return wait
+
+    async def atake(self, buckets):
+        return self.take(buckets)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in a Django cache. The read and the write are separate cache
+    calls, so concurrent requests for the same key may occasionally both get
+    the last token; that slack is acceptable for abuse protection.
+    """
+
+    def __init__(self, alias='default', clock=time.time):
+        self.alias = alias
+        self.clock = clock
+
+    def take(self, buckets):
+        cache = caches[self.alias]
+        keys = [f"throttle:{key}" for key, _, _ in buckets]
+        stored = cache.get_many(keys)
+        states, wait = _take_all([stored.get(key) for key in keys], buckets, self.clock())
+        for key, state, (_, capacity, refill) in zip(keys, states or (), buckets):
+            # Expires once it would be full again, which is what a missing bucket means
+            cache.set(key, state, math.ceil(capacity / refill))
+        return wait
+
+    async def atake(self, buckets):
+        cache = caches[self.alias]
+        keys = [f"throttle:{key}" for key, _, _ in buckets]
+        stored = await cache.aget_many(keys)
+        states, wait = _take_all([stored.get(key) for key in keys], buckets, self.clock())
+        for key, state, (_, capacity, refill) in zip(keys, states or (), buckets):
+            await cache.aset(key, state, math.ceil(capacity / refill))
+        return wait
+
+    def clear(self):
+        caches[self.alias].clear()
+
+
+_local_store = LocalBucketStore()
+
+
+def get_bucket_store():
+    if settings.THROTTLE_BACKEND == 'cache':
+        return CacheBucketStore(settings.THROTTLE_CACHE_ALIAS)
+    return _local_store
+
+
+def client_ip(request):
+    """The client address, taking THROTTLE_NUM_PROXIES trusted hops of X-Forwarded-For into account."""
+    xff = request.META.get('HTTP_X_FORWARDED_FOR')
+    proxies = settings.THROTTLE_NUM_PROXIES
+    if xff and proxies:
+        addrs = [addr.strip() for addr in xff.split(',')]
+        return addrs[-min(proxies, len(addrs))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def throttle_keys(request, scope, data):
+    """The buckets a request takes a token from: '<scope>.ip' and, when it names one, '<scope>.account'."""
+    keys = [(f"{scope}.ip", client_ip(request))]
+    account = data.get('email') if isinstance(data, dict) else None
+    if isinstance(account, str) and account:
+        keys.append((f"{scope}.account", account.strip().lower()))
+    return keys
+
+
+def _buckets(request, scope, data):
+    buckets = []
+    for rate_name, ident in throttle_keys(request, scope, data):
+        rate = settings.THROTTLE_RATES.get(rate_name)
+        if rate:
+            buckets.append((f"{rate_name}:{ident}", *parse_rate(rate)))
+    return buckets
+
+
+def check_throttle(request, scope, data):
+    """Take a token from each of the request's buckets, or none. Returns 0, or the seconds until it may retry."""
+    if not settings.THROTTLE_ENABLED:
+        return 0
+    return get_bucket_store().take(_buckets(request, scope, data))
+
+
+async def acheck_throttle(request, scope, data):
+    """check_throttle for async views."""
+    if not settings.THROTTLE_ENABLED:
+        return 0
+    return await get_bucket_store().atake(_buckets(request, scope, data))
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """DRF throttle over check_throttle; subclasses set `scope`."""
+    scope = None
+
+    def allow_request(self, request, view):
+        # Parsing the body is cheap and lets the account be throttled as well as the address
+        self.retry_after = check_throttle(request, self.scope, request.data)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = 'login'
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    scope = 'register'
+
+
+class PasswordResetThrottle(TokenBucketThrottle):
+    scope = 'password_reset'
@@ -1,9 +1,14 @@
-import requests
-from django.conf import settings
 from apps.shared.models import InternalServerError
+from apps.shared.http import get_smtp_client
 from apps.shared.serializers import SendVerificationEmailSerializer
 
 def send_email(subject, body, recipients):
+    """
+    Validate an email and queue it in the outbox. Delivery happens in the
+    outbox worker (manage.py run_outbox_worker), not in the request.
+    """
+    from apps.notifications.outbox import enqueue_email
+
     # Initialize email data using the serializer
     email_serializer = SendVerificationEmailSerializer(data={
         "subject": subject,
@@ -14,15 +19,18 @@ def send_email(subject, body, recipients):
     # Validate the email data
     email_serializer.is_valid(raise_exception=True)
 
-    # Send email via SMTP API
-    response = requests.post(
-        settings.SMTP_SEND_MAIL_URL,
-        json=email_serializer.validated_data,
-        headers={"Authorization": f"Bearer {settings.SMTP_API_KEY}"}
-    )
+    data = email_serializer.validated_data
+    enqueue_email(data["subject"], data["body"], [dict(recipient) for recipient in data["to"]])
+
+    return {"message": "Email queued successfully."}
+
+
+def deliver_email(payload):
+    """Send an email payload ({subject, body, to}) through the SMTP API."""
+    response = get_smtp_client().post(payload)
 
     # Check if the email was sent successfully
     if response.status_code != 200:
         raise InternalServerError(f"Failed to send email: {response.text}")
 
-    return {"message": "Email sent successfully."}
+    return response
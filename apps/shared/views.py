@@ -0,0 +1,119 @@
+import hmac
+import json
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_safe
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
+from rest_framework.permissions import BasePermission
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from .metrics import merge_snapshots, render_prometheus
+from .middleware import flush_metrics, metrics_store
+from .openapi import FORMATS, SchemaUnavailable, extend_schema, get_schema_artifact
+from .query_budget import query_budget
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, str):
+            data = json.dumps(data)  # error payloads
+        return data.encode(self.charset)
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """Lets a scraper authenticate with the static METRICS_TOKEN instead of a short-lived JWT."""
+
+    def authenticate(self, request):
+        token = settings.METRICS_TOKEN
+        header = request.headers.get('Authorization', '')
+        if token and hmac.compare_digest(header, f"Bearer {token}"):
+            return (None, 'metrics-token')
+        return None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
+
+
+class IsStaffOrScraper(BasePermission):
+    def has_permission(self, request, view):
+        if request.auth == 'metrics-token':
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+@query_budget(1)
+@extend_schema(exclude=True)
+@api_view(['GET'])
+@authentication_classes([MetricsTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+@permission_classes([IsStaffOrScraper])
+@renderer_classes([PrometheusRenderer])
+def metrics_view(request):
+    """Request and cache metrics of all worker processes, in the Prometheus text format."""
+    flush_metrics()
+    body = render_prometheus(merge_snapshots(metrics_store.read_all()))
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ----------------- OpenAPI schema and docs (OPENAPI_SCHEMA_MODE=static) -----------------
+
+def _schema_format(request):
+    fmt = request.GET.get('format')
+    if fmt in FORMATS:
+        return fmt
+    return 'json' if 'json' in request.headers.get('Accept', '') else 'yaml'
+
+
+@query_budget(0)
+@require_safe
+def schema_view(request):
+    """The precomputed OpenAPI schema (YAML, or JSON with ?format=json), gzipped when the client accepts it."""
+    fmt = _schema_format(request)
+    try:
+        artifact = get_schema_artifact(fmt)
+    except SchemaUnavailable as e:
+        return JsonResponse({"error": str(e)}, status=503)
+    gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+    etag = artifact.gzip_etag if gzipped else artifact.etag
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(artifact.last_modified))
+    if response is None:
+        response = HttpResponse(artifact.compressed if gzipped else artifact.content, content_type=FORMATS[fmt][1])
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+        if fmt == 'yaml':
+            response.headers['Content-Disposition'] = 'inline; filename="schema.yaml"'
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = artifact.last_modified_header
+    # Cacheable, but revalidated so a new deployment is picked up at once
+    patch_cache_control(response, public=True, no_cache=True)
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    return response
+
+
+def _docs_context():
+    spectacular = getattr(settings, 'SPECTACULAR_SETTINGS', {})
+    return {
+        "title": spectacular.get('TITLE', 'API'),
+        "schema_url": reverse('schema'),
+        "swagger_ui_dist": spectacular.get('SWAGGER_UI_DIST', 'https://cdn.jsdelivr.net/npm/swagger-ui-dist@latest'),
+        "redoc_dist": spectacular.get('REDOC_DIST', 'https://cdn.jsdelivr.net/npm/redoc@latest'),
+    }
+
+
+@require_safe
+def swagger_ui_view(request):
+    return render(request, 'openapi/swagger_ui.html', _docs_context())
+
+
+@require_safe
+def redoc_view(request):
+    return render(request, 'openapi/redoc.html', _docs_context())
@@ -0,0 +1,60 @@
+import gc
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.template import engines
+from django.urls import get_resolver
+from django.utils import translation
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+def _serializer_classes():
+    pending = [serializers.BaseSerializer]
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if cls.__module__.startswith('apps.'):
+            yield cls
+
+
+def warm_up():
+    """
+    Do the lazy, per-process initialisation Django and DRF otherwise do on
+    the first requests: compile the URL patterns, fill the model _meta
+    caches, import the DRF/simplejwt classes named in settings, load the
+    translation catalogs and build every serializer's fields once. Run
+    in the gunicorn master after the app is loaded, so forked workers share
+    the result. It does not touch the database.
+    """
+    resolver = get_resolver()
+    resolver.reverse_dict  # Populates the resolver, compiling every pattern
+
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+    for name in ('DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+                 'DEFAULT_PARSER_CLASSES', 'DEFAULT_PAGINATION_CLASS'):
+        getattr(api_settings, name)
+    jwt_settings.AUTH_TOKEN_CLASSES
+    get_hashers()
+
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.gettext("This field is required.")
+    translation.deactivate()
+    engines.all()
+
+    for serializer_class in _serializer_classes():
+        # Building fields imports the field classes and walks the model relations
+        serializer_class().fields
+
+
+def freeze():
+    """
+    Move everything allocated so far out of the garbage collector's reach,
+    so collections in the workers do not write to (and so copy) the pages
+    shared with the master. Call right before forking.
+    """
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,74 @@
+# Gunicorn settings, read automatically when gunicorn starts in this directory.
+#
+# GUNICORN_PROFILE picks the worker model:
+#   sync     one request at a time per worker process (default)
+#   gthread  GUNICORN_THREADS threads per worker process
+#   uvicorn  asyncio workers serving RockaeWebAPI.asgi (the async views)
+# WEB_CONCURRENCY overrides the worker count derived from the CPUs available.
+#
+# The app is preloaded in the master and warmed up (apps.shared.warmup) before
+# the workers are forked, so they share its memory copy-on-write instead of each
+# importing Django, DRF and friends. Set GUNICORN_PRELOAD=0 to load per worker,
+# e.g. for code reloading in development.
+import os
+
+
+def _cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+PROFILES = {
+    # (app, worker class, default workers, default threads)
+    'sync': ('RockaeWebAPI.wsgi:application', 'sync', 2 * _cpus() + 1, 1),
+    'gthread': ('RockaeWebAPI.wsgi:application', 'gthread', _cpus() + 1, 4),
+    'uvicorn': ('RockaeWebAPI.asgi:application', 'uvicorn.workers.UvicornWorker', _cpus(), 1),
+}
+
+# SERVER_MODE=asgi is the older name of the uvicorn profile
+profile = os.environ.get('GUNICORN_PROFILE') or ('uvicorn' if os.environ.get('SERVER_MODE') == 'asgi' else 'sync')
+wsgi_app, worker_class, default_workers, default_threads = PROFILES[profile]
+
+workers = int(os.environ.get('WEB_CONCURRENCY') or default_workers)
+threads = int(os.environ.get('GUNICORN_THREADS') or default_threads)
+# The settings size the database connection pools from these
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+# Restarting workers now and then bounds slow memory growth; off by default
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+# Heartbeat files on tmpfs: an overlay filesystem can stall workers on fsync
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') not in ('0', 'false', 'False')
+
+
+def when_ready(server):
+    # Runs in the master once the listening socket is open, before any worker is forked
+    if not preload_app:
+        return
+    from django.conf import settings
+    from apps.shared.metrics import MetricsStore
+    from apps.shared.warmup import freeze, warm_up
+
+    warm_up()
+    # Snapshots of a previous master's workers would be merged into /metrics
+    MetricsStore(settings.METRICS_DIR).clear()
+    freeze()
+    server.log.info("Preloaded %s (%s profile, %d workers x %d threads)", wsgi_app, profile, workers, threads)
+
+
+def child_exit(server, worker):
+    # Runs in the master: fold the worker's counters into the retired snapshot and drop
+    # its gauges (pool connections, cache sizes), which no longer describe a live process
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'RockaeWebAPI.settings')
+    from django.conf import settings
+    from apps.shared.metrics import MetricsStore
+
+    MetricsStore(settings.METRICS_DIR).retire(worker.pid)